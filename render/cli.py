@@ -7,21 +7,128 @@ import requests
 import urllib3
 import json
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 import zipfile
 import tempfile
 
 # Wyłącz ostrzeżenia SSL dla self-signed certyfikatów
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Rozmiar porcji przy strumieniowym wysyłaniu i pobieraniu plików
+CHUNK_SIZE = 64 * 1024
+
+
+class MultipartFileStream:
+    """
+    Strumieniowe ciało żądania multipart/form-data.
+
+    Plik jest czytany porcjami w trakcie wysyłania, więc pamięć nie zależy
+    od jego rozmiaru. Długość jest znana z góry (nagłówek Content-Length);
+    przekazanie iter(stream) jako ciała wysyła je jako Transfer-Encoding: chunked.
+    """
+
+    def __init__(self, field_name, file_path, fields=None, chunk_size=CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+
+        preamble = b''
+        for name, value in (fields or {}).items():
+            preamble += (
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode('utf-8')
+        preamble += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{Path(file_path).name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode('utf-8')
+        epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        self.file = open(file_path, 'rb')
+        self.length = len(preamble) + os.path.getsize(file_path) + len(epilogue)
+        self._parts = [preamble, self.file, epilogue]
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def read(self, size=-1):
+        data = b''
+        while self._parts and (size < 0 or len(data) < size):
+            part = self._parts[0]
+            wanted = -1 if size < 0 else size - len(data)
+            if isinstance(part, bytes):
+                chunk = part if wanted < 0 else part[:wanted]
+                rest = b'' if wanted < 0 else part[wanted:]
+                if rest:
+                    self._parts[0] = rest
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part.read(wanted)
+                if not chunk or wanted < 0:
+                    self._parts.pop(0)
+            data += chunk
+        return data
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class EMLRenderClient:
-    def __init__(self, base_url="https://localhost:8443", username="user", password="user123"):
+    # Statusy HTTP, po których żądanie jest ponawiane
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url="https://localhost:8443", username="user", password="user123",
+                 pool_size=10, retries=3, backoff_factor=0.5, timeout=120,
+                 stream_upload=True, chunked_upload=False):
+        """
+        Args:
+            base_url: Adres serwera EMLRender
+            username: Nazwa użytkownika
+            password: Hasło
+            pool_size: Rozmiar puli połączeń HTTP (powinien być >= liczbie wątków batch_render)
+            retries: Liczba ponowień żądania po błędzie połączenia lub statusie 429/5xx
+            backoff_factor: Bazowe opóźnienie ponowień (s) - kolejne: 0.5, 1, 2, ...
+            timeout: Timeout pojedynczego żądania (s)
+            stream_upload: Wysyłaj plik porcjami zamiast budować całe ciało multipart w pamięci
+            chunked_upload: Wysyłaj ciało jako Transfer-Encoding: chunked (bez Content-Length)
+        """
         self.base_url = base_url
         self.auth = (username, password)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.stream_upload = stream_upload
+        self.chunked_upload = chunked_upload
         self.session = requests.Session()
         self.session.verify = False  # Ignoruj SSL dla self-signed cert
 
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
     def test_connection(self):
         """Testuje połączenie z serwerem"""
         try:
@@ -31,6 +138,43 @@ class EMLRenderClient:
             print(f"Błąd połączenia: {e}")
             return False
 
+    def _post_file(self, url, eml_path, data):
+        """Wysyła plik; odpowiedź jest strumieniowana (stream=True)"""
+        if self.stream_upload:
+            with MultipartFileStream('file', eml_path, data) as body:
+                return self.session.post(
+                    url,
+                    data=iter(body) if self.chunked_upload else body,
+                    headers={'Content-Type': body.content_type},
+                    auth=self.auth,
+                    timeout=self.timeout,
+                    stream=True
+                )
+
+        with open(eml_path, 'rb') as f:
+            return self.session.post(
+                url,
+                files={'file': f},
+                data=data,
+                auth=self.auth,
+                timeout=self.timeout,
+                stream=True
+            )
+
+    def _post_with_retry(self, url, eml_path, data):
+        """Wysyła plik, ponawiając żądanie z wykładniczym opóźnieniem"""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._post_file(url, eml_path, data)
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.retries:
+                    return response
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+
+            time.sleep(self.backoff_factor * (2 ** attempt))
+
     def render_eml_file(self, eml_path, output_path=None, password=None):
         """
         Renderuje plik EML do PNG
@@ -46,66 +190,106 @@ class EMLRenderClient:
         if not output_path:
             output_path = str(Path(eml_path).with_suffix('.png'))
 
-        files = {'file': open(eml_path, 'rb')}
         data = {}
 
         if password:
             data['password'] = password
 
         try:
-            response = self.session.post(
-                f"{self.base_url}/upload",
-                files=files,
-                data=data,
-                auth=self.auth
-            )
-
-            if response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
-                return True, output_path
-            else:
-                return False, f"HTTP {response.status_code}: {response.text}"
+            with self._post_with_retry(f"{self.base_url}/upload", eml_path, data) as response:
+                if response.status_code == 200:
+                    # Zapis porcjami przez plik tymczasowy - przerwany zapis
+                    # nie zostanie uznany za gotowy wynik
+                    partial_path = f"{output_path}.part"
+                    try:
+                        with open(partial_path, 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                f.write(chunk)
+                        os.replace(partial_path, output_path)
+                    except BaseException:
+                        # Nie zostawiaj niepełnego pliku .part po przerwanym pobieraniu
+                        if os.path.exists(partial_path):
+                            os.unlink(partial_path)
+                        raise
+                    return True, output_path
+                else:
+                    return False, f"HTTP {response.status_code}: {response.text}"
 
         except Exception as e:
             return False, str(e)
-        finally:
-            files['file'].close()
 
     def render_eml_from_zip(self, zip_path, zip_password, output_path=None):
-        """Renderuje EML z archiwum ZIP"""
+        """Renderuje EML z archiwum ZIP (wysyłanym i pobieranym strumieniowo)"""
         return self.render_eml_file(zip_path, output_path, zip_password)
 
-    def batch_render(self, eml_directory, output_directory=None):
+    def batch_render(self, eml_directory, output_directory=None, workers=1,
+                     recursive=False, resume=False):
         """
         Renderuje wszystkie pliki EML z katalogu
 
         Args:
             eml_directory: Katalog z plikami EML
             output_directory: Katalog wyjściowy (domyślnie taki sam)
+            workers: Liczba równoległych wątków (1 = sekwencyjnie)
+            recursive: Przeszukuj również podkatalogi (struktura jest odtwarzana w katalogu wyjściowym)
+            resume: Pomiń pliki, których wynik PNG jest nowszy niż plik EML
         """
         if not output_directory:
             output_directory = eml_directory
 
-        Path(output_directory).mkdir(exist_ok=True)
-
-        results = []
-        eml_files = list(Path(eml_directory).glob("*.eml"))
+        Path(output_directory).mkdir(parents=True, exist_ok=True)
 
-        print(f"🔄 Renderowanie {len(eml_files)} plików EML...")
+        pattern = "**/*.eml" if recursive else "*.eml"
+        eml_files = sorted(Path(eml_directory).glob(pattern))
 
+        tasks = []
+        results = []
         for eml_file in eml_files:
-            output_path = Path(output_directory) / f"{eml_file.stem}.png"
-
-            print(f"  📧 {eml_file.name} -> {output_path.name}")
+            relative = eml_file.relative_to(eml_directory)
+            output_path = Path(output_directory) / relative.with_suffix('.png')
+
+            if resume and output_path.exists() and output_path.stat().st_mtime >= eml_file.stat().st_mtime:
+                results.append({
+                    'file': str(relative),
+                    'success': True,
+                    'skipped': True,
+                    'output': str(output_path),
+                    'error': None
+                })
+                continue
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            tasks.append((eml_file, relative, output_path))
+
+        skipped = len(results)
+        print(f"🔄 Renderowanie {len(tasks)} plików EML (pominięto aktualnych: {skipped}, wątki: {workers})...")
+
+        def render_task(task):
+            eml_file, relative, output_path = task
             success, result = self.render_eml_file(str(eml_file), str(output_path))
-
-            results.append({
-                'file': eml_file.name,
+            return {
+                'file': str(relative),
                 'success': success,
+                'skipped': False,
                 'output': str(output_path) if success else None,
                 'error': result if not success else None
-            })
+            }
+
+        started = time.monotonic()
+        rendered = [None] * len(tasks)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(render_task, task): index for index, task in enumerate(tasks)}
+            # Postęp w kolejności zakończenia, wyniki w kolejności plików
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                rendered[futures[future]] = result
+                status = "✅" if result['success'] else "❌"
+                print(f"  [{done}/{len(tasks)}] {status} {result['file']}")
+        results.extend(rendered)
+
+        elapsed = time.monotonic() - started
+        rate = len(tasks) / elapsed if elapsed > 0 else 0.0
+        print(f"📊 Wyrenderowano {len(tasks)} plików w {elapsed:.1f} s ({rate:.2f} plików/s)")
 
         return results
 
@@ -205,7 +389,7 @@ def main():
     print("🚀 EMLRender Python Client - Demo")
 
     # Inicjalizuj klienta
-    client = EMLRenderClient()
+    client = EMLRenderClient(pool_size=4)
 
     # Testuj połączenie
     print("🔌 Testowanie połączenia z serwerem...")
@@ -234,7 +418,7 @@ def main():
     # Test renderowania wsadowego
     print("\n🔄 Test renderowania wsadowego...")
     os.makedirs('rendered_outputs', exist_ok=True)
-    results = client.batch_render('sample_emls', 'rendered_outputs')
+    results = client.batch_render('sample_emls', 'rendered_outputs', workers=4, resume=True)
 
     successful = sum(1 for r in results if r['success'])
     print(f"\n📊 Wyniki renderowania wsadowego:")
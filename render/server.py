@@ -4,9 +4,16 @@ Serwer Flask do renderowania plików EML do HTML/PNG
 Własna implementacja Docker API
 """
 
-from flask import Flask, request, jsonify, render_template_string, send_file
+from flask import Flask, Request, Response, g, request, jsonify, render_template_string, send_file, stream_with_context
 import email
-from email.parser import BytesParser
+import base64
+import contextvars
+import io
+import itertools
+import mailbox
+import tarfile
+import zipfile
+from email.feedparser import BytesFeedParser
 from email import policy
 import os
 import tempfile
@@ -14,12 +21,66 @@ import subprocess
 import uuid
 import json
 import html
+import ipaddress
+import re
 from pathlib import Path
 import logging
+import secrets
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from datetime import datetime
 
+# Ten sam szacunek rozmiaru załącznika co parser emllm (limit max_attachment_bytes)
+from emllm.core import decoded_size
+
+
+class RenderRequest(Request):
+    """Żądanie z osobnym limitem rozmiaru dla archiwów /render/batch"""
+
+    @property
+    def max_content_length(self):
+        if self.path == '/render/batch':
+            return RENDER_BATCH_MAX_UPLOAD_BYTES or None
+        return app.config['MAX_CONTENT_LENGTH']
+
+
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.request_class = RenderRequest
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('RENDER_MAX_UPLOAD_BYTES', 16 * 1024 * 1024))  # 16MB max file size
+
+# Limity zasobów pojedynczej wiadomości (0 wyłącza limit)
+RENDER_LIMITS = {
+    'max_bytes': int(os.environ.get('RENDER_MAX_BYTES', 16 * 1024 * 1024)),
+    'max_parts': int(os.environ.get('RENDER_MAX_PARTS', '500')),
+    'max_depth': int(os.environ.get('RENDER_MAX_DEPTH', '20')),
+    'max_header_bytes': int(os.environ.get('RENDER_MAX_HEADER_BYTES', 256 * 1024)),
+    'max_attachment_bytes': int(os.environ.get('RENDER_MAX_ATTACHMENT_BYTES', 16 * 1024 * 1024)),
+}
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Kolejka zadań asynchronicznych - osobne tory dla HTML i PNG
+RENDER_HTML_WORKERS = int(os.environ.get('RENDER_HTML_WORKERS', '4'))
+RENDER_PNG_WORKERS = int(os.environ.get('RENDER_PNG_WORKERS', '2'))
+RENDER_MAX_PENDING = int(os.environ.get('RENDER_MAX_PENDING', '100'))  # na tor
+RENDER_JOB_TTL = int(os.environ.get('RENDER_JOB_TTL', '3600'))  # sekundy
+# Hosty dozwolone w callback_url (po przecinku); pusta lista - dowolny host publiczny
+RENDER_CALLBACK_ALLOWED_HOSTS = {host.strip().lower() for host in
+                                 os.environ.get('RENDER_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()}
+
+# Renderowanie wsadowe archiwów ZIP/TAR/mbox
+RENDER_BATCH_WORKERS = int(os.environ.get('RENDER_BATCH_WORKERS', '4'))
+RENDER_BATCH_MAX_MESSAGES = int(os.environ.get('RENDER_BATCH_MAX_MESSAGES', '10000'))
+# Suma rozpakowanych bajtów z jednego archiwum (ochrona przed "zip bomb")
+RENDER_BATCH_MAX_BYTES = int(os.environ.get('RENDER_BATCH_MAX_BYTES', 256 * 1024 * 1024))
+# Rozmiar przesyłanego archiwum - osobno od RENDER_MAX_UPLOAD_BYTES (0 wyłącza limit)
+RENDER_BATCH_MAX_UPLOAD_BYTES = int(os.environ.get('RENDER_BATCH_MAX_UPLOAD_BYTES', 1024 * 1024 * 1024))
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
@@ -34,76 +95,471 @@ for directory in [UPLOAD_DIR, OUTPUT_DIR, TEMP_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 
+# Znaczniki HTML wykrywane w jednym przebiegu przez treść
+HTML_FEATURE_TAGS = {'script': 'has_scripts', 'form': 'has_forms', 'img': 'has_images', 'a': 'has_links'}
+HTML_FEATURE_PATTERN = re.compile(r'<(script|form|img|a)\b', re.IGNORECASE)
+
+
+def scan_html_features(html_body):
+    """Wykrywa skrypty, formularze, obrazy i linki w jednym skanie treści HTML"""
+    features = dict.fromkeys(HTML_FEATURE_TAGS.values(), False)
+    remaining = len(features)
+
+    for match in HTML_FEATURE_PATTERN.finditer(html_body):
+        flag = HTML_FEATURE_TAGS[match.group(1).lower()]
+        if not features[flag]:
+            features[flag] = True
+            remaining -= 1
+            if not remaining:
+                break
+
+    return features
+
+
+class MessageLimitError(ValueError):
+    """Wiadomość przekracza jeden z limitów zasobów"""
+    code = 'limit_exceeded'
+
+    def __init__(self, limit, maximum, actual):
+        self.limit = limit
+        self.maximum = maximum
+        self.actual = actual
+        super().__init__(f'Wiadomość przekracza limit {limit}: {actual} > {maximum}')
+
+    def to_dict(self):
+        return {'error': str(self), 'code': self.code, 'limit': self.limit,
+                'maximum': self.maximum, 'actual': self.actual}
+
+
+def check_limit(limit, actual, limits=None):
+    maximum = (limits or RENDER_LIMITS)[limit]
+    if maximum and actual > maximum:
+        raise MessageLimitError(limit, maximum, actual)
+
+
+class LimitedFeedParser(BytesFeedParser):
+    """Parser przerywający pracę, gdy wiadomość ma za dużo lub zbyt głęboko zagnieżdżonych części"""
+
+    def __init__(self, limits=None):
+        super().__init__(policy=policy.default)
+        self._limits = limits or RENDER_LIMITS
+        self._parts = 0
+
+    def _new_message(self):
+        self._parts += 1
+        check_limit('max_parts', self._parts, self._limits)
+        check_limit('max_depth', len(self._msgstack) + 1, self._limits)
+        super()._new_message()
+
+
+def parse_eml_limited(content, limits=None):
+    """
+    Parsuje wiadomość porcjami, sprawdzając limity w trakcie czytania:
+    rozmiar, nagłówki, liczbę i zagnieżdżenie części oraz rozmiar załączników
+    """
+    check_limit('max_bytes', len(content), limits)
+
+    header_end = [end for end in (content.find(b'\n\n'), content.find(b'\n\r\n')) if end >= 0]
+    check_limit('max_header_bytes', min(header_end) if header_end else len(content), limits)
+
+    parser = LimitedFeedParser(limits)
+    for offset in range(0, len(content), PARSE_CHUNK_SIZE):
+        parser.feed(content[offset:offset + PARSE_CHUNK_SIZE])
+    message = parser.close()
+
+    for part in message.walk():
+        if not part.is_multipart() and part.get_filename():
+            check_limit('max_attachment_bytes', decoded_size(part), limits)
+    return message
+
+
+def limit_error_response(error):
+    return jsonify(error.to_dict()), 413
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Przekroczony MAX_CONTENT_LENGTH - odpowiedź JSON zamiast strony HTML"""
+    return jsonify({
+        'error': 'Przesłany plik jest zbyt duży',
+        'code': 'limit_exceeded',
+        'limit': 'max_upload_bytes',
+        'maximum': request.max_content_length,
+    }), 413
+
+
+# Metryki w formacie tekstowym Prometheus (/metrics)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+
+def format_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}' if names else ''
+
+
+class MetricsRegistry:
+    """
+    Liczniki i histogramy w pamięci procesu. Aktualizacja to jedna operacja
+    pod blokadą, więc metryki mogą być włączone stale.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.gauges = {}
+
+    def counter(self, name, help_text, labels=()):
+        self.metrics[name] = {'type': 'counter', 'help': help_text, 'labels': labels, 'values': {}}
+
+    def histogram(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        self.metrics[name] = {'type': 'histogram', 'help': help_text, 'labels': labels,
+                              'buckets': buckets, 'values': {}}
+
+    def gauge(self, name, help_text, labels, function):
+        """Wartości odczytywane przy każdym pobraniu metryk: function() -> {etykiety: wartość}"""
+        self.gauges[name] = {'type': 'gauge', 'help': help_text, 'labels': labels, 'function': function}
+
+    def inc(self, name, labels=(), amount=1):
+        values = self.metrics[name]['values']
+        with self.lock:
+            values[labels] = values.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        metric = self.metrics[name]
+        index = bisect_left(metric['buckets'], value)
+        with self.lock:
+            entry = metric['values'].get(labels)
+            if entry is None:
+                entry = metric['values'][labels] = [[0] * (len(metric['buckets']) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = []
+        with self.lock:
+            snapshot = [(name, metric, {key: (list(value[0]), value[1]) if metric['type'] == 'histogram' else value
+                                        for key, value in metric['values'].items()})
+                        for name, metric in self.metrics.items()]
+        for name, metric, values in snapshot:
+            lines += [f"# HELP {name} {metric['help']}", f"# TYPE {name} {metric['type']}"]
+            for key, value in sorted(values.items()):
+                if metric['type'] == 'counter':
+                    lines.append(f"{name}{format_labels(metric['labels'], key)} {value}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric['buckets'] + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(metric['labels'] + ('le',), key + (bound,))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(metric['labels'], key)} {total}")
+                lines.append(f"{name}_count{format_labels(metric['labels'], key)} {cumulative}")
+        for name, gauge in self.gauges.items():
+            lines += [f"# HELP {name} {gauge['help']}", f"# TYPE {name} gauge"]
+            for key, value in sorted(gauge['function']().items()):
+                lines.append(f"{name}{format_labels(gauge['labels'], key)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+metrics.counter('render_http_requests_total', 'Liczba żądań HTTP wg metody, trasy i statusu',
+                ('method', 'endpoint', 'status'))
+metrics.histogram('render_http_request_duration_seconds', 'Czas obsługi żądań HTTP', ('method', 'endpoint'))
+metrics.counter('render_http_request_bytes_total', 'Bajty odebrane w treści żądań', ('endpoint',))
+metrics.counter('render_http_response_bytes_total',
+                'Bajty wysłane w odpowiedziach (bez odpowiedzi strumieniowanych)', ('endpoint',))
+metrics.histogram('render_stage_duration_seconds', 'Czas etapów przetwarzania', ('stage',), STAGE_BUCKETS)
+metrics.counter('render_analysis_cache_total', 'Odczyty zapamiętanej analizy i walidacji wiadomości',
+                ('cache', 'result'))
+
+
+# Śledzenie (tracing) w modelu OpenTelemetry: spany z identyfikatorami trace/span,
+# kontekst W3C traceparent i eksporter bez zewnętrznego kolektora
+RENDER_TRACE_EXPORTER = os.environ.get('RENDER_TRACE_EXPORTER', '')  # '', 'console' lub 'file'
+RENDER_TRACE_FILE = os.environ.get('RENDER_TRACE_FILE', 'render-traces.jsonl')
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Span:
+    """Pojedynczy span; czasy w nanosekundach od epoki, jak w OTLP"""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = 'OK'
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': self.status,
+        }
+
+
+class SpanExporter:
+    """Odbiorca zakończonych spanów; własny eksporter (np. OTLP) wystarczy podmienić w tracer.exporter"""
+
+    def export(self, span):
+        raise NotImplementedError
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Wypisuje spany jako linie JSON na stderr"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class FileSpanExporter(SpanExporter):
+    """Dopisuje spany jako linie JSON do pliku (JSONL)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def create_span_exporter(name, path=RENDER_TRACE_FILE):
+    """Eksporter wg nazwy z RENDER_TRACE_EXPORTER; pusta nazwa wyłącza śledzenie"""
+    if not name:
+        return None
+    if name == 'console':
+        return ConsoleSpanExporter()
+    if name == 'file':
+        return FileSpanExporter(path)
+    raise ValueError(f'Nieznany eksporter spanów: {name}')
+
+
+class Tracer:
+    """
+    Tworzy spany i przekazuje zakończone do eksportera. Bieżący span jest
+    trzymany w zmiennej kontekstowej; bez eksportera (domyślnie) spany nie
+    powstają, a koszt to jedno sprawdzenie atrybutu.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self.current = contextvars.ContextVar('render_span', default=None)
+
+    def start(self, name, traceparent=None, **attributes):
+        """Rozpoczyna span potomny bieżącego (lub kontynuuje ślad z nagłówka traceparent)"""
+        parent = self.current.get()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            match = TRACEPARENT_PATTERN.match(traceparent or '')
+            trace_id, parent_id = match.group(1, 2) if match else (secrets.token_hex(16), None)
+        span = Span(name, trace_id, parent_id, attributes)
+        return span, self.current.set(span)
+
+    def end(self, span, token):
+        span.end_ns = time.time_ns()
+        try:
+            self.current.reset(token)
+        except ValueError:
+            # Odpowiedź strumieniowana kończy się poza kontekstem, w którym span otwarto
+            pass
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Błąd eksportu spanu {span.name}: {e}")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if self.exporter is None:
+            yield None
+            return
+        span, token = self.start(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'ERROR'
+            span.attributes['exception.type'] = type(e).__name__
+            raise
+        finally:
+            self.end(span, token)
+
+    def set_attributes(self, **attributes):
+        """Dodaje atrybuty do bieżącego spanu (bez efektu przy wyłączonym śledzeniu)"""
+        span = self.current.get()
+        if span is not None:
+            span.set_attributes(**attributes)
+
+
+tracer = Tracer(create_span_exporter(RENDER_TRACE_EXPORTER))
+
+
+def submit_in_context(executor, function, *args, context=None):
+    """Uruchamia zadanie w puli wątków z kontekstem bieżącego (lub podanego) spanu"""
+    context = context.copy() if context is not None else contextvars.copy_context()
+    return executor.submit(context.run, function, *args)
+
+
+@contextmanager
+def stage(name):
+    """Mierzy czas etapu: decode, parse, validate, render, rasterize (i otwiera span, gdy śledzenie jest włączone)"""
+    started = time.perf_counter()
+    try:
+        with tracer.span(name):
+            yield
+    finally:
+        metrics.observe('render_stage_duration_seconds', time.perf_counter() - started, (name,))
+
+
 class EMLProcessor:
     def __init__(self):
         self.parsed_message = None
+        self._analysis = None
+        self._validation = None
 
     def load_eml_content(self, content):
-        """Wczytuje zawartość EML z bytes"""
+        """
+        Wczytuje zawartość EML z bytes. Przekroczenie limitów zasobów
+        zgłaszane jest wyjątkiem MessageLimitError.
+        """
+        self._analysis = None
+        self._validation = None
         try:
             if isinstance(content, str):
                 content = content.encode('utf-8')
-            self.parsed_message = BytesParser(policy=policy.default).parsebytes(content)
+            with stage('parse'):
+                tracer.set_attributes(**{'email.size_bytes': len(content)})
+                self.parsed_message = parse_eml_limited(content)
             return True
+        except MessageLimitError:
+            self.parsed_message = None
+            raise
         except Exception as e:
             logger.error(f"Błąd parsowania EML: {e}")
             return False
 
     def validate_eml(self):
-        """Waliduje strukturę EML"""
+        """Waliduje strukturę EML (wynik zapamiętywany)"""
         if not self.parsed_message:
             return False, ["Brak wczytanej wiadomości"]
 
-        issues = []
-        required_headers = ['From', 'To', 'Subject']
+        if self._validation is not None:
+            metrics.inc('render_analysis_cache_total', ('validation', 'hit'))
+            return self._validation
+        metrics.inc('render_analysis_cache_total', ('validation', 'miss'))
 
-        for header in required_headers:
-            if not self.parsed_message.get(header):
-                issues.append(f"Brak nagłówka: {header}")
+        with stage('validate'):
+            issues = []
+            required_headers = ['From', 'To', 'Subject']
 
-        if self.parsed_message.defects:
-            for defect in self.parsed_message.defects:
-                issues.append(f"Defekt struktury: {defect}")
+            for header in required_headers:
+                if not self.parsed_message.get(header):
+                    issues.append(f"Brak nagłówka: {header}")
 
-        return len(issues) == 0, issues
+            if self.parsed_message.defects:
+                for defect in self.parsed_message.defects:
+                    issues.append(f"Defekt struktury: {defect}")
 
-    def extract_content(self):
-        """Wyodrębnia zawartość wiadomości"""
+            self._validation = (len(issues) == 0, issues)
+            tracer.set_attributes(**{'email.valid': not issues, 'email.issues_count': len(issues)})
+        return self._validation
+
+    def analyze(self):
+        """
+        Analizuje wiadomość w jednym przejściu przez drzewo MIME i jednym
+        skanie treści HTML. Wynik jest zapamiętywany na instancji i
+        współdzielony przez walidację, /api/info i renderowanie.
+        """
         if not self.parsed_message:
             return None
 
-        content = {
-            'headers': dict(self.parsed_message.items()),
+        if self._analysis is not None:
+            metrics.inc('render_analysis_cache_total', ('analysis', 'hit'))
+            return self._analysis
+        metrics.inc('render_analysis_cache_total', ('analysis', 'miss'))
+
+        with stage('decode'):
+            self._analysis = self._decode()
+            tracer.set_attributes(**{
+                'email.parts_count': self._analysis['parts_count'],
+                'email.attachments_count': len(self._analysis['attachments']),
+                'email.attachments_bytes': self._analysis['attachments_bytes'],
+            })
+        return self._analysis
+
+    def _decode(self):
+        """Dekoduje treść tekstową i HTML oraz opisuje załączniki"""
+        message = self.parsed_message
+        analysis = {
+            'headers': dict(message.items()),
             'text_body': '',
             'html_body': '',
-            'attachments': []
+            'attachments': [],
+            'is_multipart': message.is_multipart(),
+            'content_type': message.get_content_type(),
+            'parts_count': 0,
+            'attachments_bytes': 0,
         }
 
-        if self.parsed_message.is_multipart():
-            for part in self.parsed_message.walk():
+        if analysis['is_multipart']:
+            for part in message.walk():
+                analysis['parts_count'] += 1
                 content_type = part.get_content_type()
 
                 if content_type == 'text/plain':
-                    content['text_body'] = part.get_content()
+                    analysis['text_body'] = part.get_content()
                 elif content_type == 'text/html':
-                    content['html_body'] = part.get_content()
+                    analysis['html_body'] = part.get_content()
                 elif part.get_filename():
-                    content['attachments'].append({
+                    size = decoded_size(part)
+                    analysis['attachments_bytes'] += size
+                    analysis['attachments'].append({
                         'filename': part.get_filename(),
                         'content_type': content_type,
-                        'size': len(part.get_payload(decode=True) or b'')
+                        'size': size
                     })
         else:
-            if self.parsed_message.get_content_type() == 'text/html':
-                content['html_body'] = self.parsed_message.get_content()
+            analysis['parts_count'] = 1
+            if analysis['content_type'] == 'text/html':
+                analysis['html_body'] = message.get_content()
             else:
-                content['text_body'] = self.parsed_message.get_content()
+                analysis['text_body'] = message.get_content()
 
-        return content
+        analysis['html_features'] = scan_html_features(analysis['html_body'])
+        return analysis
+
+    def extract_content(self):
+        """Wyodrębnia zawartość wiadomości"""
+        return self.analyze()
 
     def render_to_html(self):
         """Renderuje EML do HTML"""
-        content = self.extract_content()
+        content = self.analyze()
         if not content:
             return None
 
@@ -302,17 +758,19 @@ class EMLProcessor:
         """
 
         from jinja2 import Template
-        template = Template(html_template)
 
-        return template.render(
-            headers=content['headers'],
-            html_body=content['html_body'],
-            text_body=content['text_body'],
-            attachments=content['attachments'],
-            is_valid=is_valid,
-            issues=issues,
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        )
+        with stage('render'):
+            template = Template(html_template)
+
+            return template.render(
+                headers=content['headers'],
+                html_body=content['html_body'],
+                text_body=content['text_body'],
+                attachments=content['attachments'],
+                is_valid=is_valid,
+                issues=issues,
+                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
 
 
 def html_to_png(html_content, output_path):
@@ -335,7 +793,9 @@ def html_to_png(html_content, output_path):
             output_path
         ]
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with stage('rasterize'):
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            tracer.set_attributes(**{'process.command': cmd[0], 'process.exit_code': result.returncode})
 
         # Posprzątaj
         os.unlink(html_temp_path)
@@ -349,7 +809,477 @@ def html_to_png(html_content, output_path):
         return False, f"Błąd konwersji: {str(e)}"
 
 
+def render_eml_bytes(eml_content, output_format, png_path=None):
+    """
+    Renderuje pojedynczą wiadomość EML
+
+    Returns:
+        Słownik z wynikiem walidacji i wynikiem renderowania: treścią HTML
+        lub ścieżką do pliku PNG (dla output_format == 'png')
+    """
+    with tracer.span('render_message', **{'render.output_format': output_format}):
+        processor = EMLProcessor()
+        if not processor.load_eml_content(eml_content):
+            raise ValueError('Nie można sparsować pliku EML')
+
+        is_valid, issues = processor.validate_eml()
+
+        html_content = processor.render_to_html()
+        if not html_content:
+            raise ValueError('Nie można wyrenderować zawartości')
+
+        result = {'valid': is_valid, 'issues': issues, 'output': html_content}
+        if output_format == 'png':
+            success, message = html_to_png(html_content, png_path)
+            if not success:
+                raise RuntimeError(f'Błąd konwersji do PNG: {message}')
+            result['output'] = png_path
+
+        return result
+
+
+class CallbackURLError(ValueError):
+    """Niedozwolony adres callback_url"""
+
+
+def check_callback_url(url):
+    """
+    Sprawdza adres callback_url przed wysłaniem do niego statusu zadania
+
+    Wymaga schematu http(s). Przy ustawionym RENDER_CALLBACK_ALLOWED_HOSTS host
+    musi być na liście, w przeciwnym razie żaden z adresów IP hosta nie może
+    być prywatny, pętli zwrotnej, link-local ani zarezerwowany (ochrona przed SSRF).
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise CallbackURLError(f"callback_url musi być adresem http(s): {url}")
+
+    host = parsed.hostname.lower()
+    if RENDER_CALLBACK_ALLOWED_HOSTS:
+        if host not in RENDER_CALLBACK_ALLOWED_HOSTS:
+            raise CallbackURLError(f"Host callback_url nie jest dozwolony: {host}")
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None)}
+    except (socket.gaierror, ValueError) as e:
+        raise CallbackURLError(f"Nie można rozwiązać hosta callback_url {host}: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+                or ip.is_multicast or ip.is_unspecified):
+            raise CallbackURLError(f"callback_url wskazuje na adres niepubliczny: {host} ({ip})")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Nie podąża za przekierowaniami - mogłyby ominąć check_callback_url"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class RenderJobQueue:
+    """
+    Asynchroniczna kolejka zadań renderowania.
+
+    Każdy format wyjściowy ma własny tor (osobną pulę wątków i własny limit
+    oczekujących zadań), więc tanie renderowanie HTML nigdy nie czeka
+    w kolejce za wolną rasteryzacją PNG.
+    """
+
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    def __init__(self, html_workers=RENDER_HTML_WORKERS, png_workers=RENDER_PNG_WORKERS,
+                 max_pending=RENDER_MAX_PENDING, job_ttl=RENDER_JOB_TTL):
+        self.lanes = {
+            'html': ThreadPoolExecutor(max_workers=html_workers, thread_name_prefix='render-html'),
+            'png': ThreadPoolExecutor(max_workers=png_workers, thread_name_prefix='render-png'),
+        }
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, eml_content, output_format, filename, callback_url=None):
+        """
+        Dodaje zadanie do toru odpowiadającego formatowi wyjściowemu
+
+        Returns:
+            Słownik zadania lub None, jeśli tor jest pełny
+        """
+        if output_format not in self.lanes:
+            raise ValueError(f"Nieobsługiwany format wyjściowy: {output_format}")
+
+        with self.lock:
+            self._purge_expired()
+            if self.pending(output_format) >= self.max_pending:
+                return None
+
+            job = {
+                'id': str(uuid.uuid4()),
+                'lane': output_format,
+                'filename': filename,
+                'status': 'queued',
+                'callback_url': callback_url,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'result': None,
+            }
+            self.jobs[job['id']] = job
+            snapshot = dict(job)
+
+        submit_in_context(self.lanes[output_format], self._run, job, eml_content)
+        return snapshot
+
+    def get(self, job_id):
+        """Kopia stanu zadania (odczytana pod blokadą) lub None"""
+        with self.lock:
+            self._purge_expired()
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def depth(self):
+        """Liczba zadań oczekujących lub wykonywanych w każdym torze"""
+        with self.lock:
+            return {lane: self.pending(lane) for lane in self.lanes}
+
+    def pending(self, lane):
+        """Liczba zadań oczekujących lub wykonywanych w danym torze (wywoływane pod blokadą)"""
+        return sum(1 for job in self.jobs.values()
+                   if job['lane'] == lane and job['status'] in self.ACTIVE_STATUSES)
+
+    def _run(self, job, eml_content):
+        # Stan zadania zmieniany tylko pod blokadą - get() zwraca jego kopię
+        with self.lock:
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+
+        update = {}
+        try:
+            png_path = os.path.join(OUTPUT_DIR, f"{job['id']}.png")
+            update['result'] = render_eml_bytes(eml_content, job['lane'], png_path)['output']
+            update['status'] = 'done'
+        except Exception as e:
+            logger.error(f"Błąd zadania {job['id']}: {e}")
+            update['status'] = 'failed'
+            update['error'] = str(e)
+        finally:
+            with self.lock:
+                job.update(update)
+                job['finished_at'] = time.time()
+
+        if job['callback_url']:
+            self._notify(job)
+
+    def _notify(self, job):
+        """Wysyła status zakończonego zadania na adres callback"""
+        try:
+            # Ponowne sprawdzenie: rekord DNS mógł się zmienić od przyjęcia zadania
+            check_callback_url(job['callback_url'])
+            with self.lock:
+                snapshot = dict(job)
+            request_data = json.dumps(job_status(snapshot)).encode('utf-8')
+            callback = urllib.request.Request(
+                job['callback_url'],
+                data=request_data,
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            _callback_opener.open(callback, timeout=10).close()
+        except Exception as e:
+            logger.warning(f"Błąd wywołania callback dla zadania {job['id']}: {e}")
+
+    def _purge_expired(self):
+        """Usuwa zakończone zadania starsze niż job_ttl (wywoływane pod blokadą)"""
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['finished_at'] and now - job['finished_at'] > self.job_ttl]
+        for job_id in expired:
+            job = self.jobs.pop(job_id)
+            if job['lane'] == 'png' and job['result'] and os.path.exists(job['result']):
+                os.unlink(job['result'])
+
+
+def job_status(job):
+    """Publiczny opis zadania (bez wyniku) z kopii zwróconej przez RenderJobQueue"""
+    status = {
+        'id': job['id'],
+        'status': job['status'],
+        'output_format': job['lane'],
+        'filename': job['filename'],
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'started_at': datetime.fromtimestamp(job['started_at']).isoformat() if job['started_at'] else None,
+        'finished_at': datetime.fromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None,
+        'error': job['error'],
+    }
+    if job['status'] == 'done':
+        status['result_url'] = f"/render/jobs/{job['id']}/result"
+    return status
+
+
+job_queue = RenderJobQueue()
+
+
+def job_queue_depth():
+    """Głębokość kolejki (zadania oczekujące i wykonywane) w każdym torze"""
+    return {(lane,): pending for lane, pending in job_queue.depth().items()}
+
+
+metrics.gauge('render_job_queue_depth', 'Zadania oczekujące lub wykonywane w torze kolejki',
+              ('lane',), job_queue_depth)
+
+
+class ArchiveError(ValueError):
+    """Nieobsługiwany lub uszkodzony plik archiwum"""
+
+
+class _ArchiveBudget:
+    """
+    Pilnuje limitów rozpakowywania: rozmiar pliku sprawdzany jest przed
+    czytaniem (z nagłówka archiwum), a czytanie i tak kończy się na limicie,
+    więc archiwum nie może rozpakować się w pamięci ponad limity.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = RENDER_BATCH_MAX_BYTES if limit is None else limit
+        self.total = 0
+
+    def read(self, declared_size, open_member):
+        """bytes pliku, MessageLimitError dla zbyt dużego pliku lub None po wyczerpaniu limitu archiwum"""
+        maximum = RENDER_LIMITS['max_bytes']
+        if maximum and declared_size > maximum:
+            return MessageLimitError('max_bytes', maximum, declared_size)
+        if self.limit and self.total + declared_size > self.limit:
+            logger.warning(f"Archiwum przekracza limit {self.limit} rozpakowanych bajtów - pominięto resztę")
+            return None
+        with open_member() as f:
+            content = f.read(maximum + 1) if maximum else f.read()
+        if maximum and len(content) > maximum:
+            return MessageLimitError('max_bytes', maximum, len(content))
+        self.total += len(content)
+        return content
+
+
+def iter_archive_messages(path):
+    """
+    Zwraca kolejne wiadomości (nazwa, bytes) z pliku archiwum ZIP, TAR lub mbox.
+    Z archiwów ZIP/TAR brane są tylko pliki *.eml. Zamiast treści pliku
+    większego niż RENDER_MAX_BYTES zwracany jest MessageLimitError (plik nie
+    jest rozpakowywany), a po przekroczeniu RENDER_BATCH_MAX_BYTES
+    rozpakowanych bajtów archiwum nie jest czytane dalej. Wiadomości są
+    czytane z dysku pojedynczo.
+    """
+    budget = _ArchiveBudget()
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith('.eml'):
+                    content = budget.read(info.file_size, lambda: archive.open(info))
+                    if content is None:
+                        return
+                    yield info.filename, content
+        return
+
+    try:
+        archive = tarfile.open(path, mode='r:*')
+    except tarfile.TarError:
+        archive = None
+
+    if archive is not None:
+        with archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith('.eml'):
+                    content = budget.read(member.size, lambda: archive.extractfile(member))
+                    if content is None:
+                        return
+                    yield member.name, content
+        return
+
+    with open(path, 'rb') as f:
+        is_mbox = f.read(5) == b'From '
+    if is_mbox:
+        mbox = mailbox.mbox(path, create=False)
+        try:
+            for index, key in enumerate(mbox.iterkeys()):
+                yield f'message_{index + 1}.eml', mbox.get_bytes(key)
+        finally:
+            mbox.close()
+        return
+
+    raise ArchiveError('Nieobsługiwany format archiwum (oczekiwano ZIP, TAR lub mbox)')
+
+
+def iter_uploaded_archive(file):
+    """
+    iter_archive_messages dla przesłanego pliku: archiwum jest zapisywane
+    porcjami do TEMP_DIR (nie jest czytane w całości do pamięci) i usuwane
+    po przeczytaniu wszystkich wiadomości lub zamknięciu generatora
+    """
+    fd, path = tempfile.mkstemp(suffix='.archive', dir=TEMP_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            file.save(f)
+        yield from iter_archive_messages(path)
+    finally:
+        os.unlink(path)
+
+
+def render_batch(messages, output_format, workers=RENDER_BATCH_WORKERS, context=None):
+    """
+    Renderuje wiadomości na puli wątków, zwracając wyniki w kolejności
+    ukończenia. Liczba wiadomości w toku jest ograniczona do 2 * workers,
+    więc pamięć nie rośnie z rozmiarem archiwum. Spany wiadomości trafiają
+    do śladu z context (generator startuje dopiero przy strumieniowaniu).
+    """
+    batch_id = str(uuid.uuid4())
+
+    def render_one(index, name, eml_content):
+        result = {'index': index, 'name': name, 'success': False, 'error': None}
+        try:
+            if isinstance(eml_content, MessageLimitError):
+                # Plik archiwum odrzucony przed rozpakowaniem
+                raise eml_content
+            png_path = os.path.join(OUTPUT_DIR, f'{batch_id}_{index}.png')
+            result.update(render_eml_bytes(eml_content, output_format, png_path))
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e)
+            if isinstance(e, MessageLimitError):
+                result['code'] = e.code
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render-batch') as executor:
+        in_flight = set()
+        for index, (name, eml_content) in enumerate(messages):
+            if index >= RENDER_BATCH_MAX_MESSAGES:
+                logger.warning(f"Archiwum przekracza limit {RENDER_BATCH_MAX_MESSAGES} wiadomości - pominięto resztę")
+                break
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            in_flight.add(submit_in_context(executor, render_one, index, name, eml_content, context=context))
+
+        for future in as_completed(in_flight):
+            yield future.result()
+
+
+class StreamBuffer(io.RawIOBase):
+    """Bufor do strumieniowego zapisu ZIP - zwraca zapisane fragmenty przez drain()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def batch_output_name(result, output_format):
+    stem = Path(result['name']).stem or 'message'
+    return f"{result['index'] + 1:05d}_{stem}.{output_format}"
+
+
+def stream_batch_ndjson(results, output_format):
+    """Strumieniuje wyniki jako NDJSON - jedna linia na wiadomość"""
+    for result in results:
+        output = result.pop('output', None)
+        if output is not None and output_format == 'png':
+            with open(output, 'rb') as f:
+                result['png_base64'] = base64.b64encode(f.read()).decode('ascii')
+            os.unlink(output)
+        elif output is not None:
+            result['html'] = output
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+
+
+def stream_batch_zip(results, output_format):
+    """Strumieniuje wyniki jako archiwum ZIP z plikiem manifest.json na końcu"""
+    buffer = StreamBuffer()
+    manifest = []
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            output = result.pop('output', None)
+            if output is not None:
+                result['output'] = batch_output_name(result, output_format)
+                if output_format == 'png':
+                    archive.write(output, result['output'])
+                    os.unlink(output)
+                else:
+                    archive.writestr(result['output'], output)
+            manifest.append(result)
+            yield buffer.drain()
+
+        manifest.sort(key=lambda item: item['index'])
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2, ensure_ascii=False))
+
+    yield buffer.drain()
+
+
 # Endpointy API
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if tracer.exporter is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.trace = tracer.start(f'{request.method} {route}', request.headers.get('traceparent'), **{
+            'http.request.method': request.method,
+            'http.route': route,
+            'http.request.body.size': request.content_length or 0,
+        })
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Liczba żądań, czas obsługi i rozmiary treści wg trasy (szablon trasy, nie ścieżka)"""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    metrics.inc('render_http_requests_total', (request.method, endpoint, str(response.status_code)))
+    metrics.observe('render_http_request_duration_seconds', elapsed, (request.method, endpoint))
+    metrics.inc('render_http_request_bytes_total', (endpoint,), request.content_length or 0)
+    if not response.is_streamed:
+        metrics.inc('render_http_response_bytes_total', (endpoint,), response.content_length or 0)
+    trace = g.get('trace')
+    if trace is not None:
+        span = trace[0]
+        span.set_attributes(**{'http.response.status_code': response.status_code})
+        if response.status_code >= 500:
+            span.status = 'ERROR'
+        response.headers['traceparent'] = span.traceparent()
+    return response
+
+
+@app.teardown_request
+def end_request_span(error=None):
+    """Kończy span żądania także wtedy, gdy widok zgłosił wyjątek"""
+    trace = g.pop('trace', None)
+    if trace is not None:
+        if error is not None:
+            trace[0].status = 'ERROR'
+        tracer.end(*trace)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metryki w formacie tekstowym Prometheus"""
+    return Response(metrics.render(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
 @app.route('/', methods=['GET'])
 def index():
     """Strona główna z formularzem"""
@@ -389,6 +1319,10 @@ def index():
         <h3>📚 API Endpoints:</h3>
         <ul>
             <li><code>POST /render</code> - Renderuje plik EML</li>
+            <li><code>POST /render/jobs</code> - Dodaje renderowanie do kolejki (zwraca id zadania)</li>
+            <li><code>GET /render/jobs/&lt;id&gt;</code> - Status zadania renderowania</li>
+            <li><code>GET /render/jobs/&lt;id&gt;/result</code> - Wynik zadania renderowania</li>
+            <li><code>POST /render/batch</code> - Renderuje wszystkie wiadomości z archiwum ZIP/TAR/mbox</li>
             <li><code>POST /api/validate</code> - Waliduje plik EML</li>
             <li><code>GET /api/health</code> - Status serwera</li>
         </ul>
@@ -449,11 +1383,121 @@ def render_eml():
         else:
             return jsonify({'error': 'Nieobsługiwany format wyjściowy'}), 400
 
+    except MessageLimitError as e:
+        return limit_error_response(e)
     except Exception as e:
         logger.error(f"Błąd renderowania: {e}")
         return jsonify({'error': f'Błąd serwera: {str(e)}'}), 500
 
 
+@app.route('/render/jobs', methods=['POST'])
+def create_render_job():
+    """Dodaje renderowanie pliku EML do kolejki asynchronicznej"""
+    if 'eml_file' not in request.files:
+        return jsonify({'error': 'Brak pliku EML'}), 400
+
+    file = request.files['eml_file']
+    if file.filename == '':
+        return jsonify({'error': 'Nie wybrano pliku'}), 400
+
+    output_format = request.form.get('output_format', 'html')
+    if output_format not in job_queue.lanes:
+        return jsonify({'error': 'Nieobsługiwany format wyjściowy'}), 400
+
+    eml_content = file.read()
+    try:
+        # Odrzuć za duże wiadomości przed kolejkowaniem
+        check_limit('max_bytes', len(eml_content))
+    except MessageLimitError as e:
+        return limit_error_response(e)
+
+    callback_url = request.form.get('callback_url') or None
+    if callback_url:
+        try:
+            check_callback_url(callback_url)
+        except CallbackURLError as e:
+            return jsonify({'error': str(e)}), 400
+
+    job = job_queue.submit(
+        eml_content,
+        output_format,
+        file.filename,
+        callback_url=callback_url
+    )
+    if job is None:
+        return jsonify({'error': 'Kolejka renderowania jest pełna, spróbuj później'}), 503
+
+    return jsonify(job_status(job)), 202, {'Location': f"/render/jobs/{job['id']}"}
+
+
+@app.route('/render/jobs/<job_id>', methods=['GET'])
+def get_render_job(job_id):
+    """Zwraca status zadania renderowania"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie znaleziono zadania'}), 404
+
+    return jsonify(job_status(job))
+
+
+@app.route('/render/jobs/<job_id>/result', methods=['GET'])
+def get_render_job_result(job_id):
+    """Pobiera wynik zakończonego zadania renderowania"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie znaleziono zadania'}), 404
+
+    if job['status'] == 'failed':
+        return jsonify(job_status(job)), 500
+    if job['status'] != 'done':
+        return jsonify(job_status(job)), 409
+
+    if job['lane'] == 'html':
+        return job['result'], 200, {'Content-Type': 'text/html; charset=utf-8'}
+
+    return send_file(job['result'], mimetype='image/png', as_attachment=True,
+                     download_name=f"{job['filename']}.png")
+
+
+@app.route('/render/batch', methods=['POST'])
+def render_batch_archive():
+    """Renderuje wszystkie wiadomości z archiwum ZIP/TAR/mbox w jednym żądaniu"""
+    if 'archive' not in request.files:
+        return jsonify({'error': 'Brak pliku archiwum'}), 400
+
+    file = request.files['archive']
+    if file.filename == '':
+        return jsonify({'error': 'Nie wybrano pliku'}), 400
+
+    output_format = request.form.get('output_format', 'html')
+    if output_format not in ('html', 'png'):
+        return jsonify({'error': 'Nieobsługiwany format wyjściowy'}), 400
+
+    response_format = request.form.get('response_format', 'zip')
+    if response_format not in ('zip', 'ndjson'):
+        return jsonify({'error': 'Nieobsługiwany format odpowiedzi'}), 400
+
+    messages = iter_uploaded_archive(file)
+    try:
+        # Pobierz pierwszą wiadomość, aby zgłosić błąd formatu przed rozpoczęciem strumienia
+        first = next(messages, None)
+    except (ArchiveError, zipfile.BadZipFile, tarfile.TarError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if first is None:
+        return jsonify({'error': 'Archiwum nie zawiera wiadomości EML'}), 400
+
+    results = render_batch(itertools.chain([first], messages), output_format, context=contextvars.copy_context())
+
+    if response_format == 'ndjson':
+        return Response(stream_with_context(stream_batch_ndjson(results, output_format)),
+                        mimetype='application/x-ndjson')
+
+    return Response(stream_with_context(stream_batch_zip(results, output_format)),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{Path(file.filename).stem}_rendered.zip"'})
+
+
 @app.route('/api/validate', methods=['POST'])
 def validate_eml():
     """Waliduje plik EML"""
@@ -476,7 +1520,7 @@ def validate_eml():
             }), 400
 
         is_valid, issues = processor.validate_eml()
-        content = processor.extract_content()
+        content = processor.analyze()
 
         result = {
             'valid': is_valid,
@@ -491,6 +1535,8 @@ def validate_eml():
 
         return jsonify(result)
 
+    except MessageLimitError as e:
+        return limit_error_response(e)
     except Exception as e:
         logger.error(f"Błąd walidacji: {e}")
         return jsonify({
@@ -530,7 +1576,7 @@ def get_eml_info():
             return jsonify({'error': 'Nie można sparsować pliku EML'}), 400
 
         is_valid, issues = processor.validate_eml()
-        content = processor.extract_content()
+        content = processor.analyze()
 
         # Szczegółowa analiza
         info = {
@@ -542,11 +1588,13 @@ def get_eml_info():
             },
             'headers': content['headers'],
             'structure': {
-                'is_multipart': processor.parsed_message.is_multipart(),
-                'content_type': processor.parsed_message.get_content_type(),
+                'is_multipart': content['is_multipart'],
+                'content_type': content['content_type'],
+                'parts_count': content['parts_count'],
                 'has_html': bool(content['html_body']),
                 'has_text': bool(content['text_body']),
-                'attachments_count': len(content['attachments'])
+                'attachments_count': len(content['attachments']),
+                'attachments_bytes': content['attachments_bytes']
             },
             'attachments': content['attachments'],
             'security': {
@@ -567,14 +1615,13 @@ def get_eml_info():
         if content['html_body']:
             info['html_analysis'] = {
                 'length': len(content['html_body']),
-                'has_scripts': '<script' in content['html_body'].lower(),
-                'has_forms': '<form' in content['html_body'].lower(),
-                'has_images': '<img' in content['html_body'].lower(),
-                'has_links': '<a' in content['html_body'].lower()
+                **content['html_features']
             }
 
         return jsonify(info)
 
+    except MessageLimitError as e:
+        return limit_error_response(e)
     except Exception as e:
         logger.error(f"Błąd analizy: {e}")
         return jsonify({'error': f'Błąd serwera: {str(e)}'}), 500
@@ -585,6 +1632,9 @@ if __name__ == '__main__':
     print("📡 Dostępne endpointy:")
     print("   GET  /                 - Interfejs web")
     print("   POST /render           - Renderowanie EML")
+    print("   POST /render/jobs      - Renderowanie asynchroniczne")
+    print("   GET  /render/jobs/<id> - Status zadania")
+    print("   POST /render/batch     - Renderowanie wsadowe ZIP/TAR/mbox")
     print("   POST /api/validate     - Walidacja EML")
     print("   POST /api/info         - Szczegółowe info")
     print("   GET  /api/health       - Status serwera")
@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Body
+from fastapi import FastAPI, HTTPException, UploadFile, File, Body, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from emllm.core import emllmParser, emllmError
-from emllm.validator import emllmValidator
+from emllm.core import emllmParser, emllmError, emllmLimitError, ParseLimits, json_default
+from emllm.validator import emllmValidator, load_rules
+from emllm import metrics, profiling
 import json
 import logging
+import os
+import threading
+import time
+import uuid
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +22,136 @@ app = FastAPI(
     version="0.1.0"
 )
 
+def _http_error(error: Exception) -> HTTPException:
+    """400 for bad input, 413 with the limit details when a resource limit was hit"""
+    if isinstance(error, emllmLimitError):
+        return HTTPException(status_code=413, detail=error.to_dict())
+    return HTTPException(status_code=400, detail=str(error))
+
+@app.exception_handler(emllmLimitError)
+async def limit_error_handler(request: Request, exc: emllmLimitError):
+    return JSONResponse(status_code=413, content={"detail": exc.to_dict()})
+
+@app.middleware("http")
+async def reject_oversized_requests(request: Request, call_next):
+    """Refuse bodies that cannot hold an acceptable message before reading them"""
+    max_bytes = ParseLimits.from_env().max_bytes
+    length = request.headers.get('content-length')
+    # JSON string escaping can roughly double the size of the raw message
+    if max_bytes is not None and length and length.isdigit() and int(length) > 2 * max_bytes:
+        error = emllmLimitError('max_request_bytes', 2 * max_bytes, int(length))
+        return JSONResponse(status_code=413, content={"detail": error.to_dict()})
+    return await call_next(request)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware counting requests, latency and body bytes per route"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    def _route(self, endpoint) -> str:
+        # Route templates (not raw paths) keep label cardinality bounded
+        if self._routes is None:
+            self._routes = {route.endpoint: route.path for route in app.routes if hasattr(route, 'endpoint')}
+        return self._routes.get(endpoint, 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        received = sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                sent += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            endpoint = self._route(scope.get('endpoint'))
+            metrics.REQUESTS.inc(scope['method'], endpoint, str(status))
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, scope['method'], endpoint)
+            metrics.REQUEST_BYTES.inc(endpoint, amount=received)
+            metrics.RESPONSE_BYTES.inc(endpoint, amount=sent)
+
+app.add_middleware(MetricsMiddleware)
+
+# Only one request is profiled at a time: cProfile cannot be enabled twice
+_profile_lock = threading.Lock()
+
+class ProfilingMiddleware:
+    """
+    Profile requests sent with ``X-Emllm-Profile: cprofile`` or ``sample``.
+
+    Enabled only when EMLLM_PROFILE_DIR is set; the profile is saved there
+    and its file name returned in ``X-Emllm-Profile-File``. Stage and MIME
+    part timings are returned in a ``Server-Timing`` header. Other requests
+    handled concurrently on the event loop show up in the profile too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        mode = None
+        for name, value in scope['headers']:
+            if name == b'x-emllm-profile':
+                mode = value.decode('latin-1').strip().lower()
+        directory = os.environ.get('EMLLM_PROFILE_DIR')
+        if mode is None or not directory or mode not in profiling.PROFILE_MODES:
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, self._with_headers(send, [(b'x-emllm-profile', b'busy')]))
+            return
+
+        filename = f"{uuid.uuid4().hex}{profiling.PROFILE_SUFFIXES[mode]}"
+        try:
+            with profiling.emllmProfiler(mode) as profiler:
+                async def profiled_send(message):
+                    if message['type'] == 'http.response.start':
+                        message = self._add_headers(message, [
+                            (b'server-timing', profiling.server_timing(profiler.spans).encode('latin-1')),
+                            (b'x-emllm-profile-file', filename.encode('latin-1')),
+                        ])
+                    await send(message)
+
+                await self.app(scope, receive, profiled_send)
+            profiler.save(os.path.join(directory, filename))
+        finally:
+            _profile_lock.release()
+
+    @staticmethod
+    def _add_headers(message, headers):
+        return {**message, 'headers': list(message.get('headers', [])) + headers}
+
+    def _with_headers(self, send, headers):
+        async def wrapped(message):
+            if message['type'] == 'http.response.start':
+                message = self._add_headers(message, headers)
+            await send(message)
+        return wrapped
+
+app.add_middleware(ProfilingMiddleware)
+
 class EmailMessage(BaseModel):
     headers: Dict[str, str] = Field(..., description="Email headers")
     body: str = Field(..., description="Email body content")
@@ -25,6 +161,10 @@ class emllmRequest(BaseModel):
     content: str = Field(..., description="emllm content")
     validate: bool = Field(default=False, description="Validate message structure")
 
+class emllmGenerateRequest(BaseModel):
+    message: Dict[str, Any] = Field(..., description="Message structure (headers, body, attachments)")
+    validate: bool = Field(default=False, description="Validate message structure")
+
 class emllmResponse(BaseModel):
     message: str = Field(..., description="Processed message")
     error: Optional[str] = None
@@ -35,47 +175,93 @@ async def parse_emllm(request: emllmRequest):
     """Parse emllm content into structured format"""
     try:
         parser = emllmParser()
-        message = parser.parse(request.content)
-        result = parser.to_dict(message)
-        return emllmResponse(message=json.dumps(result, indent=2))
+        with metrics.stage('parse'):
+            message = parser.parse(request.content)
+        profiling.record_parts(message)
+        with metrics.stage('to_dict'):
+            result = parser.to_dict(message)
+        with metrics.stage('serialize'):
+            return emllmResponse(message=json.dumps(result, indent=2))
     except emllmError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raise _http_error(e)
+
+# Bytes per chunk when streaming a generated message
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def _wants_message(http_request: Request) -> bool:
+    return 'message/rfc822' in http_request.headers.get('accept', '')
+
+def _message_stream(data: bytes):
+    view = memoryview(data)
+    for offset in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield bytes(view[offset:offset + STREAM_CHUNK_SIZE])
+
+def _message_response(parser: emllmParser, message) -> StreamingResponse:
+    """Raw message as a streamed message/rfc822 response (serialized once, sent in chunks)"""
+    return StreamingResponse(_message_stream(parser.to_bytes(message)), media_type='message/rfc822')
 
 @app.post("/generate", response_model=emllmResponse)
-async def generate_emllm(request: emllmRequest):
-    """Generate emllm from structured format"""
+async def generate_emllm(request: emllmGenerateRequest, http_request: Request):
+    """Generate emllm from structured format (raw message/rfc822 stream if the client accepts it)"""
     try:
         parser = emllmParser()
         validator = emllmValidator()
         
         # Validate if requested
         if request.validate:
-            validator.validate(request.message)
+            with metrics.stage('validate'):
+                validator.validate(request.message)
         
         # Generate email message
-        email_message = parser.from_dict(request.message)
-        return emllmResponse(message=email_message.as_string())
+        with metrics.stage('from_dict'):
+            email_message = parser.from_dict(request.message)
+        with metrics.stage('serialize'):
+            if _wants_message(http_request):
+                return _message_response(parser, email_message)
+            return emllmResponse(message=parser.to_bytes(email_message).decode('utf-8', 'replace'))
     except (emllmError, ValueError) as e:
         logger.error(f"Error generating message: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
+        raise _http_error(e)
+
+_validators: Dict[Optional[str], emllmValidator] = {}
+
+def _validator(rules_path: Optional[str]) -> emllmValidator:
+    """Validator for a rule file, compiled once per path"""
+    if rules_path not in _validators:
+        _validators[rules_path] = emllmValidator(
+            log_errors=False, rules=load_rules(rules_path) if rules_path else None
+        )
+    return _validators[rules_path]
 
 @app.post("/validate", response_model=emllmResponse)
 async def validate_emllm(request: emllmRequest):
     """Validate emllm content structure"""
     try:
         parser = emllmParser()
-        validator = emllmValidator()
+        # Optional rule file (JSON/YAML) applied to every request
+        validator = _validator(os.environ.get('EMLLM_VALIDATION_RULES'))
         
-        message = parser.parse(request.content)
-        validator.validate(parser.to_dict(message))
-        return emllmResponse(message="Message is valid!")
+        with metrics.stage('parse'):
+            message = parser.parse(request.content)
+        profiling.record_parts(message)
+        with metrics.stage('to_dict'):
+            data = parser.to_dict(message)
+        with metrics.stage('validate'):
+            result = validator.check(data)
     except (emllmError, ValueError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raise _http_error(e)
+    if not result.valid:
+        raise HTTPException(status_code=400, detail={
+            "message": "\n".join(result.messages()),
+            "issues": [issue.to_dict() for issue in result.issues]
+        })
+    return emllmResponse(message="Message is valid!")
 
 @app.post("/convert")
 async def convert_format(
     from_format: str,
     to_format: str,
+    http_request: Request,
     content: str = Body(...)
 ):
     """Convert between formats"""
@@ -85,14 +271,112 @@ async def convert_format(
     parser = emllmParser()
     
     if from_format == 'emllm':
-        message = parser.parse(content)
-        result = parser.to_dict(message)
+        with metrics.stage('parse'):
+            message = parser.parse(content)
+        profiling.record_parts(message)
+        with metrics.stage('to_dict'):
+            result = parser.to_dict(message)
     else:  # json to emllm
-        message = parser.from_dict(json.loads(content))
-        result = message.as_string()
+        with metrics.stage('decode'):
+            data = json.loads(content)
+        with metrics.stage('from_dict'):
+            message = parser.from_dict(data)
+        with metrics.stage('serialize'):
+            if _wants_message(http_request):
+                return _message_response(parser, message)
+            result = parser.to_bytes(message).decode('utf-8', 'replace')
     
     return {"result": result}
 
+def _mailbox_path(name: str) -> str:
+    """Resolve a mailbox name inside EMLLM_MAILBOX_DIR (mailbox endpoints are disabled without it)"""
+    root = os.environ.get('EMLLM_MAILBOX_DIR')
+    if not root:
+        raise HTTPException(status_code=404, detail="Mailbox access is not configured")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Mailbox not found: {name}")
+    return path
+
+@app.get("/mailboxes/{name}/messages")
+async def list_mailbox_messages(
+    name: str,
+    message_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100
+):
+    """List index entries, or look them up by Message-ID or date range (ISO 8601)"""
+    from emllm.index import open_index, parse_timestamp
+
+    try:
+        with open_index(_mailbox_path(name)) as index:
+            if message_id:
+                entry = index.find(message_id)
+                entries = [entry] if entry else []
+            elif not since and not until:
+                entries = list(index.entries(0, limit))
+            else:
+                entries = []
+                for entry in index.range(
+                    parse_timestamp(since) if since else None,
+                    parse_timestamp(until) if until else None
+                ):
+                    if len(entries) >= limit:
+                        break
+                    entries.append(entry)
+            return {"count": len(index), "entries": entries}
+    except (emllmError, ValueError) as e:
+        raise _http_error(e)
+
+@app.get("/mailboxes/{name}/messages/{idx}", response_model=emllmResponse)
+async def get_mailbox_message(name: str, idx: int):
+    """Fetch and parse a single message of an indexed mailbox"""
+    from emllm.index import open_index
+
+    try:
+        with open_index(_mailbox_path(name)) as index:
+            if index.entry(idx) is None:
+                raise HTTPException(status_code=404, detail=f"No message {idx} in {name}")
+            parser = emllmParser()
+            result = parser.to_dict(parser.parse_bytes(index.get(idx)))
+            return emllmResponse(message=json.dumps(result, indent=2, default=json_default))
+    except emllmError as e:
+        raise _http_error(e)
+
+@app.get("/search")
+async def search_headers(q: str, limit: int = 20):
+    """Full-text search over indexed message headers (index file from EMLLM_SEARCH_INDEX)"""
+    from emllm.search import emllmSearchIndex
+
+    path = os.environ.get('EMLLM_SEARCH_INDEX')
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Search index is not configured")
+    try:
+        with emllmSearchIndex(path) as index:
+            hits = index.search(q, limit=limit)
+            return {"count": len(hits), "results": hits}
+    except emllmError as e:
+        raise _http_error(e)
+
+def _address_cache(key: str):
+    """Address validation cache statistic of every compiled validator, labelled by rule file"""
+    return lambda: {(rules or '',): validator.cache_stats()[key]
+                    for rules, validator in list(_validators.items())}
+
+metrics.REGISTRY.gauge('emllm_address_cache_hits', 'Address validation cache hits',
+                       ('rules',), _address_cache('hits'))
+metrics.REGISTRY.gauge('emllm_address_cache_misses', 'Address validation cache misses',
+                       ('rules',), _address_cache('misses'))
+metrics.REGISTRY.gauge('emllm_address_cache_hit_ratio', 'Address validation cache hit ratio',
+                       ('rules',), _address_cache('hit_ratio'))
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(metrics.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
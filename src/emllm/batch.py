@@ -0,0 +1,248 @@
+"""Parallel batch processing of emllm messages"""
+from typing import Dict, Any, Iterable, Iterator, NamedTuple, Optional, TextIO, Tuple
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import glob
+import json
+import os
+import sys
+import time
+
+from emllm.core import emllmParser, emllmError, json_default, is_maildir, is_mbox, open_mailbox
+from emllm.validator import emllmValidator, load_rules
+
+MESSAGE_SUFFIXES = ('.eml', '.emllm')
+# Message dicts (from_dict input) - collected from directories only for convert
+JSON_SUFFIXES = ('.json',)
+MBOX_SUFFIXES = ('.mbox',)
+OPERATIONS = ('parse', 'validate', 'convert')
+
+
+class BatchItem(NamedTuple):
+    """A single message to process: either a file path or raw message bytes"""
+    source: str
+    name: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+def _iter_mailbox(path: str, name: str) -> Iterator[BatchItem]:
+    with open_mailbox(path) as box:
+        for index, data in enumerate(box):
+            yield BatchItem(f"{path}#{index}", os.path.join(name, str(index)), data=data)
+
+
+def _iter_path(path: str, name: str, suffixes: Tuple[str, ...]) -> Iterator[BatchItem]:
+    if os.path.isdir(path):
+        if is_maildir(path):
+            yield from _iter_mailbox(path, name)
+            return
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(suffixes + MBOX_SUFFIXES):
+                    file_path = os.path.join(root, filename)
+                    relative = os.path.splitext(os.path.relpath(file_path, path))[0]
+                    yield from _iter_path(file_path, relative, suffixes)
+        return
+
+    if is_mbox(path):
+        yield from _iter_mailbox(path, name)
+    else:
+        yield BatchItem(path, name, path=path)
+
+
+def iter_sources(inputs: Iterable[str], include_json: bool = False) -> Iterator[BatchItem]:
+    """
+    Expand inputs (files, directories, globs, mbox files, Maildir directories)
+    into individual messages. Directories are walked recursively, collecting
+    ``*.json`` message dicts only with include_json (for convert); an input
+    of "-" reads further input paths from stdin, one per line. Glob matches
+    are named by their path below the pattern's first wildcard directory.
+    """
+    suffixes = MESSAGE_SUFFIXES + JSON_SUFFIXES if include_json else MESSAGE_SUFFIXES
+    for entry in inputs:
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry == '-':
+            yield from iter_sources(sys.stdin, include_json)
+            continue
+        if os.path.exists(entry):
+            yield from _iter_path(entry, _stem(entry), suffixes)
+            continue
+        matches = sorted(glob.glob(entry, recursive=True))
+        if not matches:
+            raise emllmError(f"No such file, directory or pattern: {entry}")
+        base = _glob_base(entry)
+        for match in matches:
+            yield from _iter_path(match, os.path.splitext(os.path.relpath(match, base))[0], suffixes)
+
+
+def _stem(path: str) -> str:
+    return os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0]
+
+
+def _glob_base(pattern: str) -> str:
+    """The directory part of a glob pattern before its first wildcard"""
+    base = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        base.append(part)
+    return os.sep.join(base) or ('/' if pattern.startswith(os.sep) else '.')
+
+
+_parser = None
+_validators = {}
+
+
+def process_item(operation: str, item: BatchItem, rules: Optional[str] = None) -> Dict[str, Any]:
+    """Run a single operation on a single message (executed in worker processes)"""
+    global _parser
+    if _parser is None:
+        _parser = emllmParser()
+    # One compiled validator per rule file and worker process
+    if rules not in _validators:
+        _validators[rules] = emllmValidator(log_errors=False, rules=load_rules(rules) if rules else None)
+    validator = _validators[rules]
+
+    record = {'source': item.source, 'name': item.name, 'ok': False, 'error': None, 'bytes': 0}
+    try:
+        data = item.data
+        if data is None:
+            with open(item.path, 'rb') as f:
+                data = f.read()
+        record['bytes'] = len(data)
+
+        if operation == 'convert' and item.path and item.path.endswith('.json'):
+            message = _parser.from_dict(json.loads(data))
+            record['format'] = 'emllm'
+            record['result'] = _parser.to_bytes(message)
+        else:
+            result = _parser.to_dict(_parser.parse_bytes(data))
+            record['format'] = 'json'
+            if operation == 'validate':
+                check = validator.check(result)
+                record['result'] = {**check.to_dict(), 'errors': check.messages()}
+            else:
+                record['result'] = result
+        record['ok'] = True
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+class emllmBatchProcessor:
+    """Run parse/validate/convert over many messages on a process pool"""
+
+    def __init__(self, operation: str = 'parse', jobs: Optional[int] = None,
+                 ordered: bool = True, window: int = 16, rules: Optional[str] = None):
+        if operation not in OPERATIONS:
+            raise emllmError(f"Unknown batch operation: {operation}")
+        if rules:
+            try:
+                load_rules(rules)
+            except (OSError, ValueError) as e:
+                raise emllmError(f"Invalid rule file {rules}: {str(e)}")
+        self.rules = rules
+        self.operation = operation
+        self.jobs = jobs or os.cpu_count() or 1
+        self.ordered = ordered
+        self.window = window
+        self.stats = {'processed': 0, 'failed': 0, 'bytes': 0, 'elapsed': 0.0}
+
+    def run(self, items: Iterable[BatchItem]) -> Iterator[Dict[str, Any]]:
+        """Yield one result record per message, in input order unless ordered=False"""
+        started = time.monotonic()
+        try:
+            if self.jobs == 1:
+                records = (process_item(self.operation, item, self.rules) for item in items)
+                yield from self._count(records)
+            else:
+                with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                    yield from self._count(self._map(executor, items))
+        finally:
+            self.stats['elapsed'] = time.monotonic() - started
+
+    def _map(self, executor: Executor, items: Iterable[BatchItem]) -> Iterator[Dict[str, Any]]:
+        # Keep a bounded number of messages in flight so huge inputs are
+        # streamed rather than queued in memory all at once
+        window = self.jobs * self.window
+        in_flight = deque()
+        pending = set()
+        for item in items:
+            if len(in_flight) + len(pending) >= window:
+                yield from self._drain(in_flight, pending)
+            future = executor.submit(process_item, self.operation, item, self.rules)
+            if self.ordered:
+                in_flight.append(future)
+            else:
+                pending.add(future)
+        while in_flight or pending:
+            yield from self._drain(in_flight, pending)
+
+    @staticmethod
+    def _drain(in_flight: deque, pending: set) -> Iterator[Dict[str, Any]]:
+        if in_flight:
+            yield in_flight.popleft().result()
+            return
+        done, remaining = wait(pending, return_when=FIRST_COMPLETED)
+        pending.intersection_update(remaining)
+        for future in done:
+            yield future.result()
+
+    def _count(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            self.stats['processed'] += 1
+            self.stats['bytes'] += record['bytes']
+            if not record['ok']:
+                self.stats['failed'] += 1
+            yield record
+
+    def summary(self) -> Dict[str, Any]:
+        """Throughput and failure summary of the last run"""
+        elapsed = self.stats['elapsed'] or 1e-9
+        return {
+            **self.stats,
+            'messages_per_second': round(self.stats['processed'] / elapsed, 2),
+            'mb_per_second': round(self.stats['bytes'] / elapsed / (1024 * 1024), 2),
+        }
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], output: TextIO) -> None:
+    """Write one JSON record per line (converted messages are bytes, emitted as base64)"""
+    for record in records:
+        output.write(json.dumps(record, default=json_default) + "\n")
+
+
+def write_tree(records: Iterable[Dict[str, Any]], output_dir: str) -> None:
+    """
+    Write each result into its own file under output_dir; failures go to
+    errors.ndjson. A name used twice gets a ``-N`` suffix instead of
+    overwriting the earlier result.
+    """
+    errors_path = os.path.join(output_dir, 'errors.ndjson')
+    os.makedirs(output_dir, exist_ok=True)
+    used = set()
+    with open(errors_path, 'w') as errors:
+        for record in records:
+            if not record['ok']:
+                errors.write(json.dumps(record) + "\n")
+                continue
+            suffix = '.eml' if record['format'] == 'emllm' else '.json'
+            stem = os.path.join(output_dir, record['name'].lstrip(os.sep))
+            path = stem + suffix
+            copy = 1
+            while path in used:
+                copy += 1
+                path = f"{stem}-{copy}{suffix}"
+            used.add(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if record['format'] == 'emllm':
+                with open(path, 'wb') as f:
+                    f.write(record['result'])
+            else:
+                with open(path, 'w') as f:
+                    json.dump(record['result'], f, indent=2, default=json_default)
+
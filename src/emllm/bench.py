@@ -0,0 +1,203 @@
+"""Performance benchmarks for parse/to_dict/from_dict/validate"""
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from emllm.core import emllmParser, emllmError, UNLIMITED
+from emllm.corpus import generate, preset
+from emllm.validator import emllmValidator
+from emllm.writer import MIME_HEADERS
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Corpus presets (see emllm.corpus.PRESETS) benchmarked by default
+CORPUS_KINDS = ('plain', 'html', 'attachments', 'huge_attachment', 'nested', 'legacy_charset')
+OPERATIONS = ('parse', 'to_dict', 'from_dict', 'validate')
+# A result is reported as a regression when throughput drops by more than this fraction
+DEFAULT_THRESHOLD = 0.10
+
+
+def build_corpus(kinds: Iterable[str] = CORPUS_KINDS, count: int = 20, seed: int = 0,
+                 scale: float = 1.0) -> Dict[str, List[bytes]]:
+    """Deterministic benchmark corpus: count messages of each corpus preset (one for huge_attachment)"""
+    return {
+        kind: list(generate(preset(kind, count=1 if kind == 'huge_attachment' else count,
+                                   seed=seed).scaled(scale)))
+        for kind in kinds
+    }
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of the whole process so far in bytes (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def peak_allocated(function: Callable[[Any], Any], inputs: List[Tuple[Any, int]]) -> int:
+    """Peak bytes allocated by Python while calling function once per input"""
+    tracemalloc.start()
+    try:
+        for value, _ in inputs:
+            function(value)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(function: Callable[[Any], Any], inputs: List[Tuple[Any, int]],
+            iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    """
+    Time function over inputs (value, size in bytes), cycling until iterations
+    calls were made. Peak memory comes from a separate, untimed pass because
+    tracemalloc slows every allocation down.
+    """
+    for value, _ in inputs[:warmup]:
+        function(value)
+
+    latencies = []
+    total_bytes = 0
+    started = time.perf_counter()
+    for call in range(iterations):
+        value, size = inputs[call % len(inputs)]
+        call_started = time.perf_counter()
+        function(value)
+        latencies.append(time.perf_counter() - call_started)
+        total_bytes += size
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'calls': iterations,
+        'messages_per_second': round(iterations / elapsed, 2),
+        'mb_per_second': round(total_bytes / elapsed / (1024 * 1024), 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 4),
+            'p90': round(percentile(latencies, 0.90) * 1000, 4),
+            'p99': round(percentile(latencies, 0.99) * 1000, 4),
+            'max': round(latencies[-1] * 1000, 4),
+        },
+        'peak_allocated_bytes': peak_allocated(function, inputs),
+    }
+
+
+def run_benchmarks(corpus: Dict[str, List[bytes]], operations: Iterable[str] = OPERATIONS,
+                   iterations: int = 200) -> Dict[str, Any]:
+    """Benchmark each operation on each corpus kind; returns a JSON-serializable report"""
+    parser = emllmParser(limits=UNLIMITED)
+    validator = emllmValidator(log_errors=False)
+    functions = {
+        'parse': parser.parse_bytes,
+        'to_dict': parser.to_dict,
+        'from_dict': parser.from_dict,
+        'validate': validator.check,
+    }
+
+    results = {}
+    for kind, messages in corpus.items():
+        sizes = [len(raw) for raw in messages]
+        parsed = [parser.parse_bytes(raw) for raw in messages]
+        inputs = {'parse': messages, 'to_dict': parsed}
+        if {'from_dict', 'validate'} & set(operations):
+            dicts = [parser.to_dict(message) for message in parsed]
+            inputs['validate'] = dicts
+            # from_dict builds the MIME structure itself, so it gets the headers without it
+            inputs['from_dict'] = [
+                {**data, 'headers': {name: value for name, value in data['headers'].items()
+                                     if name.lower() not in MIME_HEADERS}}
+                for data in dicts
+            ]
+        for operation in operations:
+            if operation not in functions:
+                raise emllmError(f"Unknown benchmark operation: {operation}")
+            # Huge messages get fewer calls so a run stays within seconds
+            calls = iterations if max(sizes) < 1024 * 1024 else max(3, iterations // 50)
+            try:
+                results[f"{operation}/{kind}"] = measure(
+                    functions[operation], list(zip(inputs[operation], sizes)), calls
+                )
+            except emllmError as e:
+                # e.g. from_dict cannot rebuild message/rfc822 attachments
+                results[f"{operation}/{kind}"] = {'error': str(e)}
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'iterations': iterations,
+        },
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Per-benchmark throughput and p50 change against a stored baseline"""
+    rows = []
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or 'error' in previous or 'error' in result:
+            continue
+        change = result['messages_per_second'] / previous['messages_per_second'] - 1
+        rows.append({
+            'name': name,
+            'baseline': previous['messages_per_second'],
+            'current': result['messages_per_second'],
+            'change': round(change, 4),
+            'p50_baseline_ms': previous['latency_ms']['p50'],
+            'p50_current_ms': result['latency_ms']['p50'],
+            'regression': change < -threshold,
+        })
+    return rows
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'benchmark':<28} {'msg/s':>10} {'MB/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'peak MB':>8}"]
+    for name, result in report['results'].items():
+        if 'error' in result:
+            lines.append(f"{name:<28} error: {result['error']}")
+            continue
+        latency = result['latency_ms']
+        lines.append(
+            f"{name:<28} {result['messages_per_second']:>10.1f} {result['mb_per_second']:>8.2f} "
+            f"{latency['p50']:>9.3f} {latency['p90']:>9.3f} {latency['p99']:>9.3f} "
+            f"{result['peak_allocated_bytes'] / (1024 * 1024):>8.2f}"
+        )
+    rss = peak_rss()
+    if rss is not None:
+        lines.append(f"process peak RSS: {rss / (1024 * 1024):.1f} MB")
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<28} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        lines.append(
+            f"{row['name']:<28} {row['baseline']:>10.1f} {row['current']:>10.1f} {row['change']:>+8.1%}{flag}"
+        )
+    return '\n'.join(lines)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
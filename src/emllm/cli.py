@@ -1,48 +1,95 @@
 import argparse
+import os
 import sys
-from typing import List, Dict, Any
-import emllm
-from emllm.core import emllmParser, emllmError
-from emllm.validator import emllmValidator
-import json
+from typing import TYPE_CHECKING, List, Dict, Any
+
+from emllm.profiling import PROFILE_MODES
+
+if TYPE_CHECKING:
+    from emllm.validator import emllmValidator
+
+# Compiled validators per rule file, kept warm across commands served by
+# 'emllm serve' (see emllm.daemon); one-shot runs use at most one
+_validators = {}
+
+# Everything else (emllm.core, emllm.validator, json, FastAPI, ...) is imported
+# by the subcommand that needs it, so short commands start quickly; see
+# tests/test_cli.py::test_import_time
+
 
 class emllmCLI:
+    # Subcommands and their help; arguments are added by _add_<name>_arguments
+    # and the command runs _run_<name>(args), which imports what it needs
+    COMMANDS = (
+        ('interactive', 'Start interactive EML shell'),
+        ('parse', 'Parse emllm content'),
+        ('generate', 'Generate emllm from dictionary'),
+        ('validate', 'Validate emllm message structure'),
+        ('convert', 'Convert between formats'),
+        ('extract', 'Write the parts of a message or EML script package to files'),
+        ('batch', 'Process many messages in parallel'),
+        ('index', 'Build or query the sidecar offset index of an mbox file'),
+        ('search', 'Search message headers using an on-disk index'),
+        ('corpus', 'Generate a deterministic synthetic corpus for load and scale testing'),
+        ('bench', 'Benchmark parse/to_dict/from_dict/validate on a generated corpus'),
+        ('loadtest', 'Replay a synthetic corpus against the REST API or the render server'),
+        ('rest', 'Start REST API server'),
+        ('serve', 'Serve parse/validate/convert/extract to the CLI over a Unix socket'),
+    )
+
     def __init__(self):
         self.parser = argparse.ArgumentParser(
             description='emllm Language Command Line Interface'
         )
         self.parser.add_argument('--validate', action='store_true',
             help='Validate message structure')
+        self.parser.add_argument('--profile', choices=PROFILE_MODES,
+            help='Profile the command: cprofile (pstats) or sample (collapsed stacks)')
+        self.parser.add_argument('--profile-output',
+            help='Profile output file (default: emllm.prof or emllm.collapsed)')
         self._setup_parser()
 
     def _setup_parser(self):
+        """Register every subcommand with its arguments and its _run_<name> handler"""
+        self.parser.set_defaults(func=None)
         subparsers = self.parser.add_subparsers(dest='command')
-        
-        # Interactive mode
-        interactive = subparsers.add_parser('interactive', 
-            help='Start interactive EML shell')
-        
-        # Parse message
-        parse = subparsers.add_parser('parse',
-            help='Parse emllm content')
+        for name, help_text in self.COMMANDS:
+            subparser = subparsers.add_parser(name, help=help_text)
+            add_arguments = getattr(self, f'_add_{name}_arguments', None)
+            if add_arguments is not None:
+                add_arguments(subparser)
+            subparser.set_defaults(func=getattr(self, f'_run_{name}', None))
+
+    def _add_parse_arguments(self, parse: argparse.ArgumentParser):
+        """Parse message"""
         parse.add_argument('content', nargs='?',
             help='emllm content to parse')
-        
-        # Generate message
-        generate = subparsers.add_parser('generate',
-            help='Generate emllm from dictionary')
+        parse.add_argument('--input', '-i',
+            help='Message file, mbox file or Maildir directory to parse')
+
+    def _add_generate_arguments(self, generate: argparse.ArgumentParser):
+        """Generate message"""
         generate.add_argument('--input', '-i', required=True,
             help='Input JSON file containing message structure')
-        
-        # Validate message
-        validate = subparsers.add_parser('validate',
-            help='Validate emllm message structure')
-        validate.add_argument('content',
+        generate.add_argument('--output', '-o',
+            help='Write the generated message to this file (default: stdout)')
+        generate.add_argument('--values',
+            help='NDJSON file of $placeholder values: treat --input as a template '
+                 'and render one message per line')
+        generate.add_argument('--output-dir',
+            help='Directory for messages rendered with --values (default: current directory)')
+
+    def _add_validate_arguments(self, validate: argparse.ArgumentParser):
+        """Validate message"""
+        validate.add_argument('content', nargs='?',
             help='emllm content to validate')
-        
-        # Convert message
-        convert = subparsers.add_parser('convert',
-            help='Convert between formats')
+        validate.add_argument('--input', '-i',
+            help='Message file, mbox file or Maildir directory to validate')
+        validate.add_argument('--rules',
+            help='JSON or YAML validation rule file')
+
+    def _add_convert_arguments(self, convert: argparse.ArgumentParser):
+        """Convert message"""
         convert.add_argument('--from', dest='from_format', required=True,
             choices=['emllm', 'json'],
             help='Input format')
@@ -50,41 +97,185 @@ class emllmCLI:
             choices=['emllm', 'json'],
             help='Output format')
         convert.add_argument('--input', '-i', required=True,
-            help='Input file')
+            help='Input file (for emllm: message file, mbox file or Maildir directory)')
         convert.add_argument('--output', '-o',
             help='Output file')
-        
-        # Batch mode
-        batch = subparsers.add_parser('batch', 
-            help='Run EML script in batch mode')
-        batch.add_argument('script', help='Path to EML script file')
-        
-        # REST mode
-        rest = subparsers.add_parser('rest',
-            help='Start REST API server')
+
+    def _add_extract_arguments(self, extract: argparse.ArgumentParser):
+        """Extract message parts"""
+        extract.add_argument('input',
+            help='Message file or EML script package (*.eml.sh)')
+        extract.add_argument('--output-dir', '-o', default='extracted_content',
+            help='Directory to write the parts to (default: extracted_content)')
+
+    def _add_batch_arguments(self, batch: argparse.ArgumentParser):
+        """Batch mode"""
+        batch.add_argument('inputs', nargs='+',
+            help='Files, directories, globs, mbox files or Maildir directories '
+                 '("-" reads a list of paths from stdin)')
+        batch.add_argument('--op', dest='operation', default='parse',
+            choices=['parse', 'validate', 'convert'],
+            help='Operation to run on each message (default: parse)')
+        batch.add_argument('--rules',
+            help='JSON or YAML validation rule file (for --op validate)')
+        batch.add_argument('--jobs', '-j', type=int, default=None,
+            help='Number of worker processes (default: CPU count)')
+        batch.add_argument('--output', '-o',
+            help='NDJSON output file (default: stdout)')
+        batch.add_argument('--output-dir',
+            help='Write one output file per message into this directory')
+        batch.add_argument('--unordered', action='store_true',
+            help='Emit results as they finish instead of in input order')
+
+    def _add_index_arguments(self, index: argparse.ArgumentParser):
+        """Mailbox index"""
+        index.add_argument('mailbox', help='Path to the mbox file')
+        index.add_argument('--get', type=int, metavar='N',
+            help='Print message number N (negative numbers count from the end)')
+        index.add_argument('--message-id',
+            help='Print the message with this Message-ID')
+        index.add_argument('--since',
+            help='List entries dated at or after this ISO date/time (UTC if no offset)')
+        index.add_argument('--until',
+            help='List entries dated at or before this ISO date/time (UTC if no offset)')
+
+    def _add_search_arguments(self, search: argparse.ArgumentParser):
+        """Header search"""
+        search.add_argument('query', nargs='?',
+            help='Search terms; prefix a term with from:, to:, subject: or message-id: '
+                 'to restrict it to one header, end it with * for a prefix match')
+        search.add_argument('--index', default=os.environ.get('EMLLM_SEARCH_INDEX', 'emllm-search.db'),
+            help='Search index file (default: $EMLLM_SEARCH_INDEX or emllm-search.db)')
+        search.add_argument('--add', nargs='+', metavar='PATH',
+            help='Index new or changed messages in these files, directories, '
+                 'mbox files or Maildir directories first')
+        search.add_argument('--limit', type=int, default=20,
+            help='Maximum number of results (default: 20)')
+
+    def _add_corpus_arguments(self, corpus: argparse.ArgumentParser):
+        """Synthetic corpus"""
+        corpus.add_argument('--preset', default='mixed',
+            help='Corpus preset: mixed, plain, html, attachments, huge_attachment, nested, '
+                 'legacy_charset (default: mixed)')
+        corpus.add_argument('--count', type=int, default=100,
+            help='Number of messages (default: 100)')
+        corpus.add_argument('--seed', type=int, default=0,
+            help='Random seed (default: 0)')
+        corpus.add_argument('--scale', type=float, default=1.0,
+            help='Body and attachment size multiplier (default: 1.0)')
+        corpus.add_argument('--defect-rate', type=float,
+            help='Fraction of messages with an injected defect')
+        corpus.add_argument('--defects', nargs='+', metavar='DEFECT',
+            help='Defects to inject (default: all)')
+        corpus_output = corpus.add_mutually_exclusive_group(required=True)
+        corpus_output.add_argument('--output-dir',
+            help='Write one .eml file per message to this directory')
+        corpus_output.add_argument('--mbox',
+            help='Write all messages to this mbox file')
+
+    def _add_bench_arguments(self, bench: argparse.ArgumentParser):
+        """Benchmarks"""
+        bench.add_argument('--ops', nargs='+', metavar='OP',
+            help='Operations to run (default: parse to_dict from_dict validate)')
+        bench.add_argument('--kinds', nargs='+', metavar='KIND',
+            help='Corpus presets (default: plain html attachments huge_attachment nested legacy_charset; '
+                 'also: mixed)')
+        bench.add_argument('--iterations', type=int, default=200,
+            help='Calls per benchmark (default: 200)')
+        bench.add_argument('--count', type=int, default=20,
+            help='Messages per corpus kind (default: 20)')
+        bench.add_argument('--scale', type=float, default=1.0,
+            help='Message size multiplier (default: 1.0)')
+        bench.add_argument('--seed', type=int, default=0,
+            help='Corpus random seed (default: 0)')
+        bench.add_argument('--save', metavar='PATH',
+            help='Write the report as JSON, e.g. to store a baseline')
+        bench.add_argument('--compare', metavar='PATH',
+            help='Compare throughput against a saved baseline report')
+        bench.add_argument('--threshold', type=float, default=0.10,
+            help='Throughput drop reported as a regression (default: 0.10)')
+        bench.add_argument('--fail-on-regression', action='store_true',
+            help='Exit with status 1 when --compare finds a regression')
+
+    def _add_loadtest_arguments(self, loadtest: argparse.ArgumentParser):
+        """HTTP load test"""
+        loadtest.add_argument('--target', choices=['api', 'render'], default='api',
+            help='Server to test: api (emllm rest) or render (render/server.py) (default: api)')
+        loadtest.add_argument('--url',
+            help='Base URL of a running server (default: start one in this process)')
+        loadtest.add_argument('--app', default=os.path.join('render', 'server.py'),
+            help='Render server module started in-process for --target render (default: render/server.py)')
+        loadtest.add_argument('--endpoints', nargs='+', metavar='PATH',
+            help='Endpoints to call (default: /parse /validate /convert, or /render /api/info)')
+        loadtest.add_argument('--concurrency', type=int, default=10,
+            help='Concurrent requests (default: 10)')
+        loadtest.add_argument('--rps', type=float,
+            help='Target request rate; without it requests are sent back to back')
+        loadtest.add_argument('--duration', type=float, default=10.0,
+            help='Test duration in seconds (default: 10)')
+        loadtest.add_argument('--requests', type=int,
+            help='Stop after this many requests')
+        loadtest.add_argument('--preset', default='mixed',
+            help='Corpus preset (default: mixed)')
+        loadtest.add_argument('--count', type=int, default=100,
+            help='Corpus size (default: 100)')
+        loadtest.add_argument('--seed', type=int, default=0,
+            help='Corpus random seed (default: 0)')
+        loadtest.add_argument('--server-pid', type=int,
+            help='Process to sample CPU and memory of (default: this process)')
+        loadtest.add_argument('--save', metavar='PATH',
+            help='Write the full report, including histograms, as JSON')
+
+    def _add_rest_arguments(self, rest: argparse.ArgumentParser):
+        """REST mode"""
         rest.add_argument('--host', default='0.0.0.0',
             help='Host to bind to (default: 0.0.0.0)')
         rest.add_argument('--port', type=int, default=8000,
             help='Port to listen on (default: 8000)')
 
+    def _add_serve_arguments(self, serve: argparse.ArgumentParser):
+        """CLI daemon"""
+        serve.add_argument('--socket', metavar='PATH',
+            help='Unix socket to listen on (default: $EMLLM_SOCKET, '
+                 'or emllm-<uid>.sock in $XDG_RUNTIME_DIR or /tmp)')
+
     def run(self, args: List[str] = None):
-        args = self.parser.parse_args(args)
-        
-        if args.command == 'parse':
-            self._run_parse(args.content)
-        elif args.command == 'generate':
-            self._run_generate(args.input)
-        elif args.command == 'validate':
-            self._run_validate(args.content)
-        elif args.command == 'convert':
-            self._run_convert(args)
-        elif args.command == 'rest':
-            self._run_rest(args.host, args.port)
-        else:
+        argv = sys.argv[1:] if args is None else args
+        args = self.parser.parse_args(argv)
+        if not args.profile:
+            self._dispatch(args)
+            return
+
+        from emllm.profiling import emllmProfiler
+
+        profiler = emllmProfiler(args.profile)
+        try:
+            with profiler:
+                self._dispatch(args)
+        finally:
+            path = profiler.save(args.profile_output)
+            print(profiler.breakdown(), file=sys.stderr)
+            print(profiler.top(), file=sys.stderr)
+            print(f"Profile written to {path}", file=sys.stderr)
+
+    def _dispatch(self, args):
+        if args.func is None:
             self.parser.print_help()
+            return
+        args.func(args)
+
+    def _run_parse(self, args):
+        """Parse a message given on the command line or a message file/mailbox"""
+        if args.input:
+            self._run_parse_input(args.input)
+        else:
+            self._parse_content(args.content)
 
-    def _run_parse(self, content: str):
+    def _parse_content(self, content: str):
         """Parse emllm content"""
+        import json
+        from emllm.core import emllmParser, emllmError
+
         parser = emllmParser()
         try:
             message = parser.parse(content)
@@ -93,11 +284,94 @@ class emllmCLI:
         except emllmError as e:
             print(f"Error: {str(e)}")
 
+    def _iter_input(self, path: str):
+        """Yield raw messages from a message file, mbox file or Maildir directory"""
+        from emllm.core import open_mailbox
+
+        mailbox = open_mailbox(path)
+        if mailbox is None:
+            with open(path, 'rb') as f:
+                yield f.read()
+            return
+        with mailbox:
+            yield from mailbox
+
+    def _run_parse_input(self, path: str):
+        """Parse every message of a file or mailbox in a single pass, one JSON document per line"""
+        import json
+        from emllm import metrics, profiling
+        from emllm.core import emllmParser, emllmError, json_default
+
+        parser = emllmParser()
+        for index, content in enumerate(self._iter_input(path)):
+            try:
+                with metrics.stage('parse'):
+                    message = parser.parse_bytes(content)
+                profiling.record_parts(message)
+                with metrics.stage('to_dict'):
+                    data = parser.to_dict(message)
+                print(json.dumps(data, default=json_default))
+            except emllmError as e:
+                print(json.dumps({'index': index, 'error': str(e)}))
+
+    def _load_validator(self, rules: str = None, **kwargs) -> 'emllmValidator':
+        """Validator with the rules of a rule file, if given (reused while the file is unchanged)"""
+        from emllm.validator import emllmValidator, load_rules
+
+        try:
+            key = (rules, os.path.getmtime(rules) if rules else None, tuple(sorted(kwargs.items())))
+            if key not in _validators:
+                _validators[key] = emllmValidator(rules=load_rules(rules) if rules else None, **kwargs)
+            return _validators[key]
+        except (OSError, ValueError) as e:
+            print(f"Error: invalid rule file: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_validate_input(self, path: str, rules: str = None):
+        """Validate every message of a file or mailbox in a single pass"""
+        from emllm import metrics, profiling
+        from emllm.core import emllmParser, emllmError
+
+        parser = emllmParser()
+        validator = self._load_validator(rules, log_errors=False)
+        invalid = 0
+        total = 0
+
+        for index, content in enumerate(self._iter_input(path)):
+            total += 1
+            try:
+                with metrics.stage('parse'):
+                    message = parser.parse_bytes(content)
+                profiling.record_parts(message)
+                with metrics.stage('to_dict'):
+                    data = parser.to_dict(message)
+                with metrics.stage('validate'):
+                    result = validator.check(data)
+                errors = result.messages()
+            except emllmError as e:
+                errors = [str(e)]
+            if errors:
+                invalid += 1
+                print(f"Message {index}: " + "; ".join(errors))
+
+        if invalid:
+            print(f"\n{invalid} of {total} messages invalid")
+        else:
+            print(f"\nAll {total} messages are valid!")
+
     def _run_generate(self, args):
         """Generate emllm from JSON"""
+        import json
+        from emllm.core import emllmParser
+        from emllm.validator import emllmValidator
+
         with open(args.input, 'r') as f:
             data = json.load(f)
             
+        if args.values:
+            self._run_generate_template(data, args.values, args.output_dir or '.')
+            return
+
         parser = emllmParser()
         validator = emllmValidator()
         
@@ -105,25 +379,78 @@ class emllmCLI:
             validator.validate(data)
             
         message = parser.from_dict(data)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                parser.write_bytes(message, f)
+            return
         print("\nGenerated emllm:")
-        print(message.as_string())
+        sys.stdout.flush()
+        parser.write_bytes(message, sys.stdout.buffer)
+
+    def _run_generate_template(self, data: Dict[str, Any], values_path: str, output_dir: str):
+        """Compile the message dict once, then render one .eml file per line of values"""
+        import json
+        from emllm.core import emllmError
+        from emllm.writer import compile_template
 
-    def _run_validate(self, content: str):
+        try:
+            template = compile_template(data)
+            os.makedirs(output_dir, exist_ok=True)
+            count = 0
+            with open(values_path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    with open(os.path.join(output_dir, f"{count:06d}.eml"), 'wb') as out:
+                        template.write(json.loads(line), out)
+                    count += 1
+        except (emllmError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Generated {count} messages in {output_dir}", file=sys.stderr)
+
+    def _run_validate(self, args):
+        """Validate a message given on the command line or a message file/mailbox"""
+        if args.input:
+            self._run_validate_input(args.input, args.rules)
+        else:
+            self._validate_content(args.content, args.rules)
+
+    def _validate_content(self, content: str, rules: str = None):
         """Validate emllm content"""
+        from emllm.core import emllmParser, emllmError
+
         parser = emllmParser()
-        validator = emllmValidator()
+        validator = self._load_validator(rules)
         
         try:
             message = parser.parse(content)
-            validator.validate(message)
+            validator.validate(parser.to_dict(message))
             print("\nMessage is valid!")
         except (emllmError, ValueError) as e:
             print(f"Error: {str(e)}")
 
     def _run_convert(self, args):
         """Convert between formats"""
+        import json
+        from emllm.core import emllmParser, json_default, open_mailbox
+
         parser = emllmParser()
         
+        mailbox = open_mailbox(args.input) if args.from_format == 'emllm' else None
+        if mailbox is not None:
+            # Whole mailbox: stream one JSON document per message (NDJSON)
+            out = open(args.output, 'w') if args.output else sys.stdout
+            try:
+                with mailbox:
+                    for content in mailbox:
+                        data = parser.to_dict(parser.parse_bytes(content))
+                        out.write(json.dumps(data, default=json_default) + "\n")
+            finally:
+                if args.output:
+                    out.close()
+            return
+
         if args.from_format == 'emllm':
             with open(args.input, 'r') as f:
                 content = f.read()
@@ -134,7 +461,14 @@ class emllmCLI:
             with open(args.input, 'r') as f:
                 data = json.load(f)
             message = parser.from_dict(data)
-            output = message.as_string()
+            # Serialize bytes-first, straight into the destination
+            if args.output:
+                with open(args.output, 'wb') as f:
+                    parser.write_bytes(message, f)
+            else:
+                sys.stdout.flush()
+                parser.write_bytes(message, sys.stdout.buffer)
+            return
         
         if args.output:
             with open(args.output, 'w') as f:
@@ -142,23 +476,213 @@ class emllmCLI:
         else:
             print(output)
 
-    def _run_rest(self, host: str, port: int):
+    def _run_index(self, args):
+        """Update the mailbox index, then fetch messages or list entries by date"""
+        import json
+        from emllm.core import emllmError
+        from emllm.index import open_index, parse_timestamp
+
+        try:
+            with open_index(args.mailbox) as index:
+                if args.get is not None:
+                    sys.stdout.buffer.write(index.get(args.get))
+                elif args.message_id:
+                    sys.stdout.buffer.write(index.get_by_message_id(args.message_id))
+                elif args.since or args.until:
+                    since = parse_timestamp(args.since) if args.since else None
+                    until = parse_timestamp(args.until) if args.until else None
+                    for entry in index.range(since, until):
+                        print(json.dumps(entry))
+                else:
+                    print(f"Indexed {len(index)} messages in {index.index_path}")
+        except (emllmError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_search(self, args):
+        """Incrementally update the header index, then print matches as NDJSON"""
+        import json
+        from emllm.core import emllmError
+        from emllm.search import emllmSearchIndex
+
+        try:
+            with emllmSearchIndex(args.index) as index:
+                if args.add:
+                    added = index.update(args.add)
+                    removed = index.prune()
+                    print(f"Indexed {added} new messages ({removed} sources removed), "
+                          f"{len(index)} total in {args.index}", file=sys.stderr)
+                if args.query:
+                    for hit in index.search(args.query, limit=args.limit):
+                        print(json.dumps(hit))
+                elif not args.add:
+                    self.parser.error("search needs a query or --add")
+        except emllmError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_corpus(self, args):
+        """Write a synthetic corpus to a directory or an mbox file"""
+        from emllm.core import emllmError
+        from emllm.corpus import emllmCorpusGenerator, preset
+
+        try:
+            overrides = {'count': args.count, 'seed': args.seed}
+            if args.defect_rate is not None:
+                overrides['defect_rate'] = args.defect_rate
+            if args.defects:
+                overrides['defects'] = tuple(args.defects)
+            generator = emllmCorpusGenerator(preset(args.preset, **overrides).scaled(args.scale))
+            if args.mbox:
+                written = generator.write_mbox(args.mbox)
+            else:
+                written = generator.write_files(args.output_dir)
+            print(f"Generated {written} messages in {args.mbox or args.output_dir}", file=sys.stderr)
+        except (emllmError, OSError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_bench(self, args):
+        """Run the benchmark suite, optionally saving or diffing against a baseline"""
+        from emllm import bench
+        from emllm.core import emllmError
+
+        try:
+            corpus = bench.build_corpus(args.kinds or bench.CORPUS_KINDS, count=args.count,
+                                        seed=args.seed, scale=args.scale)
+            report = bench.run_benchmarks(corpus, args.ops or bench.OPERATIONS,
+                                          iterations=args.iterations)
+            print(bench.format_report(report))
+            if args.save:
+                bench.save_report(report, args.save)
+            if args.compare:
+                rows = bench.compare(report, bench.load_report(args.compare), args.threshold)
+                print()
+                print(bench.format_comparison(rows))
+                if args.fail_on_regression and any(row['regression'] for row in rows):
+                    sys.exit(1)
+        except (emllmError, OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_loadtest(self, args):
+        """Load-test a running or in-process server and print the report"""
+        import asyncio
+        import contextlib
+        import json
+        import logging
+        from emllm import loadtest
+        from emllm.core import emllmError
+        from emllm.corpus import generate, preset
+
+        # Per-request log lines would dominate the output
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+        try:
+            messages = list(generate(preset(args.preset, count=args.count, seed=args.seed)))
+            endpoints = args.endpoints or loadtest.TARGET_ENDPOINTS[args.target]
+            server = (contextlib.nullcontext(args.url) if args.url
+                      else loadtest.serve(args.target, app_path=args.app))
+            with server as url:
+                report = asyncio.run(loadtest.run_load(
+                    url, messages, endpoints, concurrency=args.concurrency, rps=args.rps,
+                    duration=args.duration, requests=args.requests, server_pid=args.server_pid
+                ))
+            print(loadtest.format_report(report))
+            if args.save:
+                with open(args.save, 'w') as f:
+                    json.dump(report, f, indent=2)
+        except (emllmError, OSError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_extract(self, args):
+        """Write every part of a message to a directory, printing the written paths"""
+        from emllm.core import emllmParser, emllmError
+        from emllm.extract import extract_parts, strip_script
+
+        try:
+            with open(args.input, 'rb') as f:
+                message = emllmParser().parse_bytes(strip_script(f.read()))
+            for path in extract_parts(message, args.output_dir):
+                print(path)
+        except (emllmError, OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+    def _run_serve(self, args):
+        """Run the CLI daemon in the foreground until interrupted"""
+        import signal
+        from emllm.core import emllmError
+        from emllm.daemon import emllmDaemon
+
+        try:
+            daemon = emllmDaemon(args.socket)
+            daemon.bind()
+        except (emllmError, OSError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+        print(f"emllm daemon listening on {daemon.path}", file=sys.stderr)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"emllm daemon stopped after {daemon.requests} requests", file=sys.stderr)
+
+    def _run_rest(self, args):
         """Start REST server"""
-        from .api import app
         import uvicorn
-        print(f"Starting emllm REST server on {host}:{port}")
-        uvicorn.run(app, host=host, port=port)
+        from emllm.api import app
+        print(f"Starting emllm REST server on {args.host}:{args.port}")
+        uvicorn.run(app, host=args.host, port=args.port)
+
+    def _run_batch(self, args):
+        """Process many messages in parallel, streaming results"""
+        from emllm.batch import emllmBatchProcessor, iter_sources, write_ndjson, write_tree
+        from emllm.core import emllmError
+
+        try:
+            processor = emllmBatchProcessor(
+                operation=args.operation,
+                jobs=args.jobs,
+                ordered=not args.unordered,
+                rules=args.rules
+            )
+            records = processor.run(iter_sources(args.inputs, include_json=args.operation == 'convert'))
+            if args.output_dir:
+                write_tree(records, args.output_dir)
+            elif args.output:
+                with open(args.output, 'w') as f:
+                    write_ndjson(records, f)
+            else:
+                write_ndjson(records, sys.stdout)
+        except emllmError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+
+        summary = processor.summary()
+        print(
+            f"Processed {summary['processed']} messages ({summary['failed']} failed) "
+            f"in {summary['elapsed']:.2f}s: {summary['messages_per_second']} msg/s, "
+            f"{summary['mb_per_second']} MB/s",
+            file=sys.stderr
+        )
+        if summary['failed']:
+            sys.exit(2)
+
+
+def main():
+    argv = sys.argv[1:]
+    from emllm.daemon import forward, should_forward
 
-    def _run_batch(self, script_path: str):
-        print(f"Running EML script: {script_path}")
-        # TODO: Implement batch script execution
-        print("Batch execution completed")
+    # parse/validate/convert/extract run on 'emllm serve' when one is listening
+    if should_forward(argv):
+        status = forward(argv)
+        if status is not None:
+            sys.exit(status)
+    cli = emllmCLI()
+    cli.run(argv)
 
-    def _run_rest(self, host: str, port: int):
-        print(f"Starting REST server on {host}:{port}")
-        # TODO: Implement REST server
-        print("REST server started")
 
 if __name__ == '__main__':
-    cli = EMLCLI()
-    cli.run()
+    main()
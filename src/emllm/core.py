@@ -1,27 +1,180 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import base64
 import email
+import io
+from email.feedparser import BytesFeedParser
+from email.generator import BytesGenerator
 from email.message import EmailMessage
-from email.parser import BytesParser
+from email.parser import BytesParser, BytesHeaderParser
 from email.policy import default
 import json
+import mmap
+import os
 
 class emllmError(Exception):
     """Base exception for emllm errors"""
     pass
 
+class emllmLimitError(emllmError):
+    """A message exceeds one of the configured resource limits"""
+    code = 'limit_exceeded'
+
+    def __init__(self, limit: str, maximum: int, actual: int):
+        self.limit = limit
+        self.maximum = maximum
+        self.actual = actual
+        super().__init__(f"Message exceeds {limit}: {actual} > {maximum}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'code': self.code, 'limit': self.limit, 'maximum': self.maximum,
+                'actual': self.actual, 'message': str(self)}
+
+
+class ParseLimits(NamedTuple):
+    """Resource limits enforced while parsing; None disables a limit"""
+    max_bytes: Optional[int] = 50 * 1024 * 1024
+    max_parts: Optional[int] = 1000
+    max_depth: Optional[int] = 32
+    max_header_bytes: Optional[int] = 1024 * 1024
+    max_attachment_bytes: Optional[int] = 50 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> 'ParseLimits':
+        """Defaults overridden by EMLLM_MAX_BYTES, EMLLM_MAX_PARTS, ... (0 disables a limit)"""
+        values = {}
+        for field in cls._fields:
+            value = os.environ.get(f'EMLLM_{field.upper()}')
+            if value is not None:
+                values[field] = int(value) or None
+        return cls(**values)
+
+
+UNLIMITED = ParseLimits(None, None, None, None, None)
+
+# Bytes fed to the parser at a time; limits are checked between chunks
+FEED_CHUNK_SIZE = 64 * 1024
+
+# Serialization policy: 8-bit bodies are written as-is instead of being re-encoded
+SERIALIZE_POLICY = default.clone(linesep='\n', cte_type='8bit')
+
+
+def _header_end(data: bytes) -> int:
+    """Offset of the blank line ending the header block, or -1 if not seen yet"""
+    ends = [end for end in (data.find(b'\n\n'), data.find(b'\n\r\n')) if end >= 0]
+    return min(ends) if ends else -1
+
+
+def decoded_size(part: EmailMessage) -> int:
+    """Decoded payload size of a leaf part, computed from the encoded text where possible"""
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return len(part.get_payload(decode=True) or b'')
+    encoding = part.get('Content-Transfer-Encoding', '7bit').strip().lower()
+    if encoding == 'base64':
+        stripped = payload.rstrip()
+        whitespace = sum(stripped.count(ch) for ch in ('\n', '\r', ' ', '\t'))
+        padding = len(stripped) - len(stripped.rstrip('='))
+        return max(0, (len(stripped) - whitespace) * 3 // 4 - padding)
+    # Every other transfer encoding decodes to at most its encoded length
+    return len(payload)
+
+
+class _LimitedFeedParser(BytesFeedParser):
+    """BytesFeedParser that stops as soon as a message gets too many or too deeply nested parts"""
+
+    def __init__(self, limits: ParseLimits, policy=default):
+        super().__init__(policy=policy)
+        self._limits = limits
+        self._parts = 0
+
+    def _new_message(self):
+        self._parts += 1
+        if self._limits.max_parts is not None and self._parts > self._limits.max_parts:
+            raise emllmLimitError('max_parts', self._limits.max_parts, self._parts)
+        depth = len(self._msgstack) + 1
+        if self._limits.max_depth is not None and depth > self._limits.max_depth:
+            raise emllmLimitError('max_depth', self._limits.max_depth, depth)
+        super()._new_message()
+
+
 class emllmParser:
-    def __init__(self, encoding: str = 'utf-8'):
+    def __init__(self, encoding: str = 'utf-8', limits: Optional[ParseLimits] = None):
         self.encoding = encoding
+        self.limits = limits or ParseLimits.from_env()
         self.parser = BytesParser(policy=default)
+        self.header_parser = BytesHeaderParser(policy=default)
 
     def parse(self, emllm_content: str) -> EmailMessage:
         """Parse emllm content into an EmailMessage object"""
         try:
-            message = self.parser.parsebytes(emllm_content.encode(self.encoding))
+            emllm_content = emllm_content.encode(self.encoding)
+        except Exception as e:
+            raise emllmError(f"Error parsing emllm content: {str(e)}")
+        return self.parse_bytes(emllm_content)
+
+    def parse_bytes(self, emllm_content: bytes) -> EmailMessage:
+        """Parse raw emllm bytes (e.g. read from a file) into an EmailMessage object"""
+        # Reject oversized input before any parsing work
+        self._check('max_bytes', len(emllm_content))
+        return self.parse_stream(
+            emllm_content[i:i + FEED_CHUNK_SIZE] for i in range(0, len(emllm_content), FEED_CHUNK_SIZE)
+        )
+
+    def parse_file(self, fileobj: BinaryIO) -> EmailMessage:
+        """Parse a message from a binary file or socket, reading it in chunks"""
+        return self.parse_stream(iter(lambda: fileobj.read(FEED_CHUNK_SIZE), b''))
+
+    def parse_stream(self, chunks: Iterable[bytes]) -> EmailMessage:
+        """
+        Parse a message fed chunk by chunk, enforcing the resource limits as
+        it reads: input stops being consumed as soon as a limit is exceeded.
+        """
+        try:
+            parser = _LimitedFeedParser(self.limits)
+            total = 0
+            # The header block is only buffered while its size is limited and still unknown
+            head = b'' if self.limits.max_header_bytes is not None else None
+            for chunk in chunks:
+                total += len(chunk)
+                self._check('max_bytes', total)
+                if head is not None:
+                    head += chunk
+                    end = _header_end(head)
+                    self._check('max_header_bytes', end if end >= 0 else len(head))
+                    if end >= 0:
+                        head = None
+                parser.feed(chunk)
+            message = parser.close()
+            self._check_attachments(message)
             return message
+        except emllmLimitError:
+            raise
         except Exception as e:
             raise emllmError(f"Error parsing emllm content: {str(e)}")
 
+    def _check(self, limit: str, actual: int) -> None:
+        maximum = getattr(self.limits, limit)
+        if maximum is not None and actual > maximum:
+            raise emllmLimitError(limit, maximum, actual)
+
+    def _check_attachments(self, message: EmailMessage) -> None:
+        if self.limits.max_attachment_bytes is None:
+            return
+        for part in message.walk():
+            if not part.is_multipart() and (part.is_attachment() or part.get_filename()):
+                self._check('max_attachment_bytes', decoded_size(part))
+
+    def parse_headers(self, emllm_content: bytes) -> EmailMessage:
+        """Parse only the header block of raw emllm bytes; the body is not decoded"""
+        end = _header_end(emllm_content)
+        if end >= 0:
+            emllm_content = emllm_content[:end + 1]
+        self._check('max_header_bytes', len(emllm_content))
+        try:
+            return self.header_parser.parsebytes(emllm_content)
+        except Exception as e:
+            raise emllmError(f"Error parsing emllm headers: {str(e)}")
+
     def to_dict(self, message: EmailMessage) -> Dict[str, Any]:
         """Convert EmailMessage to dictionary format"""
         try:
@@ -46,6 +199,19 @@ class emllmParser:
         except Exception as e:
             raise emllmError(f"Error converting message to dict: {str(e)}")
 
+    def write_bytes(self, message: EmailMessage, out: BinaryIO) -> None:
+        """Serialize a message straight into a binary file object or response stream"""
+        try:
+            BytesGenerator(out, mangle_from_=False, policy=SERIALIZE_POLICY).flatten(message)
+        except Exception as e:
+            raise emllmError(f"Error serializing message: {str(e)}")
+
+    def to_bytes(self, message: EmailMessage) -> bytes:
+        """Serialize a message to bytes (use instead of as_string(): no str round trip)"""
+        buffer = io.BytesIO()
+        self.write_bytes(message, buffer)
+        return buffer.getvalue()
+
     def from_dict(self, data: Dict[str, Any]) -> EmailMessage:
         """Create EmailMessage from dictionary"""
         try:
@@ -83,3 +249,151 @@ class emllmParser:
             return message
         except Exception as e:
             raise emllmError(f"Error creating message from dict: {str(e)}")
+
+
+def json_default(obj: Any) -> Any:
+    """JSON encoder fallback: binary attachment content is emitted as base64"""
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class MboxReader:
+    """Streaming mbox reader.
+
+    The file is memory-mapped and scanned for "From " separator lines, building
+    an index of (offset, length) pairs. Messages are sliced out of the map one
+    at a time, so memory use is bounded by the largest message, not the file.
+    """
+
+    SEPARATOR = b'From '
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = None
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets: Optional[List[Tuple[int, int]]] = None
+
+    def scan(self, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """Yield (offset, length) of each message body found at or after start"""
+        data = self._map
+        if data is None:
+            return
+
+        size = len(data)
+        if data[start:start + len(self.SEPARATOR)] == self.SEPARATOR:
+            separator = start
+        else:
+            separator = data.find(b'\n' + self.SEPARATOR, start)
+            separator = -1 if separator < 0 else separator + 1
+
+        while separator >= 0:
+            line_end = data.find(b'\n', separator)
+            body = size if line_end < 0 else line_end + 1
+
+            following = data.find(b'\n' + self.SEPARATOR, body - 1)
+            end = size if following < 0 else following + 1
+            next_separator = -1 if following < 0 else end
+
+            # The blank line before the next separator (or EOF) belongs to the mbox framing
+            if data[end - 4:end] == b'\r\n\r\n':
+                end -= 2
+            elif data[end - 2:end] == b'\n\n':
+                end -= 1
+
+            yield body, max(0, end - body)
+            separator = next_separator
+
+    def separator_offset(self, offset: int) -> int:
+        """Offset of the "From " line introducing the message body that starts at offset"""
+        return self._map.rfind(b'\n', 0, offset - 1) + 1
+
+    @property
+    def offsets(self) -> List[Tuple[int, int]]:
+        """Offset index of all messages (built on first use)"""
+        if self._offsets is None:
+            self._offsets = list(self.scan())
+        return self._offsets
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read a single message given its index entry"""
+        return self._map[offset:offset + length]
+
+    def __iter__(self) -> Iterator[bytes]:
+        # Single pass: scan and read as we go, without building the full index first
+        for offset, length in (self._offsets if self._offsets is not None else self.scan()):
+            yield self.read(offset, length)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> bytes:
+        return self.read(*self.offsets[index])
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'MboxReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MaildirReader:
+    """Maildir reader: one message per file in the cur/ and new/ subdirectories"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files = [
+            os.path.join(path, subdir, name)
+            for subdir in ('cur', 'new')
+            for name in sorted(os.listdir(os.path.join(path, subdir)))
+            if not name.startswith('.')
+        ]
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(len(self.files)):
+            yield self[index]
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __getitem__(self, index: int) -> bytes:
+        with open(self.files[index], 'rb') as f:
+            return f.read()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'MaildirReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def is_maildir(path: str) -> bool:
+    return all(os.path.isdir(os.path.join(path, subdir)) for subdir in ('cur', 'new', 'tmp'))
+
+
+def is_mbox(path: str) -> bool:
+    if not os.path.isfile(path):
+        return False
+    if path.endswith('.mbox'):
+        return True
+    with open(path, 'rb') as f:
+        return f.read(len(MboxReader.SEPARATOR)) == MboxReader.SEPARATOR
+
+
+def open_mailbox(path: str):
+    """Open an mbox file or Maildir directory; returns None for anything else"""
+    if os.path.isdir(path) and is_maildir(path):
+        return MaildirReader(path)
+    if is_mbox(path):
+        return MboxReader(path)
+    return None
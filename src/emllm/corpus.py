@@ -0,0 +1,296 @@
+"""Deterministic synthetic message corpus for benchmarks and load tests"""
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+import os
+import random
+import re
+
+from emllm.core import emllmError
+
+# Defects that can be injected into generated messages
+DEFECTS = (
+    'missing_from',       # no From header
+    'invalid_address',    # From is not an email address
+    'truncated',          # message cut off in the middle
+    'bad_base64',         # invalid characters in a base64 attachment body
+    'missing_boundary',   # multipart message without its closing boundary
+    'long_header',        # header line longer than the RFC 5322 limit of 998 characters
+    'unknown_charset',    # text part declares a charset Python does not know
+    'raw_8bit_header',    # unencoded 8-bit bytes in a header
+)
+
+ASCII_WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'invoice', 'report', 'meeting',
+               'project', 'deadline', 'order', 'delivery', 'contract', 'client', 'status')
+# Words for the Latin-2 charsets; every one is encodable in iso-8859-2 and windows-1250
+LATIN2_WORDS = ('faktura', 'zamówienie', 'spotkanie', 'dostawa', 'umowa', 'źródło',
+                'żółć', 'gęś', 'łódź', 'środa', 'piątek', 'termin')
+UNICODE_WORDS = ('naïve', 'Zürich', '日本語', 'Ελλάδα', 'привет', '✓', '€')
+CHARSET_WORDS = {
+    'us-ascii': ASCII_WORDS,
+    'iso-8859-2': ASCII_WORDS + LATIN2_WORDS,
+    'windows-1250': ASCII_WORDS + LATIN2_WORDS,
+    'utf-8': ASCII_WORDS + LATIN2_WORDS + UNICODE_WORDS,
+}
+
+EXTRA_HEADERS = (
+    ('Received', 'from mx{n}.example.net (mx{n}.example.net [192.0.2.{n}]) by mail.example.com'),
+    ('X-Mailer', 'emllm-corpus {n}'),
+    ('X-Priority', '{p}'),
+    ('List-Id', '<list{n}.example.com>'),
+    ('X-Spam-Score', '{p}.{n}'),
+    ('X-Originating-IP', '[198.51.100.{n}]'),
+    ('X-Campaign', 'campaign-{n}'),
+)
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class CorpusSpec(NamedTuple):
+    """Shape of a synthetic corpus.
+
+    Body and attachment sizes (in bytes) are log-normally distributed around
+    their medians; a sigma of 0 makes every size exactly the median. Mixes are
+    (value, weight) pairs.
+    """
+    count: int = 100
+    seed: int = 0
+    body_size: int = 2048
+    body_sigma: float = 0.8
+    html_rate: float = 0.3
+    attachment_rate: float = 0.2
+    min_attachments: int = 1
+    max_attachments: int = 3
+    attachment_size: int = 32 * 1024
+    attachment_sigma: float = 1.0
+    attachment_types: Tuple[Tuple[str, float], ...] = (
+        ('application/pdf', 3), ('image/png', 2), ('text/csv', 1), ('application/octet-stream', 1),
+    )
+    charsets: Tuple[Tuple[str, float], ...] = (
+        ('utf-8', 7), ('us-ascii', 1), ('iso-8859-2', 1), ('windows-1250', 1),
+    )
+    min_headers: int = 0
+    max_headers: int = 6
+    max_recipients: int = 3
+    nesting_depth: int = 0
+    defect_rate: float = 0.0
+    defects: Tuple[str, ...] = DEFECTS
+
+    def scaled(self, factor: float) -> 'CorpusSpec':
+        """The same corpus with bodies and attachments factor times larger"""
+        return self._replace(body_size=max(1, int(self.body_size * factor)),
+                             attachment_size=max(1, int(self.attachment_size * factor)))
+
+
+# Named corpora; the benchmark suite uses one per message kind
+PRESETS: Dict[str, CorpusSpec] = {
+    'mixed': CorpusSpec(),
+    'plain': CorpusSpec(body_sigma=0, html_rate=0, attachment_rate=0, charsets=(('utf-8', 1),)),
+    'html': CorpusSpec(body_sigma=0, html_rate=1, attachment_rate=0, charsets=(('utf-8', 1),)),
+    'attachments': CorpusSpec(body_size=400, body_sigma=0, html_rate=0, attachment_rate=1,
+                              min_attachments=20, max_attachments=20, attachment_size=2048,
+                              attachment_sigma=0, attachment_types=(('application/octet-stream', 1),),
+                              charsets=(('utf-8', 1),)),
+    'huge_attachment': CorpusSpec(body_size=400, body_sigma=0, html_rate=0, attachment_rate=1,
+                                  min_attachments=1, max_attachments=1, attachment_size=8 * 1024 * 1024,
+                                  attachment_sigma=0, attachment_types=(('application/pdf', 1),),
+                                  charsets=(('utf-8', 1),)),
+    'nested': CorpusSpec(body_size=300, body_sigma=0, html_rate=0, attachment_rate=0,
+                         nesting_depth=10, charsets=(('utf-8', 1),)),
+    'legacy_charset': CorpusSpec(body_sigma=0, html_rate=1, attachment_rate=0,
+                                 charsets=(('iso-8859-2', 1), ('windows-1250', 1))),
+}
+
+
+class SyntheticMessage(NamedTuple):
+    index: int
+    data: bytes
+    charset: str
+    attachments: int
+    defects: Tuple[str, ...]
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def _weighted(rng: random.Random, mix: Tuple[Tuple[str, float], ...]) -> str:
+    values, weights = zip(*mix)
+    return rng.choices(values, weights)[0]
+
+
+def _size(rng: random.Random, median: int, sigma: float, cap: Optional[int] = None) -> int:
+    size = median if sigma <= 0 else int(rng.lognormvariate(0, sigma) * median)
+    return max(1, min(size, cap) if cap else size)
+
+
+class emllmCorpusGenerator:
+    """
+    Generate the messages described by a CorpusSpec.
+
+    Each message is built from its own random stream seeded with
+    (seed, index), so message N is identical whether the corpus is iterated,
+    written to disk or fetched with message(N), and growing ``count`` only
+    appends messages.
+    """
+
+    def __init__(self, spec: CorpusSpec = CorpusSpec()):
+        unknown = set(spec.defects) - set(DEFECTS)
+        if unknown:
+            raise emllmError(f"Unknown defects: {', '.join(sorted(unknown))}")
+        unknown = {charset for charset, _ in spec.charsets} - set(CHARSET_WORDS)
+        if unknown:
+            raise emllmError(f"Unsupported charsets: {', '.join(sorted(unknown))} "
+                             f"(use: {', '.join(CHARSET_WORDS)})")
+        if spec.min_attachments > spec.max_attachments or spec.min_headers > spec.max_headers:
+            raise emllmError("Minimum counts must not exceed maximum counts")
+        self.spec = spec
+
+    def __len__(self) -> int:
+        return self.spec.count
+
+    def __iter__(self) -> Iterator[SyntheticMessage]:
+        for index in range(self.spec.count):
+            yield self.message(index)
+
+    def messages(self) -> Iterator[bytes]:
+        """Raw bytes of every message"""
+        for message in self:
+            yield message.data
+
+    def message(self, index: int) -> SyntheticMessage:
+        spec = self.spec
+        rng = random.Random(f"{spec.seed}:{index}")
+        charset = _weighted(rng, spec.charsets)
+        words = CHARSET_WORDS[charset]
+
+        message = EmailMessage()
+        message['From'] = f"Sender {index} <sender{rng.randrange(1000)}@example.com>"
+        message['To'] = ', '.join(f"recipient{rng.randrange(1000)}@example.org"
+                                  for _ in range(rng.randint(1, max(1, spec.max_recipients))))
+        if rng.random() < 0.3:
+            message['Cc'] = f"copy{rng.randrange(1000)}@example.net"
+        message['Subject'] = f"{rng.choice(words).capitalize()} {index}: {' '.join(rng.choices(words, k=4))}"
+        message['Message-ID'] = f"<corpus-{spec.seed}-{index}@example.com>"
+        message['Date'] = format_datetime(EPOCH + timedelta(seconds=rng.randrange(365 * 86400)))
+        for _ in range(rng.randint(spec.min_headers, spec.max_headers)):
+            name, value = rng.choice(EXTRA_HEADERS)
+            message[name] = value.format(n=rng.randrange(1, 255), p=rng.randint(1, 5))
+
+        text = self._text(rng, words, _size(rng, spec.body_size, spec.body_sigma, 10 * 1024 * 1024))
+        message.set_content(text, charset=charset)
+        if rng.random() < spec.html_rate:
+            paragraphs = ''.join(f"<p>{line}</p>" for line in text.splitlines())
+            message.add_alternative(f"<html><body>{paragraphs}</body></html>", subtype='html', charset=charset)
+
+        attachments = 0
+        if rng.random() < spec.attachment_rate:
+            attachments = rng.randint(spec.min_attachments, spec.max_attachments)
+        for number in range(attachments):
+            maintype, subtype = _weighted(rng, spec.attachment_types).split('/')
+            size = _size(rng, spec.attachment_size, spec.attachment_sigma)
+            if maintype == 'text':
+                message.add_attachment(self._text(rng, ASCII_WORDS, size), subtype=subtype,
+                                       filename=f"file{number}.{subtype}")
+            else:
+                message.add_attachment(_random_bytes(rng, size), maintype=maintype, subtype=subtype,
+                                       filename=f"file{number}.{subtype}")
+
+        if spec.nesting_depth:
+            message.add_attachment(self._nested(rng, words, spec.nesting_depth))
+
+        defects = ()
+        if spec.defects and rng.random() < spec.defect_rate:
+            applicable = [defect for defect in spec.defects
+                          if defect not in ('bad_base64', 'missing_boundary') or message.is_multipart()]
+            if applicable:
+                defects = (rng.choice(applicable),)
+                self._inject_message(message, defects[0])
+
+        # The generator would pick random boundaries; fixed ones keep the corpus reproducible
+        multiparts = (part for part in message.walk() if part.get_content_maintype() == 'multipart')
+        for number, part in enumerate(multiparts):
+            part.set_boundary(f"corpus-{spec.seed}-{index}-{number}")
+
+        data = message.as_bytes()
+        if defects:
+            data = self._inject_bytes(rng, data, defects[0])
+        return SyntheticMessage(index, data, charset, attachments, defects)
+
+    def _text(self, rng: random.Random, words: Tuple[str, ...], size: int) -> str:
+        lines, length = [], 0
+        while length < size:
+            line = ' '.join(rng.choices(words, k=10))
+            lines.append(line)
+            length += len(line) + 1
+        return '\n'.join(lines) + '\n'
+
+    def _nested(self, rng: random.Random, words: Tuple[str, ...], depth: int) -> EmailMessage:
+        inner = EmailMessage()
+        inner['Subject'] = 'Level 0'
+        inner.set_content(self._text(rng, words, 200))
+        for level in range(1, depth):
+            outer = EmailMessage()
+            outer['Subject'] = f"Level {level}"
+            outer.set_content(f"Forwarded message, level {level}\n")
+            outer.add_attachment(inner)
+            inner = outer
+        return inner
+
+    def _inject_message(self, message: EmailMessage, defect: str) -> None:
+        if defect == 'missing_from':
+            del message['From']
+        elif defect == 'invalid_address':
+            message.replace_header('From', 'not-an-address')
+        elif defect == 'bad_base64':
+            for part in message.iter_attachments():
+                if part.get('Content-Transfer-Encoding') == 'base64':
+                    payload = part.get_payload()
+                    part.set_payload(payload[:4] + '!@#$' + payload[4:])
+                    break
+
+    def _inject_bytes(self, rng: random.Random, data: bytes, defect: str) -> bytes:
+        if defect == 'truncated':
+            return data[:rng.randint(len(data) // 2, len(data) - 1)]
+        if defect == 'missing_boundary':
+            end = data.rfind(b'--\n')
+            start = data.rfind(b'\n--', 0, end)
+            return data[:start + 1] if start >= 0 else data
+        if defect == 'long_header':
+            return b'X-Long: ' + b'x' * 2000 + b'\n' + data
+        if defect == 'unknown_charset':
+            return re.sub(rb'charset="?[\w-]+"?', b'charset="x-unknown"', data, count=1)
+        if defect == 'raw_8bit_header':
+            return b'X-Raw: \xc5\xbc\xf3\xb3\xe6\n' + data
+        return data
+
+    def write_files(self, directory: str, suffix: str = '.eml') -> int:
+        """Write every message to its own file (000000.eml, ...); returns the count"""
+        os.makedirs(directory, exist_ok=True)
+        for message in self:
+            with open(os.path.join(directory, f"{message.index:06d}{suffix}"), 'wb') as f:
+                f.write(message.data)
+        return self.spec.count
+
+    def write_mbox(self, path: str) -> int:
+        """Write the corpus as one mbox file ("From " lines in bodies are quoted); returns the count"""
+        with open(path, 'wb') as f:
+            for message in self:
+                f.write(b'From corpus@example.com Mon Jan  1 00:00:00 2024\n')
+                body = re.sub(rb'(?m)^From ', b'>From ', message.data)
+                f.write(body if body.endswith(b'\n') else body + b'\n')
+                f.write(b'\n')
+        return self.spec.count
+
+
+def generate(spec: CorpusSpec = CorpusSpec()) -> Iterator[bytes]:
+    """Iterate over the raw bytes of a synthetic corpus"""
+    return emllmCorpusGenerator(spec).messages()
+
+
+def preset(name: str, **overrides) -> CorpusSpec:
+    """A named corpus spec with some fields replaced"""
+    if name not in PRESETS:
+        raise emllmError(f"Unknown corpus preset: {name} (use one of: {', '.join(PRESETS)})")
+    return PRESETS[name]._replace(**overrides)
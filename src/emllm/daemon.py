@@ -0,0 +1,262 @@
+"""Persistent CLI daemon: run CLI commands in a warm process over a Unix socket"""
+from typing import BinaryIO, List, Optional
+import io
+import json
+import os
+import struct
+import sys
+
+# Commands the client forwards; all others always run in-process
+DAEMON_COMMANDS = ('parse', 'validate', 'convert', 'extract')
+
+# Response frames: channel byte and payload length, then the payload.
+# The EXIT frame ends a response; its payload is the exit status. The daemon
+# sends an empty READY frame when it takes a connection, before the client
+# sends its request.
+EXIT, STDOUT, STDERR, READY = 0, 1, 2, 3
+_FRAME = struct.Struct('>BI')
+_STATUS = struct.Struct('>i')
+
+REQUEST_TIMEOUT = 30.0
+# Client side: a daemon that does not send READY within CONNECT_TIMEOUT (not
+# running, or busy with another client) is skipped and the command runs
+# in-process. Once the request is sent the client waits for the result: the
+# command must never run twice.
+CONNECT_TIMEOUT = 1.0
+
+# EMLLM_* variables configure the command (parse limits, rules, ...); the
+# client's values are sent along and replace the daemon's for one request
+ENV_PREFIX = 'EMLLM_'
+
+# socket and emllm modules are imported on use: the client runs before every
+# forwardable command and must stay cheap
+
+
+def default_socket_path() -> str:
+    """$EMLLM_SOCKET, or a per-user socket in $XDG_RUNTIME_DIR (or the temp directory)"""
+    path = os.environ.get('EMLLM_SOCKET')
+    if path:
+        return path
+    directory = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, f"emllm-{os.getuid()}.sock")
+
+
+def _servable(argv: List[str]) -> bool:
+    command = next((arg for arg in argv if not arg.startswith('-')), None)
+    return command in DAEMON_COMMANDS and not any(arg.startswith('--profile') for arg in argv)
+
+
+def should_forward(argv: List[str]) -> bool:
+    """Whether a command line can run on the daemon (not when profiling or with EMLLM_NO_DAEMON set)"""
+    return not os.environ.get('EMLLM_NO_DAEMON') and _servable(argv)
+
+
+def forward(argv: List[str], path: Optional[str] = None,
+            stdout: Optional[BinaryIO] = None, stderr: Optional[BinaryIO] = None) -> Optional[int]:
+    """
+    Run a CLI command line on the daemon, copying its output to stdout/stderr.
+
+    Returns the exit status, or None when no daemon is ready to take the
+    command, so that the caller can run it in-process.
+    """
+    path = path or default_socket_path()
+    if not os.path.exists(path):
+        return None
+    import socket
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(path)
+        ready = _recv_exactly(client, _FRAME.size)
+    except OSError:
+        client.close()
+        return None
+    if ready != _FRAME.pack(READY, 0):
+        client.close()
+        return None
+
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    with client:
+        # The daemon has taken the request: wait for it however long it runs
+        client.settimeout(None)
+        env = {name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)}
+        request = {'argv': argv, 'cwd': os.getcwd(), 'env': env}
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        reader = client.makefile('rb')
+        while True:
+            header = reader.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                stderr.write(b"Error: emllm daemon closed the connection\n")
+                return 1
+            channel, length = _FRAME.unpack(header)
+            payload = reader.read(length)
+            if channel == EXIT:
+                stdout.flush()
+                return _STATUS.unpack(payload)[0]
+            (stdout if channel == STDOUT else stderr).write(payload)
+
+
+def _recv_exactly(connection, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class _FrameWriter(io.RawIOBase):
+    """Binary stream sending everything written as frames of one channel"""
+
+    def __init__(self, connection, channel: int):
+        self.connection = connection
+        self.channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if data:
+            self.connection.sendall(_FRAME.pack(self.channel, len(data)) + bytes(data))
+        return len(data)
+
+
+class emllmDaemon:
+    """
+    Serves CLI commands over a Unix socket, one at a time.
+
+    Each request is a JSON line with the command line, the client's
+    working directory and its EMLLM_* environment variables; the command runs in this process (imports, compiled
+    validators and their address caches stay warm) with stdout and stderr
+    streamed back as frames. Requests run sequentially because the command
+    output is captured by swapping sys.stdout/sys.stderr.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        import socket
+        from emllm.core import emllmError
+
+        if not hasattr(socket, 'AF_UNIX'):
+            raise emllmError("Unix sockets are not supported on this platform")
+        self.path = path or default_socket_path()
+        self.requests = 0
+        self._running = False
+        self._socket = None
+
+    def bind(self) -> None:
+        """Listen on the socket path, replacing a stale socket file but not a live daemon"""
+        import socket
+        from emllm.core import emllmError
+
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                raise emllmError(f"An emllm daemon is already listening on {self.path}")
+            finally:
+                probe.close()
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the owner may connect: commands run with the daemon's permissions
+        umask = os.umask(0o177)
+        try:
+            self._socket.bind(self.path)
+        finally:
+            os.umask(umask)
+        self._socket.listen(16)
+        # Wake up periodically so shutdown() is noticed
+        self._socket.settimeout(0.5)
+
+    def serve_forever(self) -> None:
+        import socket
+
+        if self._socket is None:
+            self.bind()
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    connection, _ = self._socket.accept()
+                except socket.timeout:
+                    continue
+                with connection:
+                    connection.settimeout(REQUEST_TIMEOUT)
+                    try:
+                        self.handle(connection)
+                    except OSError:
+                        # Client went away mid-request
+                        pass
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        self._running = False
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def handle(self, connection) -> None:
+        """Run one command line and send its output and exit status"""
+        import traceback
+        from emllm.cli import emllmCLI
+        from emllm.core import emllmError
+
+        # A client that gave up waiting has closed the connection: sending
+        # READY fails (or no request follows) and nothing is run
+        connection.sendall(_FRAME.pack(READY, 0))
+        line = connection.makefile('rb').readline()
+        if not line:
+            return
+        out = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(connection, STDOUT)), encoding='utf-8')
+        err = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(connection, STDERR)), encoding='utf-8')
+        saved = sys.stdout, sys.stderr, os.getcwd()
+        saved_env = {name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)}
+        status = 0
+        try:
+            sys.stdout, sys.stderr = out, err
+            request = json.loads(line)
+            argv = request['argv']
+            if not _servable(argv):
+                raise emllmError(f"Command not served by the daemon: {' '.join(argv)}")
+            os.chdir(request['cwd'])
+            self._set_env(request.get('env', {}))
+            emllmCLI().run(argv)
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                status = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                status = 1
+        except (emllmError, ValueError, KeyError, OSError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            status = 1
+        except Exception:
+            # A failing command must not take the daemon down
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdout, sys.stderr = saved[0], saved[1]
+            os.chdir(saved[2])
+            self._set_env(saved_env)
+            out.flush()
+            err.flush()
+        self.requests += 1
+        connection.sendall(_FRAME.pack(EXIT, _STATUS.size) + _STATUS.pack(status))
+
+    @staticmethod
+    def _set_env(env) -> None:
+        """Replace all EMLLM_* environment variables with env"""
+        for name in [name for name in os.environ if name.startswith(ENV_PREFIX)]:
+            if name not in env:
+                del os.environ[name]
+        os.environ.update({name: str(value) for name, value in env.items() if name.startswith(ENV_PREFIX)})
@@ -0,0 +1,77 @@
+"""Write the parts of a message (e.g. an EML script package) to files"""
+from typing import Iterator, List
+from email.message import EmailMessage
+import mimetypes
+import os
+import re
+
+from emllm.core import emllmError
+
+# Names for parts without a filename, as used by EML web app packages
+CONTENT_TYPE_FILENAMES = {
+    'text/html': 'index.html',
+    'text/css': 'style.css',
+    'application/javascript': 'script.js',
+    'text/javascript': 'script.js',
+}
+
+
+def strip_script(data: bytes) -> bytes:
+    """
+    The message part of a shell/EML polyglot (``*.eml.sh``): everything from
+    the first MIME-Version header. Other input is returned unchanged.
+    """
+    if not data.startswith(b'#!'):
+        return data
+    start = data.find(b'\nMIME-Version:')
+    if start < 0:
+        raise emllmError("No MIME-Version header found in script")
+    return data[start + 1:]
+
+
+def _leaf_parts(message: EmailMessage) -> Iterator[EmailMessage]:
+    for part in message.walk():
+        if not part.is_multipart():
+            yield part
+
+
+# NUL and other control characters in a filename make open() fail or misbehave
+_CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def _safe_path(output_dir: str, filename: str) -> str:
+    """Join filename to output_dir with control characters replaced, refusing absolute paths and '..' components"""
+    filename = _CONTROL_CHARACTERS.sub('_', filename)
+    relative = os.path.normpath(filename.replace('\\', '/'))
+    if os.path.isabs(relative) or relative == '..' or relative.startswith('..' + os.sep):
+        raise emllmError(f"Unsafe attachment filename: {filename}")
+    return os.path.join(output_dir, relative)
+
+
+def extract_parts(message: EmailMessage, output_dir: str) -> List[str]:
+    """
+    Write every leaf part, decoded, into output_dir; returns the written paths.
+
+    Parts are named by their filename, by CONTENT_TYPE_FILENAMES, or
+    ``part-N`` with an extension guessed from the content type. A name used
+    twice gets a ``-N`` suffix instead of overwriting the earlier part.
+    """
+    written = []
+    used = set()
+    for number, part in enumerate(_leaf_parts(message), 1):
+        content_type = part.get_content_type()
+        filename = (part.get_filename() or CONTENT_TYPE_FILENAMES.get(content_type)
+                    or f"part-{number}{mimetypes.guess_extension(content_type) or '.bin'}")
+        path = _safe_path(output_dir, filename)
+        stem, extension = os.path.splitext(path)
+        copy = 1
+        while path in used:
+            copy += 1
+            path = f"{stem}-{copy}{extension}"
+        used.add(path)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(part.get_payload(decode=True) or b'')
+        written.append(path)
+    return written
@@ -0,0 +1,228 @@
+"""Persistent sidecar offset index for mbox files"""
+from typing import Dict, Any, Iterator, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import hashlib
+import os
+import sqlite3
+
+from emllm.core import emllmParser, emllmError, MboxReader
+
+INDEX_SUFFIX = '.emllmidx'
+INDEX_VERSION = '1'
+# Bytes hashed at the start of the mbox to detect files that were rewritten rather than appended to
+HEAD_BYTES = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    idx INTEGER PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    message_id TEXT,
+    date REAL,
+    sender TEXT,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+"""
+
+COLUMNS = ('idx', 'offset', 'length', 'message_id', 'date', 'sender', 'sha256')
+
+
+class emllmMailboxIndex:
+    """Sidecar index of an mbox file.
+
+    Stores per-message byte offset, length, Message-ID, Date, From and a
+    SHA-256 content hash in an SQLite file next to the mailbox
+    (``archive.mbox.emllmidx``). ``update()`` only scans bytes appended since
+    the previous run, and reading any message afterwards is a single seek.
+    """
+
+    def __init__(self, mbox_path: str, index_path: Optional[str] = None):
+        if not os.path.isfile(mbox_path):
+            raise emllmError(f"Mailbox not found: {mbox_path}")
+        self.mbox_path = mbox_path
+        self.index_path = index_path or mbox_path + INDEX_SUFFIX
+        self.parser = emllmParser()
+        self.db = sqlite3.connect(self.index_path)
+        self.db.executescript(SCHEMA)
+        self._mbox = None
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Any) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _head_hash(self, length: int) -> str:
+        """Hash of the first min(length, HEAD_BYTES) bytes; appends never change it"""
+        with open(self.mbox_path, 'rb') as f:
+            return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+    def _is_stale(self, size: int) -> bool:
+        indexed_size = int(self._meta('size') or 0)
+        if self._meta('version') != INDEX_VERSION or size < indexed_size:
+            return True
+        return self._meta('head_hash') != self._head_hash(indexed_size)
+
+    def update(self) -> int:
+        """Index messages appended since the last update; returns the number of new entries"""
+        size = os.path.getsize(self.mbox_path)
+        with self.db:
+            if self._is_stale(size):
+                self.db.execute("DELETE FROM messages")
+                self._set_meta('size', 0)
+            if int(self._meta('size') or 0) == size:
+                return 0
+
+            # The previously last message may have grown; re-index it together with the new ones
+            last = self.db.execute(
+                "SELECT idx, offset FROM messages ORDER BY idx DESC LIMIT 1"
+            ).fetchone()
+            next_idx, start = 0, 0
+            if last:
+                next_idx = last[0]
+                self.db.execute("DELETE FROM messages WHERE idx = ?", (next_idx,))
+
+            added = 0
+            with MboxReader(self.mbox_path) as reader:
+                if last:
+                    start = reader.separator_offset(last[1])
+                for offset, length in reader.scan(start):
+                    data = reader.read(offset, length)
+                    self.db.execute(
+                        "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (next_idx + added, offset, length, *self._describe(data))
+                    )
+                    added += 1
+
+            self._set_meta('version', INDEX_VERSION)
+            self._set_meta('size', size)
+            self._set_meta('head_hash', self._head_hash(size))
+        self._reopen()
+        return added - (1 if last else 0)
+
+    def _describe(self, data: bytes):
+        """Message-ID, Date (unix time), From and content hash of a single message"""
+        try:
+            headers = self.parser.parse_headers(data)
+            message_id = headers.get('Message-ID')
+            sender = headers.get('From')
+        except emllmError:
+            headers, message_id, sender = None, None, None
+
+        timestamp = None
+        if headers is not None and headers.get('Date'):
+            try:
+                timestamp = parsedate_to_datetime(str(headers['Date'])).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+        return (
+            str(message_id).strip() if message_id else None,
+            timestamp,
+            str(sender) if sender else None,
+            hashlib.sha256(data).hexdigest()
+        )
+
+    def _row(self, row) -> Optional[Dict[str, Any]]:
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM messages").fetchone()[0]
+
+    def entry(self, idx: int) -> Optional[Dict[str, Any]]:
+        """Index entry of message number idx (negative numbers count from the end)"""
+        if idx < 0:
+            idx += len(self)
+        return self._row(self.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM messages WHERE idx = ?", (idx,)
+        ).fetchone())
+
+    def find(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Index entry for a Message-ID (with or without angle brackets)"""
+        message_id = message_id.strip()
+        if not message_id.startswith('<'):
+            message_id = f"<{message_id}>"
+        return self._row(self.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM messages WHERE message_id = ? ORDER BY idx LIMIT 1",
+            (message_id,)
+        ).fetchone())
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Entries in mailbox order, from message number start up to (excluding) stop"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM messages WHERE idx >= ?"
+        params = [start]
+        if stop is not None:
+            query += " AND idx < ?"
+            params.append(stop)
+        for row in self.db.execute(query + " ORDER BY idx", params):
+            yield self._row(row)
+
+    def range(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Entries with a Date between since and until (unix timestamps, inclusive)"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM messages WHERE date IS NOT NULL"
+        params = []
+        if since is not None:
+            query += " AND date >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND date <= ?"
+            params.append(until)
+        for row in self.db.execute(query + " ORDER BY date, idx", params):
+            yield self._row(row)
+
+    def read(self, entry: Dict[str, Any]) -> bytes:
+        """Raw bytes of an indexed message: one seek and one read"""
+        if self._mbox is None:
+            self._mbox = open(self.mbox_path, 'rb')
+        self._mbox.seek(entry['offset'])
+        return self._mbox.read(entry['length'])
+
+    def get(self, idx: int) -> bytes:
+        entry = self.entry(idx)
+        if entry is None:
+            raise emllmError(f"No message {idx} in {self.mbox_path}")
+        return self.read(entry)
+
+    def get_by_message_id(self, message_id: str) -> bytes:
+        entry = self.find(message_id)
+        if entry is None:
+            raise emllmError(f"No message with Message-ID {message_id} in {self.mbox_path}")
+        return self.read(entry)
+
+    def _reopen(self) -> None:
+        if self._mbox is not None:
+            self._mbox.close()
+            self._mbox = None
+
+    def close(self) -> None:
+        self._reopen()
+        self.db.close()
+
+    def __enter__(self) -> 'emllmMailboxIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_index(mbox_path: str, index_path: Optional[str] = None) -> emllmMailboxIndex:
+    """Open the sidecar index of a mailbox, bringing it up to date with the file"""
+    index = emllmMailboxIndex(mbox_path, index_path)
+    index.update()
+    return index
+
+
+def parse_timestamp(value: str) -> float:
+    """Unix timestamp of an ISO 8601 date/time; values without an offset are taken as UTC"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
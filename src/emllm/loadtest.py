@@ -0,0 +1,376 @@
+"""HTTP load generator for the REST API and the render server"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from contextlib import contextmanager
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import socket
+import threading
+import time
+
+from emllm.bench import percentile
+from emllm.core import emllmError
+
+try:
+    import httpx
+except ImportError:  # dev dependency
+    httpx = None
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests land in the last, open bucket
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Endpoints exercised by default on each server
+TARGET_ENDPOINTS = {
+    'api': ('/parse', '/validate', '/convert'),
+    'render': ('/render', '/api/info'),
+}
+DEFAULT_RENDER_APP = os.path.join('render', 'server.py')
+
+
+def _json_request(raw: bytes, text: str) -> Dict[str, Any]:
+    return {'json': {'content': text}}
+
+
+def _convert_request(raw: bytes, text: str) -> Dict[str, Any]:
+    return {'params': {'from_format': 'emllm', 'to_format': 'json'}, 'json': text}
+
+
+def _upload_request(raw: bytes, text: str) -> Dict[str, Any]:
+    return {'files': {'eml_file': ('message.eml', raw, 'message/rfc822')}}
+
+
+def _render_request(raw: bytes, text: str) -> Dict[str, Any]:
+    return {**_upload_request(raw, text), 'data': {'output_format': 'html'}}
+
+
+# POST request builders per endpoint: (raw message, message as text) -> httpx request arguments
+ENDPOINTS: Dict[str, Callable[[bytes, str], Dict[str, Any]]] = {
+    '/parse': _json_request,
+    '/validate': _json_request,
+    '/convert': _convert_request,
+    '/render': _render_request,
+    '/api/info': _upload_request,
+    '/api/validate': _upload_request,
+}
+
+
+class EndpointStats:
+    """Latencies, status codes and transport errors of one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def record(self, latency: float, status: Optional[int] = None, error: Optional[str] = None) -> None:
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] += 1
+        else:
+            self.statuses[status] += 1
+
+    def merge(self, other: 'EndpointStats') -> None:
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        total = len(self.latencies)
+        if not total:
+            return {'requests': 0}
+        failed = sum(self.errors.values()) + sum(n for status, n in self.statuses.items() if status >= 500)
+        rejected = sum(n for status, n in self.statuses.items() if 400 <= status < 500)
+        latencies = sorted(self.latencies)
+        histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        bucket = 0
+        for latency in latencies:
+            while bucket < len(LATENCY_BUCKETS_MS) and latency * 1000 > LATENCY_BUCKETS_MS[bucket]:
+                bucket += 1
+            histogram[bucket] += 1
+        return {
+            'requests': total,
+            'requests_per_second': round(total / elapsed, 2) if elapsed else None,
+            'statuses': {str(status): n for status, n in sorted(self.statuses.items())},
+            'errors': dict(self.errors),
+            # Transport errors and 5xx responses; 4xx answers to defective input are counted separately
+            'error_rate': round(failed / total, 4),
+            'rejected_rate': round(rejected / total, 4),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p90': round(percentile(latencies, 0.90) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3),
+            },
+            'histogram': [
+                {'le_ms': bound, 'count': count}
+                for bound, count in zip(LATENCY_BUCKETS_MS + (None,), histogram)
+            ],
+        }
+
+
+class ResourceSampler:
+    """
+    Periodically samples CPU time and resident memory of a server process.
+
+    Reads /proc/<pid> on Linux; elsewhere only the current process can be
+    observed (through getrusage, which reports the peak RSS only).
+    """
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.25):
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.samples: List[Tuple[float, float, int]] = []
+        self._stopped = asyncio.Event()
+
+    def read(self) -> Optional[Tuple[float, int]]:
+        """(CPU seconds, RSS bytes) of the process, or None if it cannot be observed"""
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm') as f:
+                pages = int(f.read().split()[1])
+            ticks = os.sysconf('SC_CLK_TCK')
+            return (int(fields[11]) + int(fields[12])) / ticks, pages * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            pass
+        if self.pid != os.getpid():
+            return None
+        try:
+            import resource
+        except ImportError:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        rss = usage.ru_maxrss if platform.system() == 'Darwin' else usage.ru_maxrss * 1024
+        return usage.ru_utime + usage.ru_stime, rss
+
+    def sample(self) -> None:
+        reading = self.read()
+        if reading is not None:
+            self.samples.append((time.perf_counter(), *reading))
+
+    async def run(self) -> None:
+        self.sample()
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.sample()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def summary(self) -> Dict[str, Any]:
+        if len(self.samples) < 2:
+            return {'pid': self.pid, 'available': False}
+        (started, cpu_start, _), (ended, cpu_end, _) = self.samples[0], self.samples[-1]
+        rss = [sample[2] for sample in self.samples]
+        cpu = cpu_end - cpu_start
+        return {
+            'pid': self.pid,
+            'available': True,
+            'cpu_seconds': round(cpu, 3),
+            'cpu_percent': round(100 * cpu / (ended - started), 1) if ended > started else None,
+            'rss_peak_bytes': max(rss),
+            'rss_mean_bytes': int(sum(rss) / len(rss)),
+            'samples': len(self.samples),
+        }
+
+
+def _schedule(endpoints: Sequence[str], messages: int) -> Iterator[Tuple[str, int]]:
+    """Endpoint and message number of request 0, 1, ...: endpoints round-robin over the corpus"""
+    for number in itertools.count():
+        yield endpoints[number % len(endpoints)], (number // len(endpoints)) % messages
+
+
+async def run_load(base_url: str, messages: Sequence[bytes], endpoints: Sequence[str],
+                   concurrency: int = 10, rps: Optional[float] = None, duration: float = 10.0,
+                   requests: Optional[int] = None, timeout: float = 30.0,
+                   server_pid: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Replay messages against endpoints until duration seconds passed or requests were sent.
+
+    Without rps, concurrency workers send requests back to back (closed loop).
+    With rps, requests are started on a fixed schedule with at most
+    concurrency in flight (open loop); latency is then measured from the
+    scheduled start, so a saturated server shows up as queueing delay
+    instead of a lower request rate.
+    """
+    if httpx is None:
+        raise emllmError("Load testing requires httpx (pip install httpx)")
+    unknown = [endpoint for endpoint in endpoints if endpoint not in ENDPOINTS]
+    if unknown or not endpoints:
+        raise emllmError(f"Unknown endpoints: {', '.join(unknown)} (use: {', '.join(ENDPOINTS)})")
+    if not messages:
+        raise emllmError("Empty corpus")
+
+    texts = [raw.decode('utf-8', 'replace') for raw in messages]
+    stats = {endpoint: EndpointStats() for endpoint in endpoints}
+    schedule = _schedule(endpoints, len(messages))
+    sampler = ResourceSampler(server_pid)
+    deadline = time.perf_counter() + duration if duration else None
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def send(endpoint: str, index: int, started: float) -> None:
+            try:
+                response = await client.post(endpoint, **ENDPOINTS[endpoint](messages[index], texts[index]))
+                await response.aread()
+                stats[endpoint].record(time.perf_counter() - started, status=response.status_code)
+            except httpx.HTTPError as e:
+                stats[endpoint].record(time.perf_counter() - started, error=type(e).__name__)
+
+        def remaining(sent: int) -> bool:
+            if requests is not None and sent >= requests:
+                return False
+            return deadline is None or time.perf_counter() < deadline
+
+        sampling = asyncio.ensure_future(sampler.run())
+        started = time.perf_counter()
+        sent = 0
+        if rps is None:
+            async def worker() -> None:
+                nonlocal sent
+                while remaining(sent):
+                    sent += 1
+                    endpoint, index = next(schedule)
+                    await send(endpoint, index, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        else:
+            in_flight = asyncio.Semaphore(concurrency)
+            tasks = set()
+
+            async def limited(endpoint: str, index: int, scheduled: float) -> None:
+                async with in_flight:
+                    await send(endpoint, index, scheduled)
+
+            while remaining(sent):
+                scheduled = started + sent / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                endpoint, index = next(schedule)
+                task = asyncio.ensure_future(limited(endpoint, index, scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+            if tasks:
+                await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        await sampling
+
+    totals = EndpointStats()
+    for endpoint_stats in stats.values():
+        totals.merge(endpoint_stats)
+    return {
+        'meta': {
+            'url': base_url,
+            'endpoints': list(endpoints),
+            'mode': 'open' if rps is not None else 'closed',
+            'concurrency': concurrency,
+            'rps': rps,
+            'messages': len(messages),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'totals': totals.summary(elapsed),
+        'endpoints': {endpoint: endpoint_stats.summary(elapsed) for endpoint, endpoint_stats in stats.items()},
+        'server': sampler.summary(),
+    }
+
+
+def load_wsgi_app(path: str):
+    """The ``app`` object of a server module given by file path (e.g. render/server.py)"""
+    if not os.path.isfile(path):
+        raise emllmError(f"Server module not found: {path}")
+    spec = importlib.util.spec_from_file_location('emllm_loadtest_server', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+@contextmanager
+def serve(target: str = 'api', app_path: str = DEFAULT_RENDER_APP, host: str = '127.0.0.1') -> Iterator[str]:
+    """Run a server in a background thread of this process; yields its base URL"""
+    if target == 'api':
+        import uvicorn
+        from emllm.api import app
+
+        # An explicit IPPROTO_TCP lets asyncio enable TCP_NODELAY on accepted connections;
+        # without it small responses wait for delayed ACKs (~40 ms per request)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, 0))
+        server = uvicorn.Server(uvicorn.Config(app, log_level='warning'))
+        thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise emllmError("REST server failed to start")
+            time.sleep(0.01)
+        try:
+            yield f"http://{host}:{sock.getsockname()[1]}"
+        finally:
+            server.should_exit = True
+            thread.join()
+            sock.close()
+    elif target == 'render':
+        from werkzeug.serving import make_server
+
+        server = make_server(host, 0, load_wsgi_app(app_path), threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://{host}:{server.server_port}"
+        finally:
+            server.shutdown()
+            thread.join()
+    else:
+        raise emllmError(f"Unknown target: {target} (use one of: {', '.join(TARGET_ENDPOINTS)})")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'endpoint':<16} {'requests':>9} {'req/s':>9} {'errors':>8} {'4xx':>7} "
+             f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for name, summary in [*report['endpoints'].items(), ('total', report['totals'])]:
+        if not summary['requests']:
+            lines.append(f"{name:<16} {0:>9}")
+            continue
+        latency = summary['latency_ms']
+        lines.append(
+            f"{name:<16} {summary['requests']:>9} {summary['requests_per_second']:>9.1f} "
+            f"{summary['error_rate']:>8.2%} {summary['rejected_rate']:>7.2%} {latency['p50']:>9.2f} "
+            f"{latency['p90']:>9.2f} {latency['p99']:>9.2f} {latency['max']:>9.2f}"
+        )
+
+    totals = report['totals']
+    if totals['requests']:
+        lines.append('')
+        lines.append('latency histogram (all endpoints):')
+        peak = max(bucket['count'] for bucket in totals['histogram'])
+        lower = 0
+        for bucket in totals['histogram']:
+            label = f"{lower}-{bucket['le_ms']} ms" if bucket['le_ms'] else f">{lower} ms"
+            bar = '#' * (round(40 * bucket['count'] / peak) if peak else 0)
+            if bucket['count']:
+                lines.append(f"  {label:>14} {bucket['count']:>8} {bar}")
+            lower = bucket['le_ms']
+        if totals['errors']:
+            lines.append(f"transport errors: {json.dumps(totals['errors'])}")
+
+    server = report['server']
+    if server.get('available'):
+        lines.append('')
+        lines.append(
+            f"server pid {server['pid']}: CPU {server['cpu_seconds']:.2f} s ({server['cpu_percent']}%), "
+            f"RSS peak {server['rss_peak_bytes'] / (1024 * 1024):.1f} MB, "
+            f"mean {server['rss_mean_bytes'] / (1024 * 1024):.1f} MB"
+        )
+    return '\n'.join(lines)
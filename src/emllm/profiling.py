@@ -0,0 +1,230 @@
+"""Opt-in profiling: cProfile or stack sampling plus a per-stage / per-MIME-part span breakdown"""
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import io
+import os
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
+# cProfile, pstats and emllm.core are imported on use: metrics (and so every
+# CLI command and API request) imports this module
+
+PROFILE_MODES = ('cprofile', 'sample')
+# Default file suffix per mode: pstats dump, or collapsed stacks (flamegraph.pl, speedscope)
+PROFILE_SUFFIXES = {'cprofile': '.prof', 'sample': '.collapsed'}
+SAMPLE_INTERVAL = 0.001
+
+
+class Span(NamedTuple):
+    name: str
+    start: float
+    duration: float
+    attributes: Dict[str, Any]
+
+
+# Spans of the profiled run in the current context; None (the normal case) disables collection
+_spans: ContextVar[Optional[List[Span]]] = ContextVar('emllm_spans', default=None)
+
+
+def add_span(name: str, start: float, duration: float, **attributes) -> None:
+    """Record a finished span if a profiled run is collecting them (a single lookup otherwise)"""
+    spans = _spans.get()
+    if spans is not None:
+        spans.append(Span(name, start, duration, attributes))
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Span]]:
+    spans: List[Span] = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def _part_path(message: 'EmailMessage') -> Iterator[tuple]:
+    """(dotted part number, part) for every leaf part, e.g. '2.1' for the first subpart of part 2"""
+    stack = [('', message)]
+    while stack:
+        prefix, part = stack.pop()
+        if part.is_multipart():
+            children = part.get_payload()
+            for number in range(len(children), 0, -1):
+                stack.append((f"{prefix}.{number}" if prefix else str(number), children[number - 1]))
+        else:
+            yield prefix or '1', part
+
+
+def record_parts(message: 'EmailMessage') -> None:
+    """
+    Time decoding of every leaf MIME part of a parsed message as 'part' spans.
+
+    Only runs during a profiled run: each part is decoded once more, on top
+    of the normal processing, to show which part is expensive.
+    """
+    if _spans.get() is None:
+        return
+    for number, part in _part_path(message):
+        started = time.perf_counter()
+        payload = part.get_payload(decode=True) or b''
+        duration = time.perf_counter() - started
+        add_span('part', started, duration, part=number, content_type=part.get_content_type(),
+                 encoding=str(part.get('Content-Transfer-Encoding', '7bit')).lower(),
+                 filename=part.get_filename(), decoded_bytes=len(payload))
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval.
+
+    The result is in collapsed-stack format ("root;caller;callee count"),
+    readable by flamegraph.pl and speedscope. Overhead is bounded by the
+    interval instead of growing with the number of calls, but a sample can
+    only be taken when the sampling thread gets the GIL.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _frames(self, frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._frames(frame)] += 1
+
+    def start(self) -> None:
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='emllm-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class emllmProfiler:
+    """
+    Profile a block of code and collect its spans.
+
+    ``cprofile`` traces every call (exact counts, higher overhead) and saves
+    a pstats file; ``sample`` uses SamplingProfiler and saves collapsed
+    stacks. Nothing is installed or recorded outside the ``with`` block.
+    """
+
+    def __init__(self, mode: str = 'cprofile', interval: float = SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            from emllm.core import emllmError
+            raise emllmError(f"Unknown profile mode: {mode} (use one of: {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+        self.spans: List[Span] = []
+        self.elapsed = 0.0
+        self._collecting = None
+
+    def __enter__(self) -> 'emllmProfiler':
+        self._collecting = collect_spans()
+        self.spans = self._collecting.__enter__()
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = SamplingProfiler(self.interval)
+            self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+        else:
+            self.sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+        self._collecting.__exit__(*exc_info)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Write the profile (pstats or collapsed stacks); returns the path"""
+        path = path or 'emllm' + PROFILE_SUFFIXES[self.mode]
+        if self.profile is not None:
+            self.profile.dump_stats(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(self.sampler.collapsed())
+        return path
+
+    def top(self, limit: int = 20) -> str:
+        """Hottest functions: cumulative time for cProfile, own samples for sampling"""
+        if self.profile is not None:
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+        leaves = Counter()
+        for stack, count in self.sampler.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return '\n'.join(f"{count:>7} {count / total:>6.1%}  {name}" for name, count in leaves.most_common(limit))
+
+    def breakdown(self) -> str:
+        return format_spans(self.spans, self.elapsed)
+
+
+def format_spans(spans: List[Span], elapsed: Optional[float] = None) -> str:
+    """Table of spans: per-stage totals, then the slowest MIME parts"""
+    stages: Dict[str, List[float]] = {}
+    for span in spans:
+        if span.name != 'part':
+            stages.setdefault(span.name, []).append(span.duration)
+
+    lines = [f"{'stage':<14} {'calls':>7} {'total ms':>10} {'max ms':>9}"]
+    for name, durations in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        lines.append(f"{name:<14} {len(durations):>7} {sum(durations) * 1000:>10.3f} {max(durations) * 1000:>9.3f}")
+    if elapsed is not None:
+        lines.append(f"{'wall time':<14} {'':>7} {elapsed * 1000:>10.3f}")
+
+    parts = sorted((span for span in spans if span.name == 'part'), key=lambda span: -span.duration)
+    if parts:
+        lines.append('')
+        lines.append(f"{'part':<8} {'decode ms':>10} {'bytes':>10}  type")
+        for span in parts[:10]:
+            attributes = span.attributes
+            description = f"{attributes['content_type']} ({attributes['encoding']})"
+            if attributes.get('filename'):
+                description += f" {attributes['filename']}"
+            lines.append(f"{attributes['part']:<8} {span.duration * 1000:>10.3f} "
+                         f"{attributes['decoded_bytes']:>10}  {description}")
+    return '\n'.join(lines)
+
+
+def server_timing(spans: List[Span]) -> str:
+    """Stage totals as a Server-Timing header value (shown by browser developer tools)"""
+    totals: Dict[str, float] = {}
+    for span in spans:
+        name = 'part_decode' if span.name == 'part' else span.name
+        totals[name] = totals.get(name, 0.0) + span.duration
+    return ', '.join(f"{name};dur={duration * 1000:.3f}" for name, duration in totals.items())
@@ -0,0 +1,268 @@
+"""On-disk header search index over message collections (SQLite FTS5)"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from email.utils import parsedate_to_datetime
+import glob
+import os
+import re
+import sqlite3
+
+from emllm.core import emllmParser, emllmError, MaildirReader, is_maildir, is_mbox
+
+DEFAULT_INDEX = 'emllm-search.db'
+MESSAGE_SUFFIXES = ('.eml', '.emllm')
+
+# Query prefixes accepted by search(), mapped to index columns
+FIELDS = {
+    'from': 'sender',
+    'to': 'recipients',
+    'subject': 'subject',
+    'message-id': 'message_id',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    last_sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    message_id TEXT,
+    sender TEXT,
+    recipients TEXT,
+    subject TEXT,
+    date REAL
+);
+CREATE INDEX IF NOT EXISTS messages_source ON messages (source_id, idx);
+CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS headers USING fts5(
+    message_id, sender, recipients, subject,
+    content='messages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO headers (rowid, message_id, sender, recipients, subject)
+    VALUES (new.id, new.message_id, new.sender, new.recipients, new.subject);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO headers (headers, rowid, message_id, sender, recipients, subject)
+    VALUES ('delete', old.id, old.message_id, old.sender, old.recipients, old.subject);
+END;
+"""
+
+RESULT_COLUMNS = ('path', 'idx', 'message_id', 'sender', 'recipients', 'subject', 'date')
+TERM_PATTERN = re.compile(r'(?:(\w[\w-]*):)?("[^"]*"|\S+)')
+
+
+def _iter_files(inputs: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Expand inputs into ('mbox' | 'file', path) pairs; directories are walked recursively"""
+    for entry in inputs:
+        paths = [entry] if os.path.exists(entry) else sorted(glob.glob(entry, recursive=True))
+        if not paths:
+            raise emllmError(f"No such file, directory or pattern: {entry}")
+        for path in paths:
+            if os.path.isdir(path):
+                if is_maildir(path):
+                    for file_path in MaildirReader(path).files:
+                        yield 'file', file_path
+                    continue
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    if is_maildir(root):
+                        dirs[:] = []
+                        yield from _iter_files([root])
+                        continue
+                    for filename in sorted(files):
+                        if filename.endswith(MESSAGE_SUFFIXES + ('.mbox',)):
+                            yield from _iter_files([os.path.join(root, filename)])
+            elif is_mbox(path):
+                yield 'mbox', path
+            else:
+                yield 'file', path
+
+
+def build_query(query: str) -> str:
+    """Translate user input into an FTS5 expression.
+
+    Every term is quoted, so addresses like ``alice@example.com`` match as a
+    phrase. ``from:``, ``to:``, ``subject:`` and ``message-id:`` prefixes
+    restrict a term to one header and a trailing ``*`` makes it a prefix match.
+    """
+    terms = []
+    for field, value in TERM_PATTERN.findall(query):
+        prefix = value.endswith('*') and not value.startswith('"')
+        value = value.rstrip('*').strip('"').replace('"', '""')
+        if not value:
+            continue
+        term = f'"{value}"' + (' *' if prefix else '')
+        if field:
+            column = FIELDS.get(field.lower())
+            if column is None:
+                raise emllmError(f"Unknown search field: {field} (use one of: {', '.join(FIELDS)})")
+            term = f'{column} : {term}'
+        terms.append(term)
+    if not terms:
+        raise emllmError("Empty search query")
+    return ' AND '.join(terms)
+
+
+class emllmSearchIndex:
+    """Inverted index over From/To/Cc/Subject/Message-ID headers.
+
+    Headers are extracted with ``emllmParser.parse_headers`` and stored in an
+    SQLite FTS5 table. ``update()`` is incremental: unchanged files are
+    skipped, and mbox files only have their newly appended messages indexed
+    (via the mailbox offset index).
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX):
+        self.path = path
+        self.parser = emllmParser()
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def update(self, inputs: Iterable[str]) -> int:
+        """Index new or changed messages below inputs; returns the number of messages added"""
+        added = 0
+        for kind, path in _iter_files(inputs):
+            with self.db:
+                if kind == 'mbox':
+                    added += self._update_mbox(path)
+                else:
+                    added += self._update_file(path)
+        return added
+
+    def prune(self) -> int:
+        """Drop sources whose files no longer exist; returns the number of sources removed"""
+        removed = 0
+        with self.db:
+            for source_id, path in self.db.execute("SELECT id, path FROM sources").fetchall():
+                if not os.path.exists(path):
+                    self._drop_source(source_id)
+                    removed += 1
+        return removed
+
+    def _source(self, path: str) -> Optional[Tuple]:
+        return self.db.execute(
+            "SELECT id, size, mtime, messages, last_sha256 FROM sources WHERE path = ?", (path,)
+        ).fetchone()
+
+    def _drop_source(self, source_id: int) -> None:
+        self.db.execute("DELETE FROM messages WHERE source_id = ?", (source_id,))
+        self.db.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+
+    def _register(self, path: str, stat: os.stat_result, messages: int, last_sha256: Optional[str]) -> int:
+        self.db.execute(
+            "INSERT INTO sources (path, size, mtime, messages, last_sha256) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, "
+            "messages = excluded.messages, last_sha256 = excluded.last_sha256",
+            (path, stat.st_size, stat.st_mtime, messages, last_sha256)
+        )
+        return self._source(path)[0]
+
+    def _update_file(self, path: str) -> int:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        source = self._source(path)
+        if source and source[1] == stat.st_size and source[2] == stat.st_mtime:
+            return 0
+        if source:
+            self._drop_source(source[0])
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        source_id = self._register(path, stat, 1, None)
+        self._insert(source_id, 0, data)
+        return 1
+
+    def _update_mbox(self, path: str) -> int:
+        from emllm.index import open_index
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        source = self._source(path)
+        if source and source[1] == stat.st_size and source[2] == stat.st_mtime:
+            return 0
+
+        with open_index(path) as mailbox:
+            indexed = source[3] if source else 0
+            previous = mailbox.entry(indexed - 1) if indexed else None
+            if source and (indexed > len(mailbox) or previous is None or previous['sha256'] != source[4]):
+                # The last indexed message changed or disappeared: the mailbox
+                # was rewritten (or its last message grown), so start over
+                self._drop_source(source[0])
+                indexed = 0
+
+            last_sha256 = mailbox.entry(-1)['sha256'] if len(mailbox) else None
+            source_id = self._register(path, stat, len(mailbox), last_sha256)
+            for entry in mailbox.entries(indexed):
+                self._insert(source_id, entry['idx'], mailbox.read(entry))
+            return len(mailbox) - indexed
+
+    def _insert(self, source_id: int, idx: int, data: bytes) -> None:
+        try:
+            headers = self.parser.parse_headers(data)
+        except emllmError:
+            return
+
+        def header(name: str) -> Optional[str]:
+            value = headers.get(name)
+            return str(value) if value is not None else None
+
+        recipients = ', '.join(filter(None, (header('To'), header('Cc'))))
+        timestamp = None
+        if headers.get('Date'):
+            try:
+                timestamp = parsedate_to_datetime(header('Date')).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+        self.db.execute(
+            "INSERT INTO messages (source_id, idx, message_id, sender, recipients, subject, date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (source_id, idx, (header('Message-ID') or '').strip() or None,
+             header('From'), recipients or None, header('Subject'), timestamp)
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text header search, best matches first"""
+        try:
+            rows = self.db.execute(
+                "SELECT s.path, m.idx, m.message_id, m.sender, m.recipients, m.subject, m.date "
+                "FROM headers JOIN messages m ON m.id = headers.rowid "
+                "JOIN sources s ON s.id = m.source_id "
+                "WHERE headers MATCH ? ORDER BY headers.rank LIMIT ?",
+                (build_query(query), limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise emllmError(f"Invalid search query: {str(e)}")
+        return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+    def find_message_id(self, message_id: str) -> List[Dict[str, Any]]:
+        """Exact Message-ID lookup (with or without angle brackets)"""
+        message_id = message_id.strip()
+        if not message_id.startswith('<'):
+            message_id = f"<{message_id}>"
+        rows = self.db.execute(
+            "SELECT s.path, m.idx, m.message_id, m.sender, m.recipients, m.subject, m.date "
+            "FROM messages m JOIN sources s ON s.id = m.source_id WHERE m.message_id = ?",
+            (message_id,)
+        ).fetchall()
+        return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> 'emllmSearchIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
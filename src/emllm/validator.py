@@ -1,56 +1,344 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from array import array
+from functools import lru_cache
+import json
 import re
-from email.utils import parseaddr
+from email.utils import getaddresses
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})$')
+CONTENT_TYPE_PATTERN = re.compile(r'^[a-z]+/[a-z0-9.-]+$', re.IGNORECASE)
+
+# Error bits of the per-message bitmap returned by emllmValidator.validate_many()
+MISSING_FROM = 1 << 0
+MISSING_TO = 1 << 1
+MISSING_SUBJECT = 1 << 2
+INVALID_FROM = 1 << 3
+INVALID_TO = 1 << 4
+MISSING_CONTENT_TYPE = 1 << 5
+INVALID_CONTENT_TYPE = 1 << 6
+
+ERROR_MESSAGES = {
+    MISSING_FROM: "Missing required header: From",
+    MISSING_TO: "Missing required header: To",
+    MISSING_SUBJECT: "Missing required header: Subject",
+    INVALID_FROM: "Invalid email address in From",
+    INVALID_TO: "Invalid email address in To",
+    MISSING_CONTENT_TYPE: "Attachment: Missing content_type",
+    INVALID_CONTENT_TYPE: "Attachment: Invalid content_type",
+}
+
+ISSUE_MESSAGES = {
+    'missing_header': "Missing required header: {field}",
+    'header_mismatch': "Header {field} does not match the allowed patterns: {value}",
+    'invalid_address': "Invalid email address in {field}: {value}",
+    'domain_denied': "Denied domain in {field}: {value}",
+    'domain_not_allowed': "Domain not allowed in {field}: {value}",
+    'too_many_attachments': "Too many attachments: {value}",
+    'missing_content_type': "Attachment {number}: Missing content_type",
+    'invalid_content_type': "Attachment {number}: Invalid content_type: {value}",
+    'content_type_not_allowed': "Attachment {number}: content_type not allowed: {value}",
+    'attachment_too_large': "Attachment {number}: {value} bytes exceeds the size limit",
+}
+
+# Keys accepted in a rule config (see compile_rules)
+RULE_KEYS = (
+    'required_headers', 'address_headers', 'header_patterns', 'allowed_content_types',
+    'max_attachment_size', 'max_attachments', 'allowed_domains', 'denied_domains',
+)
+
+# check() modes
+COLLECT_ALL = 'collect_all'
+FAIL_FAST = 'fail_fast'
+MODES = (COLLECT_ALL, FAIL_FAST)
+
+# Distinct address headers remembered by each validator (From/To values recur a lot)
+ADDRESS_CACHE_SIZE = 4096
+
+
+def describe_errors(mask: int) -> List[str]:
+    """Error messages for one entry of a validate_many() bitmap"""
+    return [message for bit, message in ERROR_MESSAGES.items() if mask & bit]
+
+
+def split_addresses(value: str) -> List[str]:
+    """Addresses in an address-list header value (an empty header yields one empty address)"""
+    return [address for _, address in getaddresses([str(value)])] or ['']
+
+
+def _match_all(pattern: 're.Pattern', values: List[str]) -> List[bool]:
+    """Match pattern against many (distinct) strings, with the same semantics as check()"""
+    return [pattern.match(value) is not None for value in values]
+
+class ValidationIssue(NamedTuple):
+    """A single validation problem: machine-readable code, the header or field, and attachment index"""
+    code: str
+    field: str
+    index: Optional[int] = None
+    value: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        number = self.index + 1 if self.index is not None else None
+        return ISSUE_MESSAGES[self.code].format(field=self.field, number=number, value=self.value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self._asdict(), 'message': self.message}
+
+
+class ValidationResult(NamedTuple):
+    """Outcome of emllmValidator.check(); truthy when the message is valid"""
+    issues: Tuple[ValidationIssue, ...] = ()
+
+    @property
+    def valid(self) -> bool:
+        return not self.issues
+
+    def __bool__(self) -> bool:
+        return self.valid
+
+    def messages(self) -> List[str]:
+        return [issue.message for issue in self.issues]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'valid': self.valid, 'issues': [issue.to_dict() for issue in self.issues]}
+
+
+def _domain_in(domain: str, domains: frozenset) -> bool:
+    """True if domain or any parent domain is in the set"""
+    labels = domain.split('.')
+    return any('.'.join(labels[i:]) in domains for i in range(len(labels)))
+
+
+class ValidationPlan:
+    """
+    A rule config compiled for fast evaluation.
+
+    Every header pattern list becomes a single alternation regex, domain and
+    content type lists become frozensets, and evaluate() checks everything in
+    one pass over the message dict.
+    """
+
+    def __init__(self, required_headers: Iterable[str] = ('From', 'To', 'Subject'),
+                 address_headers: Iterable[str] = ('From', 'To'),
+                 header_patterns: Optional[Dict[str, List[str]]] = None,
+                 allowed_content_types: Optional[Iterable[str]] = None,
+                 max_attachment_size: Optional[int] = None,
+                 max_attachments: Optional[int] = None,
+                 allowed_domains: Optional[Iterable[str]] = None,
+                 denied_domains: Optional[Iterable[str]] = None):
+        self.required_headers = tuple(required_headers)
+        self.address_headers = tuple(address_headers)
+        self.header_patterns = {
+            field: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+            for field, patterns in (header_patterns or {}).items()
+        }
+        self.content_types = None
+        self.content_maintypes = None
+        if allowed_content_types is not None:
+            allowed = [content_type.lower() for content_type in allowed_content_types]
+            self.content_types = frozenset(t for t in allowed if not t.endswith('/*'))
+            self.content_maintypes = frozenset(t[:-2] for t in allowed if t.endswith('/*'))
+        self.max_attachment_size = max_attachment_size
+        self.max_attachments = max_attachments
+        self.allowed_domains = frozenset(d.lower() for d in allowed_domains) if allowed_domains is not None else None
+        self.denied_domains = frozenset(d.lower() for d in denied_domains or ())
+
+    def evaluate(self, data: Dict[str, Any], address_issues=None) -> Iterator[ValidationIssue]:
+        """Yield the issues of one message; address_issues may be a cached address_issues()"""
+        address_issues = address_issues or self.address_issues
+        headers = data.get('headers', {})
+        for header in self.required_headers:
+            if header not in headers:
+                yield ValidationIssue('missing_header', header)
+        for field in self.address_headers:
+            if field in headers:
+                for code, address in address_issues(str(headers[field])):
+                    yield ValidationIssue(code, field, value=address)
+        for field, pattern in self.header_patterns.items():
+            if field in headers and not pattern.search(str(headers[field])):
+                yield ValidationIssue('header_mismatch', field, value=str(headers[field]))
+
+        attachments = data.get('attachments', [])
+        if self.max_attachments is not None and len(attachments) > self.max_attachments:
+            yield ValidationIssue('too_many_attachments', 'attachments', value=str(len(attachments)))
+        for i, attachment in enumerate(attachments):
+            content_type = attachment.get('content_type', '')
+            if not content_type:
+                yield ValidationIssue('missing_content_type', 'content_type', i)
+            elif not CONTENT_TYPE_PATTERN.match(content_type):
+                yield ValidationIssue('invalid_content_type', 'content_type', i, content_type)
+            elif self.content_types is not None and not self._content_type_allowed(content_type.lower()):
+                yield ValidationIssue('content_type_not_allowed', 'content_type', i, content_type)
+            if self.max_attachment_size is not None:
+                size = attachment.get('size')
+                if size is None:
+                    size = len(attachment.get('content') or b'')
+                if size > self.max_attachment_size:
+                    yield ValidationIssue('attachment_too_large', 'content', i, str(size))
+
+    def _content_type_allowed(self, content_type: str) -> bool:
+        return content_type in self.content_types or content_type.split('/', 1)[0] in self.content_maintypes
+
+    def address_issues(self, value: str) -> Tuple[Tuple[str, str], ...]:
+        """(code, address) pairs for the problem addresses of an address-list header value"""
+        issues = []
+        for address in split_addresses(value):
+            match = EMAIL_PATTERN.match(address) if address else None
+            if match is None:
+                issues.append(('invalid_address', address))
+                continue
+            domain = match.group(1).lower()
+            if self.denied_domains and _domain_in(domain, self.denied_domains):
+                issues.append(('domain_denied', address))
+            elif self.allowed_domains is not None and not _domain_in(domain, self.allowed_domains):
+                issues.append(('domain_not_allowed', address))
+        return tuple(issues)
+
+
+def compile_rules(rules: Optional[Dict[str, Any]] = None, **defaults) -> ValidationPlan:
+    """Compile a rule config dict (keys: RULE_KEYS) into a ValidationPlan"""
+    rules = dict(rules or {})
+    unknown = set(rules) - set(RULE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown validation rules: {', '.join(sorted(unknown))}")
+    try:
+        if rules.get('header_patterns'):
+            rules['header_patterns'] = {
+                field: [patterns] if isinstance(patterns, str) else list(patterns)
+                for field, patterns in rules['header_patterns'].items()
+            }
+        return ValidationPlan(**{**defaults, **rules})
+    except (re.error, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid validation rules: {str(e)}")
+
+
+def load_rules(path: str) -> ValidationPlan:
+    """Load and compile a JSON or YAML (requires PyYAML) rule file"""
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required to load YAML rule files")
+            rules = yaml.safe_load(f)
+        else:
+            rules = json.load(f)
+    if rules is not None and not isinstance(rules, dict):
+        raise ValueError(f"Rule file must contain a mapping: {path}")
+    return compile_rules(rules)
+
+
 class emllmValidator:
     REQUIRED_HEADERS = ['From', 'To', 'Subject']
-    
+
+    def __init__(self, address_cache_size: int = ADDRESS_CACHE_SIZE, log_errors: bool = True,
+                 rules: Optional[Union[Dict[str, Any], ValidationPlan]] = None):
+        self.log_errors = log_errors
+        self.plan = rules if isinstance(rules, ValidationPlan) else compile_rules(
+            rules, required_headers=self.REQUIRED_HEADERS
+        )
+        # Per-instance LRU cache: repeat senders cost one dict lookup
+        self._invalid_addresses = lru_cache(maxsize=address_cache_size)(self.plan.address_issues)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics of the address validation cache"""
+        info = self._invalid_addresses.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hit_ratio': round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear_cache(self) -> None:
+        self._invalid_addresses.cache_clear()
+
     def validate(self, data: Dict[str, Any]) -> None:
-        """Validate emllm message data"""
-        errors = []
-        
+        """Validate emllm message data, raising ValueError with one line per problem"""
         try:
-            self._validate_required_headers(data, errors)
-            self._validate_email_addresses(data, errors)
-            self._validate_content_type(data, errors)
-            
-            if errors:
-                raise ValueError("\n".join(errors))
+            result = self.check(data)
+            if not result.valid:
+                raise ValueError("\n".join(result.messages()))
         except Exception as e:
-            logger.error(f"Validation error: {str(e)}")
+            if self.log_errors:
+                logger.error(f"Validation error: {str(e)}")
             raise
 
-    def _validate_required_headers(self, data: Dict[str, Any], errors: list) -> None:
-        """Check if all required headers are present"""
-        headers = data.get('headers', {})
-        for header in self.REQUIRED_HEADERS:
-            if header not in headers:
-                errors.append(f"Missing required header: {header}")
+    def check(self, data: Dict[str, Any], mode: str = COLLECT_ALL) -> ValidationResult:
+        """
+        Validate emllm message data without raising or logging.
 
-    def _validate_email_addresses(self, data: Dict[str, Any], errors: list) -> None:
-        """Validate email addresses in From and To headers"""
-        headers = data.get('headers', {})
-        
-        for field in ['From', 'To']:
-            if field in headers:
-                email_addr = parseaddr(headers[field])[1]
-                if not self._is_valid_email(email_addr):
-                    errors.append(f"Invalid email address in {field}: {email_addr}")
+        In ``collect_all`` mode every problem is reported; ``fail_fast`` stops
+        at the first one, which is all a yes/no decision needs.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown validation mode: {mode}")
+        issues = self._iter_issues(data)
+        if mode == FAIL_FAST:
+            first = next(issues, None)
+            return ValidationResult((first,) if first else ())
+        return ValidationResult(tuple(issues))
 
-    def _validate_content_type(self, data: Dict[str, Any], errors: list) -> None:
-        """Validate content types of attachments"""
-        for i, attachment in enumerate(data.get('attachments', [])):
-            content_type = attachment.get('content_type', '')
-            if not content_type:
-                errors.append(f"Attachment {i+1}: Missing content_type")
-                continue
-            
-            if not re.match(r'^[a-z]+/[a-z0-9.-]+$', content_type, re.IGNORECASE):
-                errors.append(f"Attachment {i+1}: Invalid content_type: {content_type}")
+    def _iter_issues(self, data: Dict[str, Any]) -> Iterator[ValidationIssue]:
+        return self.plan.evaluate(data, self._invalid_addresses)
+
+    def validate_many(self, messages: Iterable[Dict[str, Any]]) -> array:
+        """
+        Validate many messages at once without raising.
+
+        Header and content_type values are gathered into columns, deduplicated
+        and each distinct value is checked once. Returns one byte per message
+        (``array('B')``) whose bits are the module-level error flags; 0 means
+        valid. ``numpy.frombuffer(result, dtype=numpy.uint8)`` views it without
+        copying, and describe_errors() turns an entry back into messages.
+        Only the built-in checks are covered; custom rules need check().
+        """
+        senders, recipients, content_types = [], [], []
+        bitmap = array('B')
+        for row, data in enumerate(messages):
+            headers = data.get('headers', {})
+            mask = 0
+            if 'From' in headers:
+                senders.append((row, headers['From']))
+            else:
+                mask |= MISSING_FROM
+            if 'To' in headers:
+                recipients.append((row, headers['To']))
+            else:
+                mask |= MISSING_TO
+            if 'Subject' not in headers:
+                mask |= MISSING_SUBJECT
+            for attachment in data.get('attachments', []):
+                content_type = attachment.get('content_type', '')
+                if content_type:
+                    content_types.append((row, content_type))
+                else:
+                    mask |= MISSING_CONTENT_TYPE
+            bitmap.append(mask)
+
+        for column, bit in ((senders, INVALID_FROM), (recipients, INVALID_TO)):
+            parsed = {value: split_addresses(value) for value in {value for _, value in column}}
+            addresses = list({address for values in parsed.values() for address in values})
+            matched = dict(zip(addresses, _match_all(EMAIL_PATTERN, addresses)))
+            valid = {value: all(matched[address] for address in values) for value, values in parsed.items()}
+            self._flag(bitmap, column, valid, bit)
+
+        distinct = list({value for _, value in content_types})
+        self._flag(bitmap, content_types, dict(zip(distinct, _match_all(CONTENT_TYPE_PATTERN, distinct))),
+                   INVALID_CONTENT_TYPE)
+        return bitmap
+
+    @staticmethod
+    def _flag(bitmap: array, column: List[Tuple[int, str]], valid: Dict[str, bool], bit: int) -> None:
+        for row, value in column:
+            if not valid[value]:
+                bitmap[row] |= bit
 
     @staticmethod
     def _is_valid_email(email: str) -> bool:
@@ -59,5 +347,4 @@ class emllmValidator:
             return False
             
         # Basic regex check
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(EMAIL_PATTERN.match(email))
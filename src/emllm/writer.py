@@ -0,0 +1,259 @@
+"""Streaming MIME writer: serialize a message dict without building an EmailMessage"""
+from typing import Dict, Any, BinaryIO, Iterable, Iterator
+from email import quoprimime
+from email.policy import default
+from string import Template
+import base64
+import os
+import uuid
+
+from emllm.core import emllmError
+
+# Attachment bytes read and encoded at a time; a multiple of 57 so every
+# chunk encodes to whole 76-character base64 lines
+CHUNK_SIZE = 57 * 1024
+
+# Headers the writer produces itself from the message structure
+MIME_HEADERS = {'mime-version', 'content-type', 'content-transfer-encoding'}
+
+class emllmWriter:
+    """
+    Write a message dict (the ``from_dict`` format) as MIME, chunk by chunk.
+
+    Attachments are taken from ``content`` (bytes, str, a binary file object
+    or an iterable of byte chunks) or from ``path``, and are base64-encoded
+    ``CHUNK_SIZE`` bytes at a time, so peak memory does not depend on
+    attachment size.
+    """
+
+    def __init__(self, linesep: str = '\n', chunk_size: int = CHUNK_SIZE):
+        if chunk_size % 57:
+            raise emllmError("chunk_size must be a multiple of 57")
+        self.linesep = linesep
+        self.chunk_size = chunk_size
+        self.policy = default.clone(linesep=linesep)
+
+    def iter_bytes(self, data: Dict[str, Any]) -> Iterator[bytes]:
+        """Yield the serialized message in chunks"""
+        attachments = data.get('attachments') or []
+        yield from self._headers(data.get('headers', {}))
+
+        if not attachments:
+            yield from self._text_part(data.get('body', ''))
+            return
+
+        boundary = f"===============emllm{uuid.uuid4().hex}=="
+        yield self._header('Content-Type', f'multipart/mixed; boundary="{boundary}"')
+        yield self._line('')
+        if 'body' in data:
+            yield self._line(f'--{boundary}')
+            yield from self._text_part(data['body'])
+        for attachment in attachments:
+            yield self._line(f'--{boundary}')
+            yield from self._attachment(attachment)
+        yield self._line(f'--{boundary}--')
+
+    def write(self, data: Dict[str, Any], out: BinaryIO) -> int:
+        """Write the message to a binary file object (for a socket use ``sock.makefile('wb')``)"""
+        written = 0
+        for chunk in self.iter_bytes(data):
+            out.write(chunk)
+            written += len(chunk)
+        return written
+
+    def _line(self, text: str) -> bytes:
+        return (text + self.linesep).encode('ascii')
+
+    def _header(self, name: str, value: str) -> bytes:
+        try:
+            # header_store_parse builds a header object, which RFC 2047/2231-encodes non-ASCII text
+            return self.policy.fold_binary(name, self.policy.header_store_parse(name, value)[1])
+        except Exception as e:
+            raise emllmError(f"Invalid header {name}: {str(e)}")
+
+    def _headers(self, headers: Dict[str, Any]) -> Iterator[bytes]:
+        for name, value in headers.items():
+            if name.lower() not in MIME_HEADERS:
+                yield self._header(name, str(value))
+        yield self._header('MIME-Version', '1.0')
+
+    def _text_part(self, body: str) -> Iterator[bytes]:
+        body = str(body).replace('\r\n', '\n')
+        if not body.endswith('\n'):
+            body += '\n'
+        # Not splitlines(): it also breaks on \f, \v, \x1c-\x1e, \x85 and \u2028
+        lines = body[:-1].split('\n')
+        if body.isascii() and '\r' not in body and all(len(line) <= 78 for line in lines):
+            yield self._header('Content-Type', 'text/plain; charset="utf-8"')
+            yield self._header('Content-Transfer-Encoding', '7bit')
+            yield self._line('')
+            yield (self.linesep.join(lines) + self.linesep).encode('ascii')
+            return
+
+        yield self._header('Content-Type', 'text/plain; charset="utf-8"')
+        yield self._header('Content-Transfer-Encoding', 'quoted-printable')
+        yield self._line('')
+        # body ends with a newline, so the encoded text already ends with linesep
+        encoded = quoprimime.body_encode(body.encode('utf-8').decode('latin-1'), eol=self.linesep)
+        yield encoded.encode('ascii')
+
+    def _attachment(self, attachment: Dict[str, Any]) -> Iterator[bytes]:
+        content_type = attachment.get('content_type') or 'application/octet-stream'
+        if '/' not in content_type:
+            raise emllmError(f"Invalid attachment content_type: {content_type}")
+        filename = attachment.get('filename')
+        if filename is None and attachment.get('path'):
+            filename = os.path.basename(attachment['path'])
+
+        yield self._header('Content-Type', content_type)
+        yield self._header('Content-Transfer-Encoding', 'base64')
+        filename = str(filename).replace('\\', '\\\\').replace('"', '\\"') if filename else None
+        yield self._header('Content-Disposition', f'attachment; filename="{filename}"' if filename else 'attachment')
+        yield self._line('')
+        yield from self._base64(self._attachment_chunks(attachment))
+
+    def _attachment_chunks(self, attachment: Dict[str, Any]) -> Iterator[bytes]:
+        if attachment.get('path') and 'content' not in attachment:
+            with open(attachment['path'], 'rb') as f:
+                yield from iter(lambda: f.read(self.chunk_size), b'')
+            return
+
+        content = attachment.get('content', b'')
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            view = memoryview(content)
+            for offset in range(0, len(view), self.chunk_size):
+                yield view[offset:offset + self.chunk_size]
+        elif hasattr(content, 'read'):
+            yield from iter(lambda: content.read(self.chunk_size), b'')
+        else:
+            yield from content
+
+    def _base64(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Base64-encode arbitrary chunks into 76-character lines, buffering at most 56 bytes"""
+        pending = b''
+        for chunk in chunks:
+            if pending:
+                chunk = pending + bytes(chunk)
+            whole = len(chunk) - len(chunk) % 57
+            pending = bytes(chunk[whole:])
+            if whole:
+                yield self._encode(chunk[:whole])
+        if pending:
+            yield self._encode(pending)
+
+    def _encode(self, data: bytes) -> bytes:
+        encoded = base64.encodebytes(data)
+        if self.linesep != '\n':
+            encoded = encoded.replace(b'\n', self.linesep.encode('ascii'))
+        return encoded
+
+
+def write_message(data: Dict[str, Any], out: BinaryIO, linesep: str = '\n') -> int:
+    """Stream a message dict as MIME into a binary file object; returns bytes written"""
+    return emllmWriter(linesep=linesep).write(data, out)
+
+
+class emllmTemplate:
+    """
+    A message dict compiled once into a pre-serialized MIME skeleton.
+
+    Header values and the body may contain ``$name`` / ``${name}``
+    placeholders (``string.Template`` syntax). Everything without a
+    placeholder, including all attachments, is serialized and base64-encoded
+    at compile time; render() only substitutes and encodes the variable
+    fields and joins the pieces.
+    """
+
+    def __init__(self, data: Dict[str, Any], linesep: str = '\n'):
+        self.writer = emllmWriter(linesep=linesep)
+        self.fields = set()
+        self.boundary = None
+        self._segments = []
+
+        for name, value in data.get('headers', {}).items():
+            if name.lower() not in MIME_HEADERS:
+                self._add(name, str(value), self._render_header)
+        self._static(self.writer._header('MIME-Version', '1.0'))
+
+        attachments = data.get('attachments') or []
+        if not attachments:
+            self._add_body(data.get('body', ''))
+        else:
+            self.boundary = f"===============emllm{uuid.uuid4().hex}=="
+            self._static(self.writer._header('Content-Type', f'multipart/mixed; boundary="{self.boundary}"'))
+            self._static(self.writer._line(''))
+            if 'body' in data:
+                self._static(self.writer._line(f'--{self.boundary}'))
+                self._add_body(data['body'])
+            for attachment in attachments:
+                self._static(self.writer._line(f'--{self.boundary}'))
+                self._static(b''.join(self.writer._attachment(attachment)))
+            self._static(self.writer._line(f'--{self.boundary}--'))
+
+    def _static(self, data: bytes) -> None:
+        # Adjacent static pieces are merged, so render() joins as few pieces as possible
+        if self._segments and isinstance(self._segments[-1], bytes):
+            self._segments[-1] += data
+        else:
+            self._segments.append(data)
+
+    def _add(self, name: str, text: str, render) -> None:
+        template = Template(text)
+        fields = {
+            match.group('named') or match.group('braced')
+            for match in template.pattern.finditer(text)
+            if match.group('named') or match.group('braced')
+        }
+        if not fields:
+            self._static(render(name, text))
+            return
+        self.fields.update(fields)
+        self._segments.append((name, template, render))
+
+    def _add_body(self, body: Any) -> None:
+        self._add(None, str(body), lambda _, text: b''.join(self.writer._text_part(text)))
+
+    def _render_header(self, name: str, value: str) -> bytes:
+        # Short single-line ASCII values need no folding or encoded words
+        if value.isascii() and len(name) + len(value) < 77 and '\n' not in value and '\r' not in value:
+            return f"{name}: {value}{self.writer.linesep}".encode('ascii')
+        return self.writer._header(name, value)
+
+    def iter_render(self, values: Dict[str, Any]) -> Iterator[bytes]:
+        """Yield the pieces of one message: shared static bytes and freshly encoded fields"""
+        for segment in self._segments:
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            name, template, render = segment
+            try:
+                piece = render(name, template.substitute(values))
+            except (KeyError, ValueError) as e:
+                raise emllmError(f"Missing or invalid template value: {str(e)}")
+            if self.boundary and name is None and self.boundary.encode('ascii') in piece:
+                raise emllmError("Template value contains the MIME boundary")
+            yield piece
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        """Serialize one message, substituting values into the variable fields"""
+        return b''.join(self.iter_render(values))
+
+    def write(self, values: Dict[str, Any], out: BinaryIO) -> int:
+        """Write one message to a binary file object without joining the pieces first"""
+        written = 0
+        for piece in self.iter_render(values):
+            out.write(piece)
+            written += len(piece)
+        return written
+
+
+def compile_template(data: Dict[str, Any], linesep: str = '\n') -> emllmTemplate:
+    """Compile a message dict with $placeholders into a reusable template"""
+    return emllmTemplate(data, linesep=linesep)
+
+
+def render(template: emllmTemplate, values: Dict[str, Any]) -> bytes:
+    """Render one message from a compiled template"""
+    return template.render(values)
@@ -2,6 +2,7 @@ import pytest
 import json
 from fastapi.testclient import TestClient
 from emllm.api import app
+from emllm.core import emllmParser
 
 client = TestClient(app)
 
@@ -91,6 +92,31 @@ def test_generate_invalid_message():
     assert response.status_code == 400
     assert "detail" in response.json()
 
+def test_generate_raw_message_round_trip():
+    message = {
+        "headers": {
+            "From": "test@example.com",
+            "To": "recipient@example.com",
+            "Subject": "Zażółć"
+        },
+        "body": "Cześć, świecie",
+        "attachments": []
+    }
+
+    response = client.post(
+        "/generate",
+        json={"message": message},
+        headers={"Accept": "message/rfc822"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("message/rfc822")
+    parser = emllmParser()
+    data = parser.to_dict(parser.parse_bytes(response.content))
+    assert data["headers"]["From"] == "test@example.com"
+    assert data["headers"]["Subject"] == "Zażółć"
+    assert data["body"].strip() == "Cześć, świecie"
+
 def test_convert_emllm_to_json():
     emllm_content = """
 From: test@example.com
@@ -145,3 +171,74 @@ def test_convert_json_to_emllm():
     assert "To: recipient@example.com" in result["result"]
     assert "Subject: Test" in result["result"]
     assert "Hello World" in result["result"]
+
+def test_mailbox_message_by_index(tmp_path, monkeypatch):
+    (tmp_path / "archive.mbox").write_text(
+        "From sender Mon Jan  1 00:00:00 2024\n"
+        "From: test@example.com\nTo: recipient@example.com\n"
+        "Message-ID: <first@example.com>\nSubject: Test\n\nHello World\n"
+    )
+    monkeypatch.setenv("EMLLM_MAILBOX_DIR", str(tmp_path))
+
+    response = client.get("/mailboxes/archive.mbox/messages/0")
+    assert response.status_code == 200
+    data = json.loads(response.json()["message"])
+    assert data["headers"]["Subject"] == "Test"
+
+    response = client.get("/mailboxes/archive.mbox/messages", params={"message_id": "first@example.com"})
+    assert response.json()["entries"][0]["idx"] == 0
+
+    assert client.get("/mailboxes/archive.mbox/messages/1").status_code == 404
+    assert client.get("/mailboxes/missing.mbox/messages").status_code == 404
+
+def test_search_headers(tmp_path, monkeypatch):
+    from emllm.search import emllmSearchIndex
+
+    (tmp_path / "a.eml").write_text("From: alice@example.com\nTo: bob@example.com\nSubject: Quarterly invoice\n\nHi\n")
+    with emllmSearchIndex(str(tmp_path / "search.db")) as index:
+        index.update([str(tmp_path / "a.eml")])
+    monkeypatch.setenv("EMLLM_SEARCH_INDEX", str(tmp_path / "search.db"))
+
+    response = client.get("/search", params={"q": "subject:invoice"})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["sender"] == "alice@example.com"
+    assert client.get("/search", params={"q": "nosuch:term"}).status_code == 400
+
+def test_oversized_message_is_rejected_with_limit_code(monkeypatch):
+    monkeypatch.setenv("EMLLM_MAX_BYTES", "100")
+
+    response = client.post("/parse", json={"content": "From: test@example.com\n\n" + "x" * 100})
+    assert response.status_code == 413
+    assert response.json()["detail"]["limit"] == "max_bytes"
+
+    response = client.post("/parse", json={"content": "x" * 300})
+    assert response.status_code == 413
+    assert response.json()["detail"]["limit"] == "max_request_bytes"
+
+def test_convert_json_to_emllm_streams_raw_message():
+    content = json.dumps({'headers': {'From': 'test@example.com', 'Subject': 'Test'}, 'body': 'Cześć'})
+
+    response = client.post(
+        "/convert",
+        params={"from_format": "json", "to_format": "emllm"},
+        content=json.dumps(content),
+        headers={"Accept": "message/rfc822", "Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "message/rfc822"
+    assert b"Content-Transfer-Encoding: 8bit" in response.content
+    assert "Cześć".encode("utf-8") in response.content
+
+def test_metrics_endpoint():
+    content = "From: a@example.com\nTo: b@example.com\nSubject: Test\n\nHello\n"
+    client.post("/validate", json={"content": content})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'emllm_http_requests_total{method="POST",endpoint="/validate",status="200"}' in text
+    assert 'emllm_stage_duration_seconds_count{stage="parse"}' in text
+    assert 'emllm_http_request_bytes_total{endpoint="/validate"}' in text
+    assert 'emllm_address_cache_hit_ratio{rules=""}' in text
@@ -0,0 +1,119 @@
+import pytest
+import json
+import io
+from emllm.batch import emllmBatchProcessor, iter_sources, write_ndjson, write_tree
+from emllm.core import emllmError, emllmParser
+
+VALID_MESSAGE = "From: test@example.com\nTo: recipient@example.com\nSubject: Test\n\nHello World\n"
+INVALID_MESSAGE = "From: invalid-email\nSubject: Test\n\nHello World\n"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.eml").write_text(VALID_MESSAGE)
+    (tmp_path / "sub" / "b.eml").write_text(INVALID_MESSAGE)
+    (tmp_path / "box.mbox").write_text(
+        "From sender Mon Jan  1 00:00:00 2024\n" + VALID_MESSAGE + "\n"
+        "From sender Mon Jan  1 00:00:00 2024\n" + VALID_MESSAGE
+    )
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+
+def test_iter_sources_expands_directories_and_mbox(archive):
+    items = list(iter_sources([str(archive)]))
+
+    assert [item.name for item in items] == ['a', 'box/0', 'box/1', 'sub/b']
+    assert items[0].path is not None
+    assert items[1].data.startswith(b"From: test@example.com")
+
+
+def test_iter_sources_collects_json_only_for_convert(archive):
+    (archive / "message.json").write_text('{"headers": {"Subject": "Test"}}')
+
+    assert 'message' not in [item.name for item in iter_sources([str(archive)])]
+    assert 'message' in [item.name for item in iter_sources([str(archive)], include_json=True)]
+
+
+def test_glob_matches_with_the_same_stem_do_not_overwrite(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "x.eml").write_text(VALID_MESSAGE.replace("Test", directory))
+
+    items = list(iter_sources([str(tmp_path / "*" / "x.eml")]))
+    assert [item.name for item in items] == ['a/x', 'b/x']
+
+    processor = emllmBatchProcessor(operation='parse', jobs=1)
+    write_tree(processor.run(items + items[:1]), str(tmp_path / "out"))
+    assert json.loads((tmp_path / "out" / "a" / "x.json").read_text())['headers']['Subject'] == 'a'
+    assert json.loads((tmp_path / "out" / "b" / "x.json").read_text())['headers']['Subject'] == 'b'
+    assert (tmp_path / "out" / "a" / "x-2.json").exists()
+
+
+def test_iter_sources_missing_input():
+    with pytest.raises(emllmError):
+        list(iter_sources(['/nonexistent/*.eml']))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_validate_ordered(archive, jobs):
+    processor = emllmBatchProcessor(operation='validate', jobs=jobs)
+    records = list(processor.run(iter_sources([str(archive)])))
+
+    assert [record['name'] for record in records] == ['a', 'box/0', 'box/1', 'sub/b']
+    assert [record['result']['valid'] for record in records] == [True, True, True, False]
+    assert processor.summary()['processed'] == 4
+    assert processor.summary()['failed'] == 0
+
+
+def test_batch_unordered_returns_all(archive):
+    processor = emllmBatchProcessor(operation='parse', jobs=2, ordered=False)
+    records = list(processor.run(iter_sources([str(archive)])))
+
+    assert sorted(record['name'] for record in records) == ['a', 'box/0', 'box/1', 'sub/b']
+
+
+def test_batch_convert_json_to_tree(tmp_path):
+    source = tmp_path / "message.json"
+    source.write_text(json.dumps({
+        'headers': {'From': 'test@example.com', 'To': 'recipient@example.com', 'Subject': 'Test'},
+        'body': 'Hello World'
+    }))
+
+    processor = emllmBatchProcessor(operation='convert', jobs=1)
+    write_tree(processor.run(iter_sources([str(source)])), str(tmp_path / "out"))
+
+    assert b"Subject: Test" in (tmp_path / "out" / "message.eml").read_bytes()
+
+
+def test_batch_convert_keeps_8bit_body(tmp_path):
+    source = tmp_path / "message.json"
+    source.write_text(json.dumps({'headers': {'Subject': 'Test'}, 'body': 'Zażółć gęślą jaźń'}))
+
+    processor = emllmBatchProcessor(operation='convert', jobs=1)
+    write_tree(processor.run(iter_sources([str(source)])), str(tmp_path / "out"))
+
+    parser = emllmParser()
+    message = parser.parse_bytes((tmp_path / "out" / "message.eml").read_bytes())
+    assert parser.to_dict(message)['body'].startswith('Zażółć gęślą jaźń')
+
+
+def test_write_ndjson_encodes_binary_attachments():
+    output = io.StringIO()
+    write_ndjson([{'result': {'content': b'\x00\x01'}}], output)
+
+    assert json.loads(output.getvalue())['result']['content'] == 'AAE='
+
+
+def test_batch_validate_with_rules(archive, tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({'denied_domains': ['example.com']}))
+
+    processor = emllmBatchProcessor(operation='validate', jobs=1, rules=str(rules))
+    records = list(processor.run(iter_sources([str(archive / "a.eml")])))
+
+    assert records[0]['result']['issues'][0]['code'] == 'domain_denied'
+
+    with pytest.raises(emllmError):
+        emllmBatchProcessor(operation='validate', rules=str(tmp_path / "missing.json"))
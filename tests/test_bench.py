@@ -0,0 +1,30 @@
+import json
+from emllm.bench import build_corpus, run_benchmarks, compare, CORPUS_KINDS
+from emllm.core import emllmParser
+
+
+def test_corpus_is_deterministic_and_parses():
+    first = build_corpus(count=2, seed=7, scale=0.05)
+    second = build_corpus(count=2, seed=7, scale=0.05)
+    assert first == second
+    assert set(first) == set(CORPUS_KINDS)
+    parser = emllmParser()
+    for messages in first.values():
+        for raw in messages:
+            assert parser.parse_bytes(raw)['Message-ID']
+
+
+def test_run_and_compare_against_baseline(tmp_path):
+    corpus = build_corpus(kinds=['plain', 'html'], count=2, scale=0.1)
+    report = run_benchmarks(corpus, operations=['parse', 'validate'], iterations=5)
+    assert set(report['results']) == {'parse/plain', 'validate/plain', 'parse/html', 'validate/html'}
+    result = report['results']['parse/plain']
+    assert result['calls'] == 5 and result['messages_per_second'] > 0
+    assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
+    json.dumps(report)
+
+    baseline = json.loads(json.dumps(report))
+    baseline['results']['parse/plain']['messages_per_second'] = result['messages_per_second'] * 2
+    rows = {row['name']: row for row in compare(report, baseline, threshold=0.1)}
+    assert rows['parse/plain']['regression']
+    assert not rows['parse/html']['regression']
@@ -98,3 +98,65 @@ Hello World
         assert data["headers"]["To"] == "recipient@example.com"
         assert data["headers"]["Subject"] == "Test"
         assert data["body"] == "Hello World"
+
+def test_cli_parser_does_not_depend_on_argv(capsys):
+    from emllm.cli import emllmCLI
+
+    cli = emllmCLI()
+    # An option value that is also a command name is just a value
+    args = cli.parser.parse_args(["batch", "validate", "--op", "convert"])
+    assert args.func == cli._run_batch
+    assert args.inputs == ["validate"] and args.operation == "convert"
+
+    args = cli.parser.parse_args(["convert", "--from", "json", "--to", "emllm", "-i", "parse"])
+    assert args.func == cli._run_convert and args.input == "parse"
+
+    with pytest.raises(SystemExit):
+        emllmCLI().run(["convert", "--help"])
+    assert "--from" in capsys.readouterr().out
+
+def _imported_modules(*args):
+    """Modules imported by a python -X importtime run, from its stderr"""
+    result = subprocess.run(
+        ["python", "-X", "importtime", *args],
+        capture_output=True,
+        text=True
+    )
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+def test_import_time():
+    # Importing the CLI must not load the parser, the validator or the web stack
+    modules = _imported_modules("-c", "import emllm.cli")
+    assert "emllm.cli" in modules
+    for heavy in ("emllm.core", "emllm.validator", "email.feedparser", "json",
+                  "logging", "cProfile", "fastapi", "uvicorn"):
+        assert heavy not in modules
+
+    # parse needs the parser, but no validator, profiler or web stack
+    modules = _imported_modules("-m", "emllm.cli", "parse", "From: test@example.com\n\nHello")
+    assert "emllm.core" in modules
+    for heavy in ("emllm.validator", "cProfile", "pstats", "fastapi", "uvicorn", "pydantic"):
+        assert heavy not in modules
+
+def test_cli_extract_control_characters_in_filename(tmp_path):
+    message = tmp_path / "message.eml"
+    message.write_text(
+        "From: test@example.com\n"
+        "MIME-Version: 1.0\n"
+        "Content-Type: text/plain\n"
+        "Content-Disposition: attachment; filename*=utf-8''a%00b%0Ac.txt\n"
+        "\n"
+        "Hello\n"
+    )
+    result = subprocess.run(
+        ["python", "-m", "emllm.cli", "extract", str(message), "-o", str(tmp_path / "parts")],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "EMLLM_NO_DAEMON": "1"}
+    )
+    assert result.returncode == 0
+    assert (tmp_path / "parts" / "a_b_c.txt").read_text() == "Hello\n"
@@ -1,5 +1,5 @@
 import pytest
-from emllm.core import emllmParser, emllmError
+from emllm.core import emllmParser, emllmError, MboxReader, MaildirReader, open_mailbox
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import json
@@ -101,3 +101,91 @@ Hello World
     new_message = parser.from_dict(data)
     
     assert new_message.as_string() == message.as_string()
+
+def _write_mbox(path, count):
+    import mailbox
+    box = mailbox.mbox(str(path))
+    for i in range(count):
+        box.add(f"From: test@example.com\nTo: recipient@example.com\nSubject: Message {i}\n\n"
+                f"Body {i}\nFrom the start of a line\n\n")
+    box.flush()
+    box.close()
+    return mailbox.mbox(str(path))
+
+def test_mbox_reader_matches_stdlib(tmp_path):
+    path = tmp_path / "archive.mbox"
+    box = _write_mbox(path, 5)
+    expected = [box.get_bytes(key) for key in box.iterkeys()]
+
+    with MboxReader(str(path)) as reader:
+        assert list(reader) == expected
+        assert len(reader) == 5
+        assert reader[3] == expected[3]
+        offset, length = reader.offsets[2]
+        assert reader.read(offset, length) == expected[2]
+
+def test_mbox_reader_empty_file(tmp_path):
+    path = tmp_path / "empty.mbox"
+    path.write_bytes(b"")
+
+    with MboxReader(str(path)) as reader:
+        assert list(reader) == []
+
+def test_open_mailbox(tmp_path):
+    _write_mbox(tmp_path / "archive.mbox", 2)
+    for subdir in ('cur', 'new', 'tmp'):
+        (tmp_path / "maildir" / subdir).mkdir(parents=True)
+    (tmp_path / "maildir" / "new" / "1").write_bytes(b"Subject: Test\n\nHello World\n")
+    (tmp_path / "plain.eml").write_bytes(b"Subject: Test\n\nHello World\n")
+
+    with open_mailbox(str(tmp_path / "archive.mbox")) as box:
+        assert isinstance(box, MboxReader)
+        assert len(box) == 2
+    with open_mailbox(str(tmp_path / "maildir")) as box:
+        assert isinstance(box, MaildirReader)
+        assert list(box) == [b"Subject: Test\n\nHello World\n"]
+    assert open_mailbox(str(tmp_path / "plain.eml")) is None
+
+def test_parse_limits():
+    from emllm.core import ParseLimits, emllmLimitError
+    import base64
+
+    nested = "Content-Type: multipart/mixed; boundary=A\n\n--A\nContent-Type: multipart/mixed; boundary=B\n\n" \
+             "--B\nContent-Type: text/plain\n\nHi\n--B--\n--A--\n"
+    attachment = (
+        "Content-Type: multipart/mixed; boundary=X\n\n--X\nContent-Type: application/octet-stream\n"
+        "Content-Disposition: attachment; filename=a.bin\nContent-Transfer-Encoding: base64\n\n"
+        + base64.encodebytes(b"x" * 1000).decode() + "--X--\n"
+    )
+    cases = [
+        ("max_bytes", ParseLimits(max_bytes=10), nested),
+        ("max_depth", ParseLimits(max_depth=2), nested),
+        ("max_parts", ParseLimits(max_parts=2), nested),
+        ("max_header_bytes", ParseLimits(max_header_bytes=16), "Subject: " + "x" * 100 + "\n\nBody\n"),
+        ("max_attachment_bytes", ParseLimits(max_attachment_bytes=999), attachment),
+    ]
+    for limit, limits, content in cases:
+        with pytest.raises(emllmLimitError) as exc_info:
+            emllmParser(limits=limits).parse(content)
+        assert exc_info.value.limit == limit
+        assert exc_info.value.to_dict()['code'] == 'limit_exceeded'
+
+    assert emllmParser(limits=ParseLimits(max_depth=3, max_attachment_bytes=1000)).parse(nested + attachment)
+
+
+def test_parse_limits_from_env(monkeypatch):
+    from emllm.core import ParseLimits
+
+    monkeypatch.setenv("EMLLM_MAX_PARTS", "5")
+    monkeypatch.setenv("EMLLM_MAX_DEPTH", "0")
+    limits = ParseLimits.from_env()
+    assert (limits.max_parts, limits.max_depth) == (5, None)
+
+def test_to_bytes_keeps_8bit_body():
+    parser = emllmParser()
+    message = parser.from_dict({'headers': {'Subject': 'Test'}, 'body': 'Zażółć gęślą jaźń'})
+
+    data = parser.to_bytes(message)
+
+    assert 'Zażółć gęślą jaźń'.encode('utf-8') in data
+    assert parser.to_dict(parser.parse_bytes(data))['body'].strip() == 'Zażółć gęślą jaźń'
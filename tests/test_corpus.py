@@ -0,0 +1,41 @@
+import pytest
+from emllm.corpus import emllmCorpusGenerator, CorpusSpec, generate, preset
+from emllm.core import emllmParser, emllmError, MboxReader
+
+
+def test_corpus_is_deterministic_per_index():
+    spec = CorpusSpec(count=20, seed=3, defect_rate=0.5)
+    first = list(emllmCorpusGenerator(spec))
+    assert [message.data for message in first] == list(generate(spec))
+    # Growing the corpus only appends messages
+    longer = emllmCorpusGenerator(spec._replace(count=25))
+    assert [longer.message(i).data for i in range(20)] == [message.data for message in first]
+    assert list(generate(spec._replace(seed=4))) != [message.data for message in first]
+
+
+def test_corpus_mix_and_defects():
+    spec = CorpusSpec(count=60, attachment_rate=1, min_attachments=2, max_attachments=2,
+                      attachment_size=1024, charsets=(('iso-8859-2', 1),),
+                      defect_rate=1, defects=('missing_from',))
+    parser = emllmParser()
+    for message in emllmCorpusGenerator(spec):
+        assert message.attachments == 2 and message.defects == ('missing_from',)
+        parsed = parser.parse_bytes(message.data)
+        assert parsed['From'] is None
+        assert len(list(parsed.iter_attachments())) == 2
+        assert parsed.get_body().get_content_charset() == 'iso-8859-2'
+
+    with pytest.raises(emllmError):
+        emllmCorpusGenerator(CorpusSpec(defects=('no_such_defect',)))
+    with pytest.raises(emllmError):
+        preset('no_such_preset')
+
+
+def test_write_files_and_mbox(tmp_path):
+    generator = emllmCorpusGenerator(preset('mixed', count=8))
+    assert generator.write_files(str(tmp_path / "eml")) == 8
+    assert (tmp_path / "eml" / "000007.eml").read_bytes() == generator.message(7).data
+
+    assert generator.write_mbox(str(tmp_path / "corpus.mbox")) == 8
+    with MboxReader(str(tmp_path / "corpus.mbox")) as reader:
+        assert len(list(reader.scan())) == 8
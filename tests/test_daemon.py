@@ -0,0 +1,141 @@
+import io
+import threading
+
+import pytest
+
+from emllm.daemon import emllmDaemon, forward, should_forward
+
+TEXT_MESSAGE = "From: a@example.com\nTo: b@example.com\nSubject: Daemon\n\nHello"
+
+MESSAGE = """From: a@example.com
+To: b@example.com
+Subject: Daemon
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="b"
+
+--b
+Content-Type: text/html
+
+<p>Hello</p>
+--b
+Content-Type: application/octet-stream
+Content-Transfer-Encoding: base64
+Content-Disposition: attachment; filename="data.bin"
+
+AAECAw==
+--b--
+"""
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = emllmDaemon(str(tmp_path / "emllm.sock"))
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def run(daemon, *argv):
+    stdout, stderr = io.BytesIO(), io.BytesIO()
+    status = forward(list(argv), daemon.path, stdout, stderr)
+    return status, stdout.getvalue().decode(), stderr.getvalue().decode()
+
+
+def test_commands_run_on_daemon(daemon, tmp_path, monkeypatch):
+    status, out, _ = run(daemon, "parse", TEXT_MESSAGE)
+    assert status == 0
+    assert '"Subject": "Daemon"' in out
+
+    # Relative paths are resolved against the client's working directory
+    (tmp_path / "message.eml").write_text(MESSAGE)
+    monkeypatch.chdir(tmp_path)
+    status, out, _ = run(daemon, "validate", "--input", "message.eml")
+    assert status == 0
+    assert "All 1 messages are valid!" in out
+
+    status, out, _ = run(daemon, "extract", "message.eml", "-o", "parts")
+    assert status == 0
+    assert (tmp_path / "parts" / "index.html").read_text() == "<p>Hello</p>"
+    assert (tmp_path / "parts" / "data.bin").read_bytes() == b"\x00\x01\x02\x03"
+
+    status, _, err = run(daemon, "parse", "--no-such-option")
+    assert status == 2
+    assert "unrecognized arguments" in err
+
+    status, _, err = run(daemon, "rest")
+    assert status == 1
+    assert daemon.requests == 5
+
+
+def test_client_falls_back_without_daemon(tmp_path, monkeypatch):
+    assert forward(["parse", MESSAGE], str(tmp_path / "missing.sock")) is None
+    assert should_forward(["validate", "--input", "box.mbox"])
+    assert not should_forward(["--profile", "sample", "parse", MESSAGE])
+    assert not should_forward(["batch", "dir/"])
+    monkeypatch.setenv("EMLLM_NO_DAEMON", "1")
+    assert not should_forward(["parse", MESSAGE])
+
+
+def test_client_environment_applies_per_request(daemon, monkeypatch):
+    monkeypatch.setenv("EMLLM_MAX_BYTES", "10")
+    _, out, _ = run(daemon, "parse", TEXT_MESSAGE)
+    assert "exceeds max_bytes" in out
+
+    monkeypatch.delenv("EMLLM_MAX_BYTES")
+    _, out, _ = run(daemon, "parse", TEXT_MESSAGE)
+    assert '"Subject": "Daemon"' in out
+
+
+def test_client_falls_back_when_daemon_is_busy(tmp_path, monkeypatch):
+    import socket
+    from emllm import daemon as daemon_module
+
+    # Listening but never accepting, like a daemon serving another client
+    path = str(tmp_path / "busy.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    monkeypatch.setattr(daemon_module, "CONNECT_TIMEOUT", 0.2)
+    try:
+        assert forward(["parse", TEXT_MESSAGE], path, io.BytesIO(), io.BytesIO()) is None
+        # The abandoned connection is dropped without running the command
+        connection, _ = server.accept()
+        with connection:
+            connection.settimeout(1)
+            assert connection.recv(1024) == b""
+    finally:
+        server.close()
+
+
+def test_client_waits_once_request_is_accepted(tmp_path, monkeypatch):
+    import socket
+    import time
+    from emllm import daemon as daemon_module
+
+    path = str(tmp_path / "slow.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def slow_daemon():
+        connection, _ = server.accept()
+        with connection:
+            connection.sendall(daemon_module._FRAME.pack(daemon_module.READY, 0))
+            connection.makefile("rb").readline()
+            time.sleep(0.5)
+            connection.sendall(daemon_module._FRAME.pack(daemon_module.STDOUT, 2) + b"ok")
+            connection.sendall(daemon_module._FRAME.pack(daemon_module.EXIT, 4) + daemon_module._STATUS.pack(0))
+
+    thread = threading.Thread(target=slow_daemon)
+    thread.start()
+    monkeypatch.setattr(daemon_module, "CONNECT_TIMEOUT", 0.1)
+    stdout = io.BytesIO()
+    try:
+        assert forward(["convert", "x"], path, stdout, io.BytesIO()) == 0
+        assert stdout.getvalue() == b"ok"
+    finally:
+        thread.join()
+        server.close()
@@ -0,0 +1,89 @@
+import pytest
+import mailbox
+from emllm.core import emllmError
+from emllm.index import emllmMailboxIndex, open_index, parse_timestamp
+
+
+def _add_messages(path, start, count):
+    box = mailbox.mbox(str(path))
+    for i in range(start, start + count):
+        box.add(
+            f"From: sender{i}@example.com\n"
+            f"To: recipient@example.com\n"
+            f"Message-ID: <message-{i}@example.com>\n"
+            f"Date: Mon, {i + 1:02d} Jan 2024 10:00:00 +0000\n"
+            f"Subject: Test {i}\n\n"
+            f"Hello World {i}\n"
+        )
+    box.flush()
+    box.close()
+
+
+@pytest.fixture
+def mbox_path(tmp_path):
+    path = tmp_path / "archive.mbox"
+    _add_messages(path, 0, 3)
+    return path
+
+
+def test_build_index(mbox_path):
+    with open_index(str(mbox_path)) as index:
+        assert len(index) == 3
+        entry = index.entry(1)
+        assert entry['message_id'] == '<message-1@example.com>'
+        assert entry['sender'] == 'sender1@example.com'
+        assert entry['date'] == parse_timestamp('2024-01-02T10:00:00')
+        assert index.get(1) == mailbox.mbox(str(mbox_path)).get_bytes(1)
+
+    assert (mbox_path.parent / "archive.mbox.emllmidx").exists()
+
+
+def test_incremental_update(mbox_path):
+    with open_index(str(mbox_path)) as index:
+        assert index.update() == 0
+
+        _add_messages(mbox_path, 3, 2)
+        assert index.update() == 2
+        assert len(index) == 5
+        assert index.get(-1).startswith(b"From: sender4@example.com")
+
+    expected = mailbox.mbox(str(mbox_path))
+    with emllmMailboxIndex(str(mbox_path)) as index:
+        assert [index.get(i) for i in range(5)] == [expected.get_bytes(key) for key in expected.iterkeys()]
+
+
+def test_rewritten_mailbox_is_reindexed(mbox_path):
+    open_index(str(mbox_path)).close()
+    mbox_path.write_text("")
+    _add_messages(mbox_path, 7, 1)
+
+    with open_index(str(mbox_path)) as index:
+        assert len(index) == 1
+        assert index.entry(0)['message_id'] == '<message-7@example.com>'
+
+
+def test_small_mailbox_rewritten_larger_is_reindexed(mbox_path):
+    open_index(str(mbox_path)).close()
+    size = mbox_path.stat().st_size
+    # Same messages with other content, plus one appended: larger, still under HEAD_BYTES
+    mbox_path.write_text("")
+    _add_messages(mbox_path, 10, 4)
+    assert size < mbox_path.stat().st_size < 4096
+
+    expected = mailbox.mbox(str(mbox_path))
+    with open_index(str(mbox_path)) as index:
+        assert len(index) == 4
+        assert index.entry(0)['message_id'] == '<message-10@example.com>'
+        assert [index.get(i) for i in range(4)] == [expected.get_bytes(key) for key in expected.iterkeys()]
+
+
+def test_lookup_by_message_id_and_date(mbox_path):
+    with open_index(str(mbox_path)) as index:
+        assert index.get_by_message_id('message-2@example.com').startswith(b"From: sender2@example.com")
+        assert index.find('<missing@example.com>') is None
+
+        dated = index.range(since=parse_timestamp('2024-01-02'), until=parse_timestamp('2024-01-02T23:59:59'))
+        assert [entry['idx'] for entry in dated] == [1]
+
+        with pytest.raises(emllmError):
+            index.get(10)
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from emllm.corpus import generate, preset
+from emllm.loadtest import EndpointStats, run_load, serve
+
+
+def test_endpoint_stats_histogram_and_rates():
+    stats = EndpointStats()
+    for latency in (0.0005, 0.003, 0.003, 0.2):
+        stats.record(latency, status=200)
+    stats.record(0.015, status=400)
+    stats.record(0.015, status=503)
+    stats.record(30.0, error='ReadTimeout')
+
+    summary = stats.summary(elapsed=1.0)
+    assert summary['requests'] == 7
+    assert summary['error_rate'] == round(2 / 7, 4)
+    assert summary['rejected_rate'] == round(1 / 7, 4)
+    counts = {bucket['le_ms']: bucket['count'] for bucket in summary['histogram']}
+    assert counts[1] == 1 and counts[5] == 2 and counts[20] == 2 and counts[200] == 1 and counts[None] == 1
+
+
+def test_load_in_process_api():
+    pytest.importorskip('httpx')
+    pytest.importorskip('uvicorn')
+    messages = list(generate(preset('plain', count=3)))
+    with serve('api') as url:
+        report = asyncio.run(run_load(url, messages, ['/parse', '/validate'], concurrency=2, requests=6))
+
+    assert report['totals']['requests'] == 6
+    assert report['endpoints']['/parse']['statuses'] == {'200': 3}
+    assert report['totals']['error_rate'] == 0
+    assert report['server']['available']
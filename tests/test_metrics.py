@@ -0,0 +1,29 @@
+from emllm.metrics import MetricsRegistry
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('endpoint',))
+    latency = registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+    registry.gauge('queue_depth', 'Queue depth', ('lane',), lambda: {('html',): 3})
+
+    requests.inc('/parse')
+    requests.inc('/parse', amount=2)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, '/parse')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{endpoint="/parse"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="/parse",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="/parse",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="/parse",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{endpoint="/parse"} 5.55' in lines
+    assert 'latency_seconds_count{endpoint="/parse"} 3' in lines
+    assert 'queue_depth{lane="html"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('errors_total', 'Errors', ('message',)).inc('say "hi"\n')
+    assert 'errors_total{message="say \\"hi\\"\\n"} 1' in registry.render()
@@ -0,0 +1,62 @@
+import pstats
+
+from fastapi.testclient import TestClient
+
+from emllm import metrics, profiling
+from emllm.api import app
+from emllm.core import emllmParser
+
+MESSAGE = """From: a@example.com
+To: b@example.com
+Subject: Profile
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="b"
+
+--b
+Content-Type: text/plain
+
+Body
+--b
+Content-Type: application/octet-stream
+Content-Transfer-Encoding: base64
+Content-Disposition: attachment; filename="data.bin"
+
+AAECAw==
+--b--
+"""
+
+
+def test_profiler_collects_stage_and_part_spans(tmp_path):
+    parser = emllmParser()
+    with profiling.emllmProfiler('cprofile') as profiler:
+        with metrics.stage('parse'):
+            message = parser.parse(MESSAGE)
+        profiling.record_parts(message)
+
+    assert [span.name for span in profiler.spans] == ['parse', 'part', 'part']
+    attachment = profiler.spans[2].attributes
+    assert attachment['part'] == '2'
+    assert attachment['filename'] == 'data.bin'
+    assert attachment['decoded_bytes'] == 4
+    assert 'application/octet-stream' in profiler.breakdown()
+
+    path = profiler.save(str(tmp_path / 'run.prof'))
+    assert pstats.Stats(path).total_calls > 0
+
+    # Outside a profiled run nothing is collected
+    with metrics.stage('parse'):
+        profiling.record_parts(message)
+    assert len(profiler.spans) == 3
+
+
+def test_api_profile_header(tmp_path, monkeypatch):
+    client = TestClient(app)
+    response = client.post("/validate", json={"content": MESSAGE}, headers={"X-Emllm-Profile": "sample"})
+    assert 'server-timing' not in response.headers
+
+    monkeypatch.setenv('EMLLM_PROFILE_DIR', str(tmp_path))
+    response = client.post("/validate", json={"content": MESSAGE}, headers={"X-Emllm-Profile": "sample"})
+    assert response.status_code == 200
+    assert 'parse;dur=' in response.headers['server-timing']
+    assert 'part_decode;dur=' in response.headers['server-timing']
+    assert (tmp_path / response.headers['x-emllm-profile-file']).exists()
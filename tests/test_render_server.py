@@ -0,0 +1,474 @@
+import importlib.util
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask")
+
+# render/ is a standalone application, not a package
+_spec = importlib.util.spec_from_file_location(
+    "render_server", Path(__file__).parent.parent / "render" / "server.py")
+server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(server)
+
+MESSAGE = (b"From: a@example.com\nTo: b@example.com\nSubject: Hello\n"
+           b"Content-Type: text/html\n\n<p>Hello</p>\n")
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def zip_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def tar_archive(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def render_batch(client, data, filename="archive.zip"):
+    response = client.post("/render/batch", data={
+        "archive": (io.BytesIO(data), filename),
+        "response_format": "ndjson",
+    })
+    records = [json.loads(line) for line in response.data.splitlines()] if response.status_code == 200 else []
+    return response, sorted(records, key=lambda record: record["index"])
+
+
+def test_batch_zip(client):
+    response, records = render_batch(client, zip_archive({"a.eml": MESSAGE, "b.eml": MESSAGE, "notes.txt": b"x"}))
+
+    assert response.status_code == 200
+    assert [record["name"] for record in records] == ["a.eml", "b.eml"]
+    assert all(record["success"] and "Hello" in record["html"] for record in records)
+
+
+def test_batch_zip_response_is_an_archive(client):
+    response = client.post("/render/batch", data={"archive": (io.BytesIO(zip_archive({"a.eml": MESSAGE})), "a.zip")})
+
+    assert response.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+    assert names == ["00001_a.html", "manifest.json"]
+
+
+def test_batch_tar(client):
+    response, records = render_batch(client, tar_archive({"box/a.eml": MESSAGE}), "archive.tar.gz")
+
+    assert response.status_code == 200
+    assert [record["name"] for record in records] == ["box/a.eml"]
+    assert records[0]["success"]
+
+
+def test_batch_mbox(client):
+    mbox = b"From a@example.com Mon Jan  1 00:00:00 2024\n" + MESSAGE + b"\n"
+    response, records = render_batch(client, mbox * 3, "box.mbox")
+
+    assert response.status_code == 200
+    assert [record["name"] for record in records] == ["message_1.eml", "message_2.eml", "message_3.eml"]
+
+
+@pytest.mark.parametrize("data", [b"not an archive", b"PK\x03\x04truncated"])
+def test_batch_corrupt_archive(client, data, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "TEMP_DIR", str(tmp_path))
+    response, _ = render_batch(client, data)
+
+    assert response.status_code == 400
+    # The spooled upload is removed
+    assert not os.listdir(tmp_path)
+
+
+def test_batch_message_over_max_bytes_is_not_extracted(client, monkeypatch):
+    monkeypatch.setitem(server.RENDER_LIMITS, "max_bytes", 1024)
+    response, records = render_batch(client, zip_archive({"big.eml": MESSAGE + b"x" * 4096, "a.eml": MESSAGE}))
+
+    assert response.status_code == 200
+    big, small = records
+    assert not big["success"] and big["code"] == "limit_exceeded"
+    assert small["success"]
+
+
+def test_batch_archive_budget_stops_reading(client, monkeypatch):
+    monkeypatch.setattr(server, "RENDER_BATCH_MAX_BYTES", len(MESSAGE) * 2)
+    response, records = render_batch(client, zip_archive({f"{index}.eml": MESSAGE for index in range(5)}))
+
+    assert response.status_code == 200
+    assert len(records) == 2
+
+
+def test_batch_has_its_own_upload_limit(client, monkeypatch):
+    archive = zip_archive({"a.eml": MESSAGE})
+    monkeypatch.setitem(server.app.config, "MAX_CONTENT_LENGTH", 10)
+    response, _ = render_batch(client, archive)
+    assert response.status_code == 200
+
+    monkeypatch.setattr(server, "RENDER_BATCH_MAX_UPLOAD_BYTES", 10)
+    response, _ = render_batch(client, archive)
+    assert response.status_code == 413
+    assert response.json["maximum"] == 10
+
+
+def wait_for_job(client, location, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(location).json
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {location} did not finish")
+
+
+@pytest.fixture
+def callback_server():
+    """Local HTTP server recording callback requests; POST /redirect answers 302 to /target"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append((self.path, json.loads(body)))
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/target")
+            else:
+                self.send_response(204)
+            self.end_headers()
+
+        def do_GET(self):
+            # urllib follows a 302 after POST with a GET
+            received.append((self.path, None))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", received
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def submit_job(client, **fields):
+    return client.post("/render/jobs", data={"eml_file": (io.BytesIO(MESSAGE), "a.eml"), **fields})
+
+
+def test_job_renders_and_returns_result(client):
+    response = submit_job(client)
+    assert response.status_code == 202
+
+    status = wait_for_job(client, response.headers["Location"])
+    assert status["status"] == "done"
+    assert "Hello" in client.get(status["result_url"]).get_data(as_text=True)
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http://127.0.0.1/hook",
+    "http://localhost:8080/hook",
+    "http://10.1.2.3/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+])
+def test_job_rejects_private_callback_url(client, url):
+    response = submit_job(client, callback_url=url)
+
+    assert response.status_code == 400
+
+
+def test_callback_allowlist(monkeypatch):
+    monkeypatch.setattr(server, "RENDER_CALLBACK_ALLOWED_HOSTS", {"hooks.example.com"})
+
+    server.check_callback_url("https://hooks.example.com/render")
+    with pytest.raises(server.CallbackURLError):
+        server.check_callback_url("https://example.org/render")
+
+
+def test_callback_is_posted_and_redirects_are_not_followed(client, callback_server, monkeypatch):
+    url, received = callback_server
+    monkeypatch.setattr(server, "RENDER_CALLBACK_ALLOWED_HOSTS", {"127.0.0.1"})
+
+    for path in ("/hook", "/redirect"):
+        response = submit_job(client, callback_url=url + path)
+        assert response.status_code == 202
+        wait_for_job(client, response.headers["Location"])
+
+    deadline = time.monotonic() + 5
+    while len(received) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.1)
+    assert sorted(path for path, _ in received) == ["/hook", "/redirect"]
+    assert all(status["status"] == "done" for _, status in received)
+
+
+MULTIPART = (b"From: a@example.com\nTo: b@example.com\nSubject: Parts\nMIME-Version: 1.0\n"
+             b"Content-Type: multipart/mixed; boundary=\"b\"\n\n"
+             b"--b\nContent-Type: text/plain\n\nHello\n"
+             b"--b\nContent-Type: text/html\n\n<p>Hello <a href=\"#\">link</a></p>\n"
+             b"--b\nContent-Type: application/octet-stream\nContent-Transfer-Encoding: base64\n"
+             b"Content-Disposition: attachment; filename=\"data.bin\"\n\nAAECAwQF\n"
+             b"--b--\n")
+
+
+def cache_reads(cache, result):
+    return server.metrics.metrics["render_analysis_cache_total"]["values"].get((cache, result), 0)
+
+
+def test_analysis_is_computed_once():
+    processor = server.EMLProcessor()
+    assert processor.load_eml_content(MULTIPART)
+    hits = cache_reads("analysis", "hit")
+
+    analysis = processor.analyze()
+    assert processor.analyze() is analysis
+    assert processor.validate_eml() is processor.validate_eml()
+    assert cache_reads("analysis", "hit") == hits + 1
+
+    assert analysis["text_body"].strip() == "Hello"
+    assert analysis["attachments"][0]["filename"] == "data.bin"
+    assert analysis["attachments_bytes"] == 6
+
+
+def test_reloading_content_resets_the_analysis():
+    processor = server.EMLProcessor()
+    processor.load_eml_content(MULTIPART)
+    first = processor.analyze()
+    processor.load_eml_content(MESSAGE)
+
+    assert processor.analyze() is not first
+    assert processor.analyze()["attachments"] == []
+
+
+def test_info_and_validate_summarise_the_analysis(client):
+    response = client.post("/api/info", data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")})
+    assert response.status_code == 200
+
+    response = client.post("/api/validate", data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")})
+    assert response.status_code == 200
+    assert response.json["summary"]["attachments_count"] == 1
+    assert response.json["summary"]["has_html_body"]
+
+
+def nested_message(depth):
+    header = b"From: a@example.com\nTo: b@example.com\nSubject: Deep\nMIME-Version: 1.0\n"
+    body = b"Content-Type: text/plain\n\nHello\n"
+    for level in range(depth):
+        boundary = f"b{level}".encode()
+        body = (b'Content-Type: multipart/mixed; boundary="' + boundary + b'"\n\n--' + boundary + b"\n"
+                + body + b"--" + boundary + b"--\n")
+    return header + body
+
+
+@pytest.mark.parametrize("limit, maximum, content", [
+    ("max_bytes", 64, MESSAGE * 2),
+    ("max_header_bytes", 32, MESSAGE),
+    ("max_depth", 3, nested_message(5)),
+    ("max_parts", 3, MULTIPART),
+    ("max_attachment_bytes", 4, MULTIPART),
+])
+def test_parse_limits(monkeypatch, limit, maximum, content):
+    monkeypatch.setitem(server.RENDER_LIMITS, limit, maximum)
+
+    with pytest.raises(server.MessageLimitError) as error:
+        server.parse_eml_limited(content)
+    assert error.value.limit == limit
+    assert error.value.actual > maximum
+
+
+def test_parse_limit_zero_disables_the_limit(monkeypatch):
+    monkeypatch.setitem(server.RENDER_LIMITS, "max_parts", 0)
+
+    assert server.parse_eml_limited(MULTIPART).is_multipart()
+
+
+@pytest.mark.parametrize("endpoint", ["/render", "/api/validate", "/api/info", "/render/jobs"])
+def test_limit_breach_returns_413(client, monkeypatch, endpoint):
+    monkeypatch.setitem(server.RENDER_LIMITS, "max_bytes", len(MULTIPART) - 1)
+
+    response = client.post(endpoint, data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")})
+
+    assert response.status_code == 413
+    assert response.json["code"] == "limit_exceeded"
+    assert response.json["limit"] == "max_bytes"
+
+
+def test_render_limit_breach_while_parsing_returns_413(client, monkeypatch):
+    monkeypatch.setitem(server.RENDER_LIMITS, "max_parts", 2)
+
+    response = client.post("/render", data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")})
+
+    assert response.status_code == 413
+    assert response.json["limit"] == "max_parts"
+
+
+def test_upload_over_max_content_length_returns_413(client, monkeypatch):
+    monkeypatch.setitem(server.app.config, "MAX_CONTENT_LENGTH", 100)
+
+    response = client.post("/render", data={"eml_file": (io.BytesIO(MESSAGE * 10), "a.eml")})
+
+    assert response.status_code == 413
+    assert response.json == {"error": "Przesłany plik jest zbyt duży", "code": "limit_exceeded",
+                             "limit": "max_upload_bytes", "maximum": 100}
+
+
+PROMETHEUS_SAMPLE = re.compile(
+    r'^([a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*\})?'
+    r' (-?[0-9.e+-]+|\+Inf|NaN)$')
+
+
+def parse_prometheus(text):
+    """Samples of a Prometheus text exposition, checking that every family is declared"""
+    assert text.endswith("\n")
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            types[name] = kind
+            continue
+        match = PROMETHEUS_SAMPLE.match(line)
+        assert match, f"invalid sample line: {line!r}"
+        name, labels, value = match.groups()
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert family in types, f"sample without TYPE: {line!r}"
+        samples.append((name, labels or "", float(value)))
+    return types, samples
+
+
+def test_metrics_is_valid_prometheus_text(client):
+    client.get("/api/health")
+    client.post("/render", data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == server.METRICS_CONTENT_TYPE
+    types, samples = parse_prometheus(response.get_data(as_text=True))
+
+    assert types["render_http_requests_total"] == "counter"
+    assert types["render_job_queue_depth"] == "gauge"
+    assert any(name == "render_http_requests_total" and 'endpoint="/api/health"' in labels
+               for name, labels, _ in samples)
+    stages = {labels for name, labels, _ in samples if name == "render_stage_duration_seconds_count"}
+    assert {'{stage="parse"}', '{stage="validate"}', '{stage="decode"}'} <= stages
+
+
+def test_metrics_histograms_are_cumulative(client):
+    client.get("/api/health")
+    _, samples = parse_prometheus(client.get("/metrics").get_data(as_text=True))
+
+    buckets = {}
+    for name, labels, value in samples:
+        if name.endswith("_bucket"):
+            series = re.sub(r',?le="[^"]*"', "", labels)
+            buckets.setdefault((name, series), []).append(value)
+    counts = {(name[:-len("_count")] + "_bucket", labels): value
+              for name, labels, value in samples if name.endswith("_count")}
+    assert buckets
+    for key, values in buckets.items():
+        assert values == sorted(values)
+        assert counts[key] == values[-1]
+
+
+def test_metric_label_values_are_escaped():
+    registry = server.MetricsRegistry()
+    registry.counter("test_total", "Test", ("path",))
+    registry.inc("test_total", ('a"b\\c\nd',))
+
+    _, samples = parse_prometheus(registry.render())
+    assert samples == [("test_total", '{path="a\\"b\\\\c\\nd"}', 1.0)]
+
+
+class ListSpanExporter(server.SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exporter = ListSpanExporter()
+    monkeypatch.setattr(server.tracer, "exporter", exporter)
+    return exporter.spans
+
+
+def test_request_spans_continue_the_incoming_trace(client, spans):
+    trace_id, parent_id = "0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331"
+    response = client.post("/render", data={"eml_file": (io.BytesIO(MULTIPART), "a.eml")},
+                           headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    assert response.status_code == 200
+    by_name = {span.name: span for span in spans}
+    request_span = by_name["POST /render"]
+    assert request_span.parent_id == parent_id
+    assert response.headers["traceparent"] == f"00-{trace_id}-{request_span.span_id}-01"
+    assert {span.trace_id for span in spans} == {trace_id}
+    for stage in ("parse", "validate", "decode"):
+        assert by_name[stage].parent_id == request_span.span_id
+    assert by_name["parse"].attributes["email.size_bytes"] == len(MULTIPART)
+    assert request_span.attributes["http.response.status_code"] == 200
+
+
+def test_invalid_traceparent_starts_a_new_trace(client, spans):
+    response = client.get("/api/health", headers={"traceparent": "00-zz-yy-01"})
+
+    (span,) = spans
+    assert span.parent_id is None
+    assert server.TRACEPARENT_PATTERN.match(response.headers["traceparent"])
+
+
+def test_failing_span_is_marked_as_error(spans):
+    with pytest.raises(RuntimeError):
+        with server.tracer.span("work"):
+            raise RuntimeError("boom")
+
+    assert spans[0].status == "ERROR"
+    assert spans[0].attributes["exception.type"] == "RuntimeError"
+
+
+def test_tracing_is_off_by_default():
+    assert server.create_span_exporter("") is None
+    with server.Tracer().span("work") as span:
+        assert span is None
+    with pytest.raises(ValueError):
+        server.create_span_exporter("otlp")
+
+
+def test_file_and_console_exporters(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    stream = io.StringIO()
+    for exporter in (server.create_span_exporter("file", str(path)), server.ConsoleSpanExporter(stream)):
+        with server.Tracer(exporter).span("work", answer=42):
+            pass
+
+    for text in (path.read_text(), stream.getvalue()):
+        (record,) = [json.loads(line) for line in text.splitlines()]
+        assert record["name"] == "work"
+        assert record["attributes"] == {"answer": 42}
+        assert record["end_time_unix_nano"] >= record["start_time_unix_nano"]
@@ -0,0 +1,76 @@
+import pytest
+import os
+from emllm.search import emllmSearchIndex, build_query
+from emllm.core import emllmError
+
+FIRST = (
+    "From: Alice <alice@example.com>\nTo: bob@example.com\nCc: carol@example.org\n"
+    "Message-ID: <first@example.com>\nDate: Mon, 01 Jan 2024 10:00:00 +0000\n"
+    "Subject: Quarterly invoice\n\nHello\n"
+)
+SECOND = (
+    "From: dave@example.net\nTo: alice@example.com\n"
+    "Message-ID: <second@example.com>\nSubject: Lunch plans\n\nHi\n"
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    with emllmSearchIndex(str(tmp_path / "search.db")) as index:
+        yield index
+
+
+def test_search_by_field_and_address(tmp_path, index):
+    (tmp_path / "mail").mkdir()
+    (tmp_path / "mail" / "first.eml").write_text(FIRST)
+    (tmp_path / "mail" / "second.eml").write_text(SECOND)
+
+    assert index.update([str(tmp_path / "mail")]) == 2
+    assert [hit['message_id'] for hit in index.search("from:alice")] == ["<first@example.com>"]
+    assert len(index.search("alice@example.com")) == 2
+    assert index.search("to:carol@example.org")[0]['subject'] == "Quarterly invoice"
+    assert index.search("subject:invo*")[0]['date'] is not None
+    assert index.find_message_id("second@example.com")[0]['sender'] == "dave@example.net"
+
+
+def test_update_is_incremental(tmp_path, index):
+    path = tmp_path / "first.eml"
+    path.write_text(FIRST)
+    assert index.update([str(path)]) == 1
+    assert index.update([str(path)]) == 0
+
+    path.write_text(SECOND)
+    os.utime(path, (0, 0))
+    assert index.update([str(path)]) == 1
+    assert len(index) == 1
+    assert index.search("lunch")[0]['message_id'] == "<second@example.com>"
+
+    path.unlink()
+    assert index.prune() == 1
+    assert len(index) == 0
+
+
+def test_mbox_appends_index_only_new_messages(tmp_path, index):
+    mbox = tmp_path / "archive.mbox"
+    mbox.write_text("From sender Mon Jan  1 00:00:00 2024\n" + FIRST)
+    assert index.update([str(mbox)]) == 1
+
+    with open(mbox, 'a') as f:
+        f.write("\nFrom sender Mon Jan  1 00:00:00 2024\n" + SECOND)
+    assert index.update([str(mbox)]) == 1
+    assert len(index.search("alice")) == 2
+    assert index.search("lunch")[0]['idx'] == 1
+
+    mbox.write_text("From sender Mon Jan  1 00:00:00 2024\n" + SECOND)
+    assert index.update([str(mbox)]) == 1
+    assert len(index) == 1
+
+
+def test_build_query_quotes_terms():
+    assert build_query('from:alice@example.com "two words" pre*') == (
+        'sender : "alice@example.com" AND "two words" AND "pre" *'
+    )
+    with pytest.raises(emllmError):
+        build_query("bogus:value")
+    with pytest.raises(emllmError):
+        build_query("   ")
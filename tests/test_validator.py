@@ -1,4 +1,5 @@
 import pytest
+import json
 from emllm.validator import emllmValidator
 
 def test_valid_message():
@@ -85,3 +86,138 @@ def test_missing_content_type():
     with pytest.raises(ValueError) as exc_info:
         validator.validate(data)
     assert 'Missing content_type' in str(exc_info.value)
+
+def test_validate_many_returns_error_bitmap():
+    from emllm.validator import INVALID_FROM, MISSING_TO, INVALID_CONTENT_TYPE, describe_errors
+
+    validator = emllmValidator()
+    valid = {
+        'headers': {'From': 'test@example.com', 'To': 'recipient@example.com', 'Subject': 'Test'},
+        'attachments': [{'content_type': 'text/plain'}]
+    }
+    messages = [
+        valid,
+        {'headers': {'From': 'invalid-email', 'Subject': 'Test'}},
+        {'headers': valid['headers'], 'attachments': [{'content_type': 'not a type'}]},
+    ] + [valid] * 100
+
+    bitmap = validator.validate_many(messages)
+
+    assert len(bitmap) == len(messages)
+    assert bitmap[0] == 0
+    assert bitmap[1] == INVALID_FROM | MISSING_TO
+    assert bitmap[2] == INVALID_CONTENT_TYPE
+    assert not any(bitmap[3:])
+    assert describe_errors(bitmap[1]) == [
+        'Missing required header: To', 'Invalid email address in From'
+    ]
+
+def test_validate_many_does_not_depend_on_batch_size():
+    validator = emllmValidator()
+    messages = [
+        {'headers': {'From': f'user{i}@example.com', 'To': 'b@example.com', 'Subject': 'Test'},
+         'attachments': [{'content_type': 'text/plain\n' if i % 2 else 'TEXT/Plain'}]}
+        for i in range(3000)
+    ]
+
+    large = validator.validate_many(messages)
+    for row, message in enumerate(messages[:10]):
+        assert validator.validate_many([message])[0] == large[row]
+        assert (large[row] == 0) == validator.check(message).valid
+
+def test_multiple_recipients_are_validated_individually():
+    validator = emllmValidator()
+    data = {
+        'headers': {
+            'From': 'Test <test@example.com>',
+            'To': 'a@example.com, "Doe, John" <john@example.com>, broken',
+            'Subject': 'Test'
+        }
+    }
+
+    with pytest.raises(ValueError) as exc_info:
+        validator.validate(data)
+    assert str(exc_info.value) == 'Invalid email address in To: broken'
+
+    data['headers']['To'] = 'a@example.com, "Doe, John" <john@example.com>'
+    validator.validate(data)
+    assert validator.validate_many([data])[0] == 0
+
+
+def test_address_cache_stats():
+    validator = emllmValidator(address_cache_size=2)
+    data = {'headers': {'From': 'test@example.com', 'To': 'recipient@example.com', 'Subject': 'Test'}}
+
+    for _ in range(3):
+        validator.validate(data)
+
+    stats = validator.cache_stats()
+    assert (stats['hits'], stats['misses'], stats['size'], stats['maxsize']) == (4, 2, 2, 2)
+    validator.clear_cache()
+    assert validator.cache_stats()['size'] == 0
+
+def test_check_returns_structured_issues():
+    from emllm.validator import ValidationIssue, FAIL_FAST
+
+    validator = emllmValidator()
+    data = {
+        'headers': {'From': 'invalid-email', 'Subject': 'Test'},
+        'attachments': [{'content_type': 'text/plain'}, {'filename': 'test.txt'}]
+    }
+
+    result = validator.check(data)
+    assert not result
+    assert result.issues == (
+        ValidationIssue('missing_header', 'To'),
+        ValidationIssue('invalid_address', 'From', value='invalid-email'),
+        ValidationIssue('missing_content_type', 'content_type', 1),
+    )
+    assert result.messages()[2] == 'Attachment 2: Missing content_type'
+    assert result.to_dict()['issues'][0]['code'] == 'missing_header'
+
+    assert validator.check(data, mode=FAIL_FAST).issues == (ValidationIssue('missing_header', 'To'),)
+    with pytest.raises(ValueError):
+        validator.check(data, mode='bogus')
+
+def test_rule_set(tmp_path):
+    from emllm.validator import load_rules
+
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({
+        'required_headers': ['From', 'To'],
+        'header_patterns': {'Subject': ['^\\[TICKET-\\d+\\]', '^Re:']},
+        'allowed_content_types': ['text/plain', 'image/*'],
+        'max_attachment_size': 4,
+        'max_attachments': 2,
+        'allowed_domains': ['example.com'],
+        'denied_domains': ['spam.example.com'],
+    }))
+    validator = emllmValidator(rules=load_rules(str(rules)))
+    data = {
+        'headers': {
+            'From': 'a@mail.example.com',
+            'To': 'b@spam.example.com, c@other.org',
+            'Subject': 'Hello'
+        },
+        'attachments': [
+            {'content_type': 'image/png', 'content': b'12345'},
+            {'content_type': 'application/pdf', 'content': b''},
+            {'content_type': 'text/plain', 'content': 'ok'},
+        ]
+    }
+
+    assert [(issue.code, issue.field, issue.index) for issue in validator.check(data).issues] == [
+        ('domain_denied', 'To', None),
+        ('domain_not_allowed', 'To', None),
+        ('header_mismatch', 'Subject', None),
+        ('too_many_attachments', 'attachments', None),
+        ('attachment_too_large', 'content', 0),
+        ('content_type_not_allowed', 'content_type', 1),
+    ]
+
+    data['headers'] = {'From': 'a@example.com', 'To': 'b@example.com', 'Subject': '[TICKET-7] Hi'}
+    data['attachments'] = data['attachments'][2:]
+    assert validator.check(data).valid
+
+    with pytest.raises(ValueError):
+        emllmValidator(rules={'no_such_rule': True})
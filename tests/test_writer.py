@@ -0,0 +1,101 @@
+import pytest
+import io
+import os
+import tracemalloc
+from emllm.core import emllmParser
+from emllm.writer import emllmWriter, write_message
+
+
+def test_round_trip_through_parser():
+    data = {
+        'headers': {'From': 'test@example.com', 'To': 'recipient@example.com', 'Subject': 'Zażółć gęślą jaźń'},
+        'body': 'Cześć\nHello World',
+        'attachments': [
+            {'content_type': 'application/octet-stream', 'filename': 'dane.bin', 'content': os.urandom(1000)},
+            {'content_type': 'text/plain', 'filename': 'notes.txt', 'content': iter([b'ab', b'c' * 100, b'd'])},
+        ]
+    }
+    output = io.BytesIO()
+    written = write_message(data, output)
+
+    parser = emllmParser()
+    result = parser.to_dict(parser.parse_bytes(output.getvalue()))
+
+    assert written == len(output.getvalue())
+    assert result['headers']['Subject'] == 'Zażółć gęślą jaźń'
+    assert result['body'].startswith('Cześć\nHello World')
+    assert result['attachments'][0]['content'] == data['attachments'][0]['content']
+    assert result['attachments'][1]['content'] == 'ab' + 'c' * 100 + 'd'
+
+
+def test_attachment_from_path_streams_in_bounded_memory(tmp_path):
+    path = tmp_path / "big.bin"
+    with open(path, 'wb') as f:
+        for _ in range(8):
+            f.write(os.urandom(1024 * 1024))
+
+    data = {'headers': {'Subject': 'Big'}, 'body': 'See attachment', 'attachments': [{'path': str(path)}]}
+    output = tmp_path / "big.eml"
+    tracemalloc.start()
+    try:
+        with open(output, 'wb') as f:
+            emllmWriter(linesep='\r\n').write(data, f)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 1024 * 1024
+    parser = emllmParser()
+    message = parser.parse_bytes(output.read_bytes())
+    attachment = next(message.iter_attachments())
+    assert attachment.get_filename() == 'big.bin'
+    assert attachment.get_payload(decode=True) == path.read_bytes()
+
+
+def test_compiled_template_renders_variable_fields():
+    from emllm.core import emllmError
+    from emllm.writer import compile_template, render
+
+    template = compile_template({
+        'headers': {'From': 'news@example.com', 'To': '$email', 'Subject': 'Witaj ${name}!'},
+        'body': 'Cześć $name, kosztuje to $$5.',
+        'attachments': [{'content_type': 'application/pdf', 'filename': 'oferta.pdf', 'content': b'%PDF-1.4'}]
+    })
+    assert template.fields == {'email', 'name'}
+
+    parser = emllmParser()
+    first = parser.to_dict(parser.parse_bytes(render(template, {'email': 'jan@example.com', 'name': 'Jan'})))
+    output = io.BytesIO()
+    template.write({'email': 'ewa@example.com', 'name': 'Ewa Żak'}, output)
+    second = parser.to_dict(parser.parse_bytes(output.getvalue()))
+
+    assert first['headers']['To'] == 'jan@example.com'
+    assert first['body'].strip() == 'Cześć Jan, kosztuje to $5.'
+    assert first['attachments'][0]['content'] == b'%PDF-1.4'
+    assert second['headers']['Subject'] == 'Witaj Ewa Żak!'
+    assert second['attachments'] == first['attachments']
+
+    with pytest.raises(emllmError):
+        render(template, {'email': 'jan@example.com'})
+
+
+def test_body_with_form_feed_round_trips():
+    data = {'headers': {'Subject': 'Raport'}, 'body': 'Strona 1\fStrona 2\nkoniec\v'}
+    output = io.BytesIO()
+    write_message(data, output)
+
+    parser = emllmParser()
+    result = parser.to_dict(parser.parse_bytes(output.getvalue()))
+
+    assert result['body'] == 'Strona 1\fStrona 2\nkoniec\v\n'
+
+
+@pytest.mark.parametrize('body', ['ąĄ Å test\r\nline2', 'plain ascii\nline2'])
+def test_text_body_round_trips_exactly(body):
+    output = io.BytesIO()
+    write_message({'headers': {'Subject': 'Test'}, 'body': body}, output)
+
+    parser = emllmParser()
+    result = parser.to_dict(parser.parse_bytes(output.getvalue()))
+
+    assert result['body'] == body.replace('\r\n', '\n') + '\n'